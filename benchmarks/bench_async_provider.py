@@ -0,0 +1,83 @@
+"""
+The throughput and latency of (sequential) get requests and of subscription
+deliveries, with an AsyncIOClient of an AsyncProvider on the same event loop:
+with the provider's coroutines awaited directly (``native``), or through the
+thread-safe futures which any other provider is used through (``futures``).
+
+"""
+import asyncio
+import time
+
+import pytest
+
+import pyda
+from pyda import data
+from pyda.providers import AsyncPropertyStream, AsyncProvider
+
+from conftest import InProcessProvider, Measurement  # isort: skip
+
+N_REQUESTS = 5_000
+N_UPDATES = 20_000
+
+
+class EmittingStream(AsyncPropertyStream):
+    def __init__(self, loop, query):
+        super().__init__(loop)
+        self._query = query
+
+    async def _run(self):
+        for i in range(N_UPDATES):
+            self._response_received(InProcessProvider.make_response(self._query, i))
+            if i % 100 == 0:
+                # Let the consumer run.
+                await asyncio.sleep(0)
+
+
+class ImmediateAsyncProvider(AsyncProvider):
+    async def _get_property_async(self, query):
+        return InProcessProvider.make_response(query, 0)
+
+    async def _set_property_async(self, query, value):
+        return data.PropertyUpdateResponse(query=query, header=data.UpdateHeader(query.selector))
+
+    def _create_property_stream(self, query):
+        return EmittingStream(self._loop, query)
+
+
+class FuturesClient(pyda.AsyncIOClient):
+    # Always uses the provider through its (thread-safe) futures.
+    def _native_provider(self):
+        return None
+
+
+CLIENTS = {'native': pyda.AsyncIOClient, 'futures': FuturesClient}
+
+
+@pytest.mark.parametrize('path', list(CLIENTS))
+def bench__AsyncProvider__get(benchmark, path):
+    async def run() -> Measurement:
+        client = CLIENTS[path](provider=ImmediateAsyncProvider())
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(N_REQUESTS):
+            t0 = time.perf_counter()
+            await client.get(device='dev', prop='prop')
+            latencies.append(time.perf_counter() - t0)
+        return Measurement(N_REQUESTS, time.perf_counter() - start, latencies)
+
+    benchmark(lambda: asyncio.run(run()))
+
+
+def bench__AsyncProvider__subscribe(benchmark):
+    async def run() -> Measurement:
+        client = pyda.AsyncIOClient(provider=ImmediateAsyncProvider())
+        sub = client.subscribe(device='dev', prop='prop')
+        start = time.perf_counter()
+        async with sub:
+            sub.start()
+            for _ in range(N_UPDATES):
+                await sub.__anext__()
+        sub.stop()
+        return Measurement(N_UPDATES, time.perf_counter() - start)
+
+    benchmark(lambda: asyncio.run(run()))
@@ -0,0 +1,56 @@
+"""
+The delivery of responses from a provider thread to an asyncio consumer, before
+and after batching the deliveries of AsyncIOSubscription:
+
+ * ``per-response``: one ``asyncio.run_coroutine_threadsafe(queue.put(...))`` for
+   each response (the approach used by AsyncIOSubscription previously).
+ * ``dispatcher``: the batched loop dispatcher used by AsyncIOSubscription.
+
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+import pyda
+
+from conftest import Measurement  # isort: skip
+
+N_RESPONSES = 50_000
+
+
+async def per_response(provider) -> Measurement:
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def produce():
+        for i in range(N_RESPONSES):
+            asyncio.run_coroutine_threadsafe(queue.put(i), loop=loop)
+
+    start = time.perf_counter()
+    threading.Thread(target=produce).start()
+    for _ in range(N_RESPONSES):
+        await queue.get()
+    return Measurement(N_RESPONSES, time.perf_counter() - start)
+
+
+async def dispatcher(provider) -> Measurement:
+    client = pyda.AsyncIOClient(provider=provider)
+    sub = client.subscribe(device='dev', prop='prop')
+
+    def produce():
+        for i in range(N_RESPONSES):
+            sub._response_received(i)
+
+    async with sub:
+        start = time.perf_counter()
+        threading.Thread(target=produce).start()
+        for _ in range(N_RESPONSES):
+            await sub.__anext__()
+        return Measurement(N_RESPONSES, time.perf_counter() - start)
+
+
+@pytest.mark.parametrize('approach', [per_response, dispatcher], ids=['per-response', 'dispatcher'])
+def bench__asyncio_delivery(provider, benchmark, approach):
+    benchmark(lambda: asyncio.run(approach(provider)))
@@ -0,0 +1,77 @@
+"""
+The throughput and latency of (sequential) get and set requests, for each client,
+against a provider which answers immediately. This measures the overhead of pyda.
+
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+import pyda
+
+from conftest import Measurement  # isort: skip
+
+N_REQUESTS = 5_000
+VALUE = {'value': 1.5, 'count': 3}
+
+
+def timed_requests(request) -> Measurement:
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(N_REQUESTS):
+        t0 = time.perf_counter()
+        request()
+        latencies.append(time.perf_counter() - t0)
+    return Measurement(N_REQUESTS, time.perf_counter() - start, latencies)
+
+
+def callback_request(method, **kwargs):
+    done = threading.Event()
+
+    def request():
+        done.clear()
+        method(callback=lambda response: done.set(), **kwargs)
+        done.wait()
+
+    return request
+
+
+@pytest.mark.parametrize('operation', ['get', 'set'])
+def bench__SimpleClient(provider, benchmark, operation):
+    client = pyda.SimpleClient(provider=provider)
+    if operation == 'get':
+        benchmark(lambda: timed_requests(lambda: client.get(device='dev', prop='prop')))
+    else:
+        benchmark(lambda: timed_requests(
+            lambda: client.set(device='dev', prop='prop', value=VALUE),
+        ))
+
+
+@pytest.mark.parametrize('operation', ['get', 'set'])
+def bench__CallbackClient(provider, benchmark, operation):
+    client = pyda.CallbackClient(provider=provider)
+    if operation == 'get':
+        request = callback_request(client.get, device='dev', prop='prop')
+    else:
+        request = callback_request(client.set, device='dev', prop='prop', value=VALUE)
+    benchmark(lambda: timed_requests(request))
+
+
+@pytest.mark.parametrize('operation', ['get', 'set'])
+def bench__AsyncIOClient(provider, benchmark, operation):
+    async def run() -> Measurement:
+        client = pyda.AsyncIOClient(provider=provider)
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(N_REQUESTS):
+            t0 = time.perf_counter()
+            if operation == 'get':
+                await client.get(device='dev', prop='prop')
+            else:
+                await client.set(device='dev', prop='prop', value=VALUE)
+            latencies.append(time.perf_counter() - t0)
+        return Measurement(N_REQUESTS, time.perf_counter() - start, latencies)
+
+    benchmark(lambda: asyncio.run(run()))
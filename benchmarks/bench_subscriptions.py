@@ -0,0 +1,158 @@
+"""
+The throughput of subscription deliveries, and the latency from the provider
+emitting a response to a consumer receiving it, for each client. The responses of
+a single property stream are fanned out to 1 to 10k subscriptions, with and
+without a middleware.
+
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+import pyda
+from pyda import data
+from pyda.providers import SyntheticProvider
+from pyda.providers._middleware import DecimatingMiddleware
+
+from conftest import Measurement  # isort: skip
+
+#: The (approximate) number of deliveries made by each benchmark.
+N_DELIVERIES = 50_000
+
+FAN_OUTS = [1, 100, 10_000]
+MIDDLEWARES = {
+    'no-middleware': None,
+    # Keeps every response, so that only the cost of the chain is measured.
+    'middleware': lambda: DecimatingMiddleware(1),
+}
+
+
+class Producer:
+    """Emits responses from a thread, remembering when each one was emitted."""
+    def __init__(self, provider, n_responses: int):
+        query = data.PropertyAccessQuery(device='dev', prop='prop', selector=data.Selector(''))
+        self.responses = [provider.make_response(query, i) for i in range(n_responses)]
+        self.emitted = [0.] * n_responses
+        self._provider = provider
+        self._thread = threading.Thread(target=self._run)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        for i, response in enumerate(self.responses):
+            self.emitted[i] = time.perf_counter()
+            self._provider.emit('dev', 'prop', response)
+
+    def latency(self, response) -> float:
+        return time.perf_counter() - self.emitted[response.value._dtv['i']]
+
+
+def configure(client, middleware):
+    if MIDDLEWARES[middleware] is not None:
+        client._stream_middlewares.append(MIDDLEWARES[middleware]())
+
+
+def n_responses(fan_out: int) -> int:
+    return max(N_DELIVERIES // fan_out, 5)
+
+
+@pytest.mark.parametrize('middleware', MIDDLEWARES)
+@pytest.mark.parametrize('fan_out', FAN_OUTS)
+def bench__SimpleClient__subscribe(provider, benchmark, fan_out, middleware):
+    def run() -> Measurement:
+        client = pyda.SimpleClient(provider=provider)
+        configure(client, middleware)
+        subs = [client.subscribe(device='dev', prop='prop') for _ in range(fan_out)]
+        for sub in subs:
+            sub.start()
+        producer = Producer(provider, n_responses(fan_out))
+        total = fan_out * len(producer.responses)
+
+        latencies = []
+        with client.subscriptions:
+            start = time.perf_counter()
+            producer.start()
+            pool = iter(client.subscriptions)
+            for _ in range(total):
+                latencies.append(producer.latency(next(pool)))
+            return Measurement(total, time.perf_counter() - start, latencies)
+
+    benchmark(run)
+
+
+@pytest.mark.parametrize('middleware', MIDDLEWARES)
+@pytest.mark.parametrize('fan_out', FAN_OUTS)
+def bench__CallbackClient__subscribe(provider, benchmark, fan_out, middleware):
+    def run() -> Measurement:
+        client = pyda.CallbackClient(provider=provider)
+        configure(client, middleware)
+        producer = Producer(provider, n_responses(fan_out))
+        total = fan_out * len(producer.responses)
+        latencies = []
+        done = threading.Event()
+
+        def callback(response):
+            # Callbacks are run by a single worker.
+            latencies.append(producer.latency(response))
+            if len(latencies) == total:
+                done.set()
+
+        subs = [
+            client.subscribe(device='dev', prop='prop', callback=callback)
+            for _ in range(fan_out)
+        ]
+        for sub in subs:
+            sub.start()
+        start = time.perf_counter()
+        producer.start()
+        assert done.wait(timeout=120)
+        return Measurement(total, time.perf_counter() - start, latencies)
+
+    benchmark(run)
+
+
+@pytest.mark.parametrize('middleware', MIDDLEWARES)
+@pytest.mark.parametrize('fan_out', FAN_OUTS)
+def bench__AsyncIOClient__subscribe(provider, benchmark, fan_out, middleware):
+    async def run() -> Measurement:
+        client = pyda.AsyncIOClient(provider=provider)
+        configure(client, middleware)
+        subs = [client.subscribe(device='dev', prop='prop') for _ in range(fan_out)]
+        for sub in subs:
+            sub.start()
+        producer = Producer(provider, n_responses(fan_out))
+        total = fan_out * len(producer.responses)
+        latencies = []
+        async with client.subscriptions:
+            start = time.perf_counter()
+            producer.start()
+            for _ in range(total):
+                latencies.append(producer.latency(await client.subscriptions.__anext__()))
+            return Measurement(total, time.perf_counter() - start, latencies)
+
+    benchmark(lambda: asyncio.run(run()))
+
+
+@pytest.mark.parametrize('n_arrays', [0, 4])
+def bench__SimpleClient__synthetic_stream(benchmark, n_arrays):
+    # End-to-end, from a provider generating its data (as fast as possible).
+    n_updates = 50_000
+
+    def run() -> Measurement:
+        provider = SyntheticProvider(rate=None, n_scalars=4, n_arrays=n_arrays, array_size=256)
+        client = pyda.SimpleClient(provider=provider)
+        sub = client.subscribe(device='SYNTHETIC.DEVICE0', prop='Acquisition')
+        with sub:
+            start = time.perf_counter()
+            sub.start()
+            iterator = iter(sub)
+            for _ in range(n_updates):
+                next(iterator)
+            duration = time.perf_counter() - start
+            sub.stop()
+        return Measurement(n_updates, duration)
+
+    benchmark(run)
@@ -0,0 +1,177 @@
+"""
+Fixtures of the benchmark suite.
+
+Each benchmark is run through the ``benchmark`` fixture, which reports the
+throughput (and latency percentiles) of the fastest of a few rounds, along with
+how it compares with the baseline of the same name in ``baselines.json``.
+
+A benchmark fails if it is slower than its baseline by more than
+``--baseline-tolerance``. Absolute throughput depends on the machine, so runs on
+a machine other than the one which recorded the baselines may opt out of the
+check with ``--no-check-baselines`` (the comparison is still reported). Benchmarks
+without a baseline pass, with a note in the summary.
+
+"""
+import concurrent.futures
+import json
+import pathlib
+import time
+import typing
+
+import numpy as np
+import pytest
+
+from pyda import data
+from pyda.data._data import _StampContext
+from pyda.providers._core import BasePropertyStream, BaseProvider
+
+BASELINES_PATH = pathlib.Path(__file__).parent / 'baselines.json'
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('benchmarks')
+    group.addoption(
+        '--update-baselines', action='store_true',
+        help='Record the results of the benchmarks which are run as the new baselines.',
+    )
+    group.addoption(
+        '--no-check-baselines', dest='check_baselines', action='store_false',
+        help='Only report how the benchmarks compare with their baselines, rather than '
+             'failing those which are slower by more than the tolerance.',
+    )
+    group.addoption(
+        '--baseline-tolerance', type=float, default=0.5,
+        help='The fraction of the baseline throughput which may be lost before a '
+             'benchmark fails (default 0.5).',
+    )
+    group.addoption(
+        '--benchmark-rounds', type=int, default=3,
+        help='The number of rounds of each benchmark, of which the fastest is kept (default 3).',
+    )
+
+
+class InProcessProvider(BaseProvider):
+    """
+    A provider with no I/O: gets and sets complete immediately, and the responses
+    of the property streams are pushed by the benchmarks with :meth:`emit`.
+
+    """
+    def __init__(self):
+        super().__init__()
+        self.streams: typing.Dict[typing.Tuple[str, str], BasePropertyStream] = {}
+
+    def _get_property(self, query):
+        future = concurrent.futures.Future()
+        future.set_result(self.make_response(query, 0))
+        return future
+
+    def _set_property(self, query, value):
+        self._prepare_value_for_set(query, value)
+        future = concurrent.futures.Future()
+        future.set_result(data.PropertyUpdateResponse(
+            query=query, header=data.UpdateHeader(query.selector),
+        ))
+        return future
+
+    def _create_property_stream(self, query):
+        stream = self.streams[(query.device, query.prop)] = BasePropertyStream()
+        return stream
+
+    @staticmethod
+    def make_response(
+            query: data.PropertyAccessQuery,
+            i: int,
+    ) -> data.PropertyRetrievalResponse:
+        value = data.AcquiredPropertyData(
+            dtv={'i': i, 'value': float(i)},
+            header=data.Header(_StampContext(acquisition_stamp=time.time_ns())),
+        )
+        return data.PropertyRetrievalResponse(query=query, value=value)
+
+    def emit(self, device: str, prop: str, response: data.PropertyRetrievalResponse):
+        self.streams[(device, prop)]._response_received(response)
+
+
+@pytest.fixture
+def provider():
+    return InProcessProvider()
+
+
+class _Results:
+    def __init__(self, config):
+        self.update = config.getoption('--update-baselines')
+        self.check = config.getoption('check_baselines')
+        self.tolerance = config.getoption('--baseline-tolerance')
+        self.rounds = config.getoption('--benchmark-rounds')
+        self.baselines = json.loads(BASELINES_PATH.read_text()) if BASELINES_PATH.exists() else {}
+        self.lines: typing.List[str] = []
+
+
+def pytest_configure(config):
+    config._benchmark_results = _Results(config)
+
+
+def pytest_unconfigure(config):
+    results = config._benchmark_results
+    if results.update:
+        BASELINES_PATH.write_text(json.dumps(results.baselines, indent=2, sort_keys=True) + '\n')
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    results = config._benchmark_results
+    if results.lines:
+        terminalreporter.section('benchmarks')
+        for line in results.lines:
+            terminalreporter.write_line(line)
+
+
+class Measurement(typing.NamedTuple):
+    #: The number of operations (or deliveries) which were made.
+    count: int
+    #: The time taken, in seconds.
+    duration: float
+    #: The latency of each operation, in seconds (if measured).
+    latencies: typing.Optional[typing.Sequence[float]] = None
+
+    @property
+    def throughput(self) -> float:
+        return self.count / self.duration
+
+
+@pytest.fixture
+def benchmark(request):
+    """
+    Run a benchmark: ``benchmark(run)``, where ``run()`` makes one round of
+    measurements and returns a :class:`Measurement`. The fastest of the rounds is
+    reported, and compared with the baseline.
+
+    """
+    results: _Results = request.config._benchmark_results
+    name = request.node.name
+
+    def run_benchmark(run: typing.Callable[[], Measurement]) -> Measurement:
+        best = max((run() for _ in range(results.rounds)), key=lambda m: m.throughput)
+        throughput = best.throughput
+        line = f'{name}: {throughput:,.0f}/s'
+        if best.latencies:
+            p50, p99 = np.percentile(np.asarray(best.latencies) * 1e6, [50, 99])
+            line += f', latency p50 {p50:,.1f}us p99 {p99:,.1f}us'
+
+        baseline = results.baselines.get(name)
+        if results.update:
+            results.baselines[name] = {'throughput': round(throughput)}
+        elif baseline is None:
+            line += ' (no baseline)'
+        else:
+            ratio = throughput / baseline['throughput']
+            line += f' ({ratio:.0%} of baseline)'
+            if results.check and ratio < 1 - results.tolerance:
+                results.lines.append(line)
+                pytest.fail(
+                    f'{name} regressed: {throughput:,.0f}/s against a baseline of '
+                    f'{baseline["throughput"]:,.0f}/s',
+                )
+        results.lines.append(line)
+        return best
+
+    return run_benchmark
@@ -1,8 +1,14 @@
 import asyncio
+import collections
+import concurrent.futures
+import threading
 import typing
+import weakref
 
 from .. import core
 from ... import data
+from ...providers._async import AsyncProvider
+from ...tracing import _tracing
 
 if typing.TYPE_CHECKING:
     from ...data import (
@@ -11,7 +17,133 @@ if typing.TYPE_CHECKING:
         PropertyUpdateResponse,
     )
     from ...providers._core import BasePropertyStream
-    from ..core._core import SelectorArgumentType
+    from ..core._core import QueryArgumentType, SelectorArgumentType
+
+
+class AsyncIOResponseQueue(asyncio.Queue):
+    """
+    A queue of responses, which applies an overflow policy when bounded.
+
+    Responses are offered by the event loop on behalf of the provider, which
+    cannot be made to wait, so bounded queues must discard responses: they drop
+    the oldest one by default, and the BLOCK policy is refused. Backpressure is
+    applied with watermarks instead (see ``set_watermarks``).
+
+    Not thread-safe: it must only be used from within its event loop.
+
+    """
+    def __init__(
+            self,
+            maxsize: int = 0,
+            overflow: typing.Optional[core.OverflowPolicy] = None,
+    ):
+        if overflow is None:
+            bounded = maxsize > 0
+            overflow = core.OverflowPolicy.DROP_OLDEST if bounded else core.OverflowPolicy.BLOCK
+        overflow = core.OverflowPolicy(overflow)
+        if overflow is core.OverflowPolicy.KEEP_LATEST:
+            maxsize = 1
+        if overflow is core.OverflowPolicy.BLOCK and maxsize > 0:
+            raise ValueError(
+                "Bounded asyncio subscription queues cannot block the provider: use a dropping "
+                "overflow policy, or set_watermarks to hold back the property stream",
+            )
+        super().__init__(maxsize)
+        self.overflow = overflow
+        #: The number of responses which have been discarded because of the overflow policy.
+        self.dropped = 0
+        #: The watermarks of the subscription (or pool) whose queue this is, if any.
+        self.watermarks: typing.Optional[core.Watermarks] = None
+        #: The private delivery watermarks of the subscriptions which this queue is enabled for.
+        self.delivery_watermarks: typing.Tuple[core.Watermarks, ...] = ()
+
+    @property
+    def depth(self) -> int:
+        """The number of items in the queue."""
+        return self.qsize()
+
+    def offer(self, item: typing.Any) -> None:
+        self._offer(item)
+        self.update_watermarks()
+
+    def update_watermarks(self) -> None:
+        """Check all of the watermarks depending on this queue, after its depth has changed."""
+        if self.watermarks is not None:
+            self.watermarks.update()
+        for watermarks in self.delivery_watermarks:
+            watermarks.update()
+
+    def _offer(self, item: typing.Any) -> None:
+        if not self.full():
+            self.put_nowait(item)
+            return
+        self.dropped += 1
+        if self.overflow is core.OverflowPolicy.DROP_NEWEST:
+            return
+        self.get_nowait()
+        self.task_done()
+        self.put_nowait(item)
+
+
+class _LoopDispatcher:
+    """
+    Delivers responses from arbitrary (provider) threads to the subscriptions
+    of a single event loop.
+
+    Responses are collected in a thread-safe buffer, and the loop is woken up once
+    to deliver everything which has been buffered since the last wakeup.
+
+    """
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = weakref.ref(loop)
+        self._pending: typing.Deque[
+            typing.Tuple["AsyncIOSubscription", "PropertyRetrievalResponse"]
+        ] = collections.deque()
+        self._lock = threading.Lock()
+        self._drain_scheduled = False
+
+    def submit(self, subscription: "AsyncIOSubscription", response: "PropertyRetrievalResponse"):
+        self._pending.append((subscription, response))
+        with self._lock:
+            if self._drain_scheduled:
+                return
+            self._drain_scheduled = True
+        loop = self._loop()
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._drain)
+
+    def _drain(self) -> None:
+        # Reset the flag *before* draining, such that anything appended from
+        # now on is either drained below, or schedules a new drain.
+        with self._lock:
+            self._drain_scheduled = False
+        pending = self._pending
+        while pending:
+            subscription, response = pending.popleft()
+            # The enabled queues are only ever changed from within the loop.
+            for queue in subscription._enabled_queues:
+                queue.offer(response)
+
+
+_DISPATCHERS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopDispatcher]" = \
+    weakref.WeakKeyDictionary()
+_DISPATCHERS_LOCK = threading.Lock()
+
+
+def _loop_dispatcher(loop: asyncio.AbstractEventLoop) -> _LoopDispatcher:
+    with _DISPATCHERS_LOCK:
+        dispatcher = _DISPATCHERS.get(loop)
+        if dispatcher is None:
+            dispatcher = _DISPATCHERS[loop] = _LoopDispatcher(loop)
+    return dispatcher
+
+
+async def _shared_result(future: "concurrent.futures.Future") -> typing.Any:
+    # The result of a future which may be shared with other gets, so it must not be
+    # cancelled if this one is.
+    if future.done():
+        return future.result()
+    return await asyncio.shield(asyncio.wrap_future(future))
 
 
 class AsyncIOSubscription(core.BaseSubscription):
@@ -20,22 +152,78 @@ class AsyncIOSubscription(core.BaseSubscription):
             property_stream: "BasePropertyStream",
             query: "PropertyAccessQuery",
             loop: asyncio.AbstractEventLoop,
+            *,
+            maxsize: int = 0,
+            overflow: typing.Optional[core.OverflowPolicy] = None,
     ):
-        self._q: asyncio.Queue = asyncio.Queue()
-        self._enabled_queues: typing.List[asyncio.Queue] = []
+        self._q = AsyncIOResponseQueue(maxsize, overflow)
+        self._enabled_queues: typing.List[AsyncIOResponseQueue] = []
         self._loop = loop
+        self._dispatcher = _loop_dispatcher(loop)
         super().__init__(property_stream, query)
 
+    @property
+    def dropped(self) -> int:
+        """The number of responses this subscription's queue has discarded."""
+        return self._q.dropped
+
+    @property
+    def queue_depth(self) -> int:
+        return self._q.depth
+
+    @property
+    def _delivery_depth(self) -> int:
+        return max((q.depth for q in self._enabled_queues), default=0)
+
+    def set_watermarks(self, high: typing.Optional[int], low: typing.Optional[int] = None) -> None:
+        super().set_watermarks(high, low)
+        self._q.watermarks = self.watermarks
+
+    def _delivery_watermarks_changed(self) -> None:
+        for q in self._enabled_queues:
+            self._sync_delivery_watermarks(q)
+
+    def _sync_delivery_watermarks(self, q: AsyncIOResponseQueue) -> None:
+        # The queue keeps the delivery watermarks of the other subscriptions it is enabled for.
+        others = tuple(
+            watermarks for watermarks in q.delivery_watermarks
+            if watermarks._owner is not self
+        )
+        if q in self._enabled_queues:
+            others += tuple(self._delivery_watermarks.values())
+        q.delivery_watermarks = others
+
+    def _enable_queue(self, q: AsyncIOResponseQueue) -> None:
+        self._enabled_queues.append(q)
+        self._sync_delivery_watermarks(q)
+        self._update_delivery_watermarks()
+
+    def _disable_queue(self, q: AsyncIOResponseQueue) -> None:
+        self._enabled_queues.remove(q)
+        self._sync_delivery_watermarks(q)
+        # The responses left in the queue are no longer waiting to be delivered.
+        self._update_delivery_watermarks()
+
     def subs_response_received(self, response: "PropertyRetrievalResponse"):
-        for queue in self._enabled_queues:
-            # TODO: Do we need to hold on to a reference to this future?
-            asyncio.run_coroutine_threadsafe(queue.put(response), loop=self._loop)
+        if self._enabled_queues:
+            try:
+                in_loop = asyncio.get_running_loop() is self._loop
+            except RuntimeError:
+                # Delivered from a thread without a running loop (such as a provider's).
+                in_loop = False
+            if in_loop:
+                # Delivered from within the loop (such as by an AsyncPropertyStream),
+                # so the queues can be given the response directly.
+                for queue in self._enabled_queues:
+                    queue.offer(response)
+            else:
+                self._dispatcher.submit(self, response)
 
     async def __aenter__(self):
-        self._enabled_queues.append(self._q)
+        self._enable_queue(self._q)
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        self._enabled_queues.remove(self._q)
+        self._disable_queue(self._q)
 
     def __aiter__(self):
         # TODO: Check that the pool is doing this inside a managed context.
@@ -45,21 +233,43 @@ class AsyncIOSubscription(core.BaseSubscription):
         resp = await self._q.get()
         # TODO: Is it possible that multiple iterations are taking place?
         self._q.task_done()
+        self._q.update_watermarks()
+        self.latency.observe_response(resp)
+        if _tracing._HOOKS:
+            _tracing._emit(_tracing.SUBSCRIPTION_DEQUEUE, _tracing.INSTANT, self._query)
         return resp
 
 
 class AsyncIOSubscriptionPool(core.BaseSubscriptionPool):
-    def __init__(self):
+    def __init__(
+            self,
+            *,
+            maxsize: int = 0,
+            overflow: typing.Optional[core.OverflowPolicy] = None,
+    ):
         super().__init__()
-        self._q: asyncio.Queue = asyncio.Queue()
+        self._q = AsyncIOResponseQueue(maxsize, overflow)
+
+    @property
+    def dropped(self) -> int:
+        """The number of responses this pool's queue has discarded."""
+        return self._q.dropped
+
+    @property
+    def queue_depth(self) -> int:
+        return self._q.depth
+
+    def set_watermarks(self, high: typing.Optional[int], low: typing.Optional[int] = None) -> None:
+        super().set_watermarks(high, low)
+        self._q.watermarks = self.watermarks
 
     async def __aenter__(self):
         for sub in self._subs:
-            sub._enabled_queues.append(self._q)
+            sub._enable_queue(self._q)
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         for sub in self._subs:
-            sub._enabled_queues.remove(self._q)
+            sub._disable_queue(self._q)
 
     def __aiter__(self):
         # TODO: Check that the pool is doing this inside a managed context.
@@ -69,14 +279,25 @@ class AsyncIOSubscriptionPool(core.BaseSubscriptionPool):
         resp = await self._q.get()
         # TODO: Is it possible that multiple iterations are taking place?
         self._q.task_done()
+        self._q.update_watermarks()
+        self.latency.observe_response(resp)
+        if _tracing._HOOKS:
+            name = getattr(resp, 'query', 'pool')
+            _tracing._emit(_tracing.SUBSCRIPTION_DEQUEUE, _tracing.INSTANT, name)
         return resp
 
 
 class AsyncIOClient(core.BaseClient):
-    def __init__(self, *, provider):
+    def __init__(
+            self,
+            *,
+            provider,
+            pool_maxsize: int = 0,
+            pool_overflow: typing.Optional[core.OverflowPolicy] = None,
+    ):
         super().__init__(provider=provider)
         # TODO: Simplify by injecting the type into the base client.
-        self.subscriptions = AsyncIOSubscriptionPool()
+        self.subscriptions = AsyncIOSubscriptionPool(maxsize=pool_maxsize, overflow=pool_overflow)
 
     async def get(
             self,
@@ -84,11 +305,40 @@ class AsyncIOClient(core.BaseClient):
             device: str,
             prop: str,
             selector: "SelectorArgumentType" = data.Selector(''),
+            max_age: typing.Optional[float] = None,
     ) -> "PropertyRetrievalResponse":
+        """
+        Get a device property.
+
+        If ``max_age`` is given (in seconds), and a subscription to the same query
+        is running, the last response of its (shared) stream is returned instead
+        of making a request, provided it was acquired no more than ``max_age`` ago.
+
+        """
         selector = self._ensure_selector(selector)
         query = self._build_query(device, prop, selector)
-        future = self.provider._get_property(query)
-        return await asyncio.wrap_future(future)
+        if max_age is not None:
+            response = self._streamed_response(query, max_age)
+            if response is not None:
+                return response
+        if self._native_provider() is not None:
+            return await self._in_flight_gets.get_property_async(query)
+        return await _shared_result(self._get_property(query))
+
+    async def get_many(
+            self,
+            queries: typing.Iterable["QueryArgumentType"],
+    ) -> typing.List["PropertyRetrievalResponse"]:
+        """
+        Get many device properties in one go, returning the responses in the
+        same order as the given queries.
+
+        """
+        queries = self._ensure_queries(queries)
+        if self._native_provider() is not None:
+            return await self._in_flight_gets.get_properties_async(queries)
+        futures = self._get_properties(queries)
+        return list(await asyncio.gather(*(_shared_result(future) for future in futures)))
 
     async def set(
             self,
@@ -100,15 +350,44 @@ class AsyncIOClient(core.BaseClient):
     ) -> "PropertyUpdateResponse":
         selector = self._ensure_selector(selector)
         query = self._build_query(device, prop, selector)
+        provider = self._native_provider()
+        if provider is not None:
+            return await provider._set_property_async(query, value)
         future = self.provider._set_property(query, value)
         return await asyncio.wrap_future(future)
 
+    async def set_many(
+            self,
+            items: typing.Iterable[typing.Tuple["QueryArgumentType", typing.Any]],
+    ) -> typing.List["PropertyUpdateResponse"]:
+        """
+        Set many device properties in one go, given ``(query, value)`` pairs.
+        The responses are returned in the same order as the given items.
+
+        """
+        items = self._ensure_set_items(items)
+        provider = self._native_provider()
+        if provider is not None:
+            return await provider._set_properties_async(items)
+        futures = self.provider._set_properties(items)
+        return list(await asyncio.gather(*(asyncio.wrap_future(future) for future in futures)))
+
+    def _native_provider(self) -> typing.Optional[AsyncProvider]:
+        # The provider if its coroutines can be awaited directly, rather than
+        # through (thread-safe) futures: if it is an AsyncProvider of this loop.
+        provider = self.provider
+        if isinstance(provider, AsyncProvider) and provider.loop is asyncio.get_running_loop():
+            return provider
+        return None
+
     def subscribe(
             self,
             *,
             device: str,
             prop: str,
             selector: "SelectorArgumentType" = data.Selector(''),
+            maxsize: int = 0,
+            overflow: typing.Optional[core.OverflowPolicy] = None,
     ) -> AsyncIOSubscription:
         selector = self._ensure_selector(selector)
         query = self._build_query(device, prop, selector)
@@ -118,6 +397,8 @@ class AsyncIOClient(core.BaseClient):
             # Note: Must be called on the loop's thread.
             # Perhaps we can do better than this though...
             asyncio.get_running_loop(),
+            maxsize=maxsize,
+            overflow=overflow,
         )
-        self.subscriptions._subs.append(subs)
+        self.subscriptions._add_subscription(subs)
         return subs
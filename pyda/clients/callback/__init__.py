@@ -1,3 +1,5 @@
 from ._callback import CallbackSubscription
+from ._executor import KeyedSerialExecutor
 
 CallbackSubscription.__module__ = __name__
+KeyedSerialExecutor.__module__ = __name__
@@ -1,9 +1,12 @@
 import concurrent.futures
+import threading
 import typing
 import weakref
 
 from .. import core
 from ... import data
+from ...tracing import _tracing
+from ._executor import KeyedSerialExecutor
 
 if typing.TYPE_CHECKING:
     from ...data import (
@@ -12,7 +15,7 @@ if typing.TYPE_CHECKING:
         PropertyUpdateResponse,
     )
     from ...providers._core import BasePropertyStream
-    from ..core._core import SelectorArgumentType
+    from ..core._core import QueryArgumentType, SelectorArgumentType
 
 
 RetrievalCallback = typing.Callable[["PropertyRetrievalResponse"], None]
@@ -28,21 +31,89 @@ class CallbackSubscription(core.BaseSubscription):
     ):
         self._cli = weakref.ref(client)
         self._callback = callback
+        #: The number of callbacks which have been submitted, but have not started yet.
+        #: Counted up in the provider's thread and down in the executor's, under the lock.
+        self._pending_callbacks = 0
+        self._pending_lock = threading.Lock()
         super().__init__(property_stream, query)
 
+    @property
+    def queue_depth(self) -> int:
+        return self._pending_callbacks
+
+    def _callback_submitted(self) -> None:
+        with self._pending_lock:
+            self._pending_callbacks += 1
+
+    def _callback_started(self) -> None:
+        with self._pending_lock:
+            self._pending_callbacks -= 1
+        if self.watermarks is not None:
+            self.watermarks.update()
+        self._update_delivery_watermarks()
+
+    def _run_callback(self, response: "PropertyRetrievalResponse") -> None:
+        self._callback_started()
+        self.latency.observe_response(response)
+        if _tracing._HOOKS:
+            _tracing._emit(_tracing.CALLBACK, _tracing.BEGIN, self._query)
+            try:
+                self._callback(response)
+            finally:
+                _tracing._emit(_tracing.CALLBACK, _tracing.END, self._query)
+        else:
+            self._callback(response)
+
     def subs_response_received(self, response: "PropertyRetrievalResponse"):
         cli = self._cli()
         if cli:
             # TODO: Do we need to hold on to a reference to this future?
-            cli._pool.submit(self._callback, response)
+            cli._submit_subscription_callback(self, response)
 
 
 class CallbackClient(core.BaseClient):
-    def __init__(self, *, provider):
+    def __init__(
+            self,
+            *,
+            provider,
+            executor: typing.Optional[concurrent.futures.Executor] = None,
+            max_workers: typing.Optional[int] = None,
+            keyed_serial: bool = False,
+    ):
+        """
+        :param executor: The executor in which callbacks are run. May be shared between
+            several clients. By default, a thread-pool of ``max_workers`` is created.
+        :param max_workers: The number of workers of the default thread-pool (default 1).
+            Callbacks must be thread-safe when there is more than one worker.
+        :param keyed_serial: If True, the callbacks of any one subscription are run
+            strictly in order, whilst callbacks of different subscriptions may run in
+            parallel. Recommended whenever the executor has more than one worker.
+
+        """
         super().__init__(provider=provider)
-        # The thread-pool in which callbacks are run. By default, we have just one worker in the
-        # pool, this could be more workers if thread-safe callbacks. Should be user configurable.
-        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        if executor is not None and max_workers is not None:
+            raise ValueError("Only one of 'executor' and 'max_workers' may be given")
+        if executor is None:
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers or 1)
+        #: The executor in which callbacks are run.
+        self._pool = executor
+        self._keyed_pool: typing.Optional[KeyedSerialExecutor] = (
+            KeyedSerialExecutor(executor) if keyed_serial else None
+        )
+
+    def _submit_subscription_callback(
+            self,
+            subs: CallbackSubscription,
+            response: "PropertyRetrievalResponse",
+    ) -> None:
+        subs._callback_submitted()
+        if self._keyed_pool is not None:
+            self._keyed_pool.submit(subs, subs._run_callback, response)
+        else:
+            self._pool.submit(subs._run_callback, response)
+        if subs.watermarks is not None:
+            subs.watermarks.update()
+        subs._update_delivery_watermarks()
 
     def get(
             self,
@@ -51,16 +122,49 @@ class CallbackClient(core.BaseClient):
             prop: str,
             callback: RetrievalCallback,
             selector: "SelectorArgumentType" = data.Selector(''),
+            max_age: typing.Optional[float] = None,
     ) -> None:
+        """
+        Get a device property.
+
+        If ``max_age`` is given (in seconds), and a subscription to the same query
+        is running, the last response of its (shared) stream is given to the callback instead
+        of making a request, provided it was acquired no more than ``max_age`` ago.
+
+        """
         selector = self._ensure_selector(selector)
         query = self._build_query(device, prop, selector)
-        future = self.provider._get_property(query)
+        if max_age is not None:
+            response = self._streamed_response(query, max_age)
+            if response is not None:
+                self._pool.submit(callback, response)
+                return
+        future = self._get_property(query)
 
         def run_callback(future):
             self._pool.submit(callback, future.result())
 
         future.add_done_callback(run_callback)
 
+    def get_many(
+            self,
+            queries: typing.Iterable["QueryArgumentType"],
+            *,
+            callback: RetrievalCallback,
+    ) -> None:
+        """
+        Get many device properties in one go. The callback is called once for
+        each response, as soon as that response is available.
+
+        """
+        futures = self._get_properties(self._ensure_queries(queries))
+
+        def run_callback(future):
+            self._pool.submit(callback, future.result())
+
+        for future in futures:
+            future.add_done_callback(run_callback)
+
     def set(
             self,
             *,
@@ -79,6 +183,26 @@ class CallbackClient(core.BaseClient):
 
         future.add_done_callback(run_callback)
 
+    def set_many(
+            self,
+            items: typing.Iterable[typing.Tuple["QueryArgumentType", typing.Any]],
+            *,
+            callback: UpdateCallback,
+    ) -> None:
+        """
+        Set many device properties in one go, given ``(query, value)`` pairs.
+        The callback is called once for each response, as soon as that response
+        is available.
+
+        """
+        futures = self.provider._set_properties(self._ensure_set_items(items))
+
+        def run_callback(future):
+            self._pool.submit(callback, future.result())
+
+        for future in futures:
+            future.add_done_callback(run_callback)
+
     def subscribe(  # type: ignore[override]
             self,
             *,
@@ -95,5 +219,5 @@ class CallbackClient(core.BaseClient):
             self,
             callback,
         )
-        self.subscriptions._subs.append(subs)
+        self.subscriptions._add_subscription(subs)
         return subs
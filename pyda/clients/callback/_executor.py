@@ -0,0 +1,84 @@
+import collections
+import concurrent.futures
+import threading
+import typing
+
+
+class KeyedSerialExecutor:
+    """
+    Runs the tasks submitted with the same key strictly one after the other, in
+    submission order, whilst tasks of different keys may run in parallel across
+    the workers of the underlying executor.
+
+    """
+    #: The maximum number of tasks of one key which run before the worker is given
+    #: back to the underlying executor (so that busy keys cannot starve others).
+    max_batch = 32
+
+    def __init__(self, executor: concurrent.futures.Executor):
+        self._executor = executor
+        self._lock = threading.Lock()
+        #: The pending tasks of each key. A key is present for as long as there is a
+        #: runner (in the underlying executor) responsible for its tasks.
+        self._pending: typing.Dict[typing.Hashable, typing.Deque[typing.Tuple[
+            concurrent.futures.Future, typing.Callable, typing.Tuple,
+        ]]] = {}
+
+    @property
+    def executor(self) -> concurrent.futures.Executor:
+        return self._executor
+
+    def submit(
+            self,
+            key: typing.Hashable,
+            fn: typing.Callable,
+            *args: typing.Any,
+    ) -> concurrent.futures.Future:
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is not None:
+                pending.append((future, fn, args))
+                return future
+            self._pending[key] = collections.deque([(future, fn, args)])
+        try:
+            self._executor.submit(self._run, key)
+        except BaseException as exc:
+            # No runner will ever be responsible for this key: release it, and fail
+            # the tasks which were queued behind this one in the meantime.
+            with self._lock:
+                pending = self._pending.pop(key)
+            for queued, _, _ in pending:
+                if queued is not future and queued.set_running_or_notify_cancel():
+                    queued.set_exception(exc)
+            raise
+        return future
+
+    def _run(self, key: typing.Hashable) -> None:
+        while self._run_batch(key):
+            try:
+                # Yield the worker, and continue with the remaining tasks of this key later.
+                self._executor.submit(self._run, key)
+                return
+            except RuntimeError:
+                # The executor is shutting down: finish the remaining tasks in this worker.
+                continue
+
+    def _run_batch(self, key: typing.Hashable) -> bool:
+        # Returns True if there are remaining tasks for the key.
+        for _ in range(self.max_batch):
+            with self._lock:
+                pending = self._pending[key]
+                if not pending:
+                    del self._pending[key]
+                    return False
+                future, fn, args = pending.popleft()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = fn(*args)
+            except BaseException as exc:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+        return True
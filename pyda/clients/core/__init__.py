@@ -1,5 +1,15 @@
-from ._core import BaseClient, BaseSubscription, BaseSubscriptionPool
+from ._core import (
+    BaseClient,
+    BaseSubscription,
+    BaseSubscriptionPool,
+    OverflowPolicy,
+    Watermarks,
+)
+from ._metrics import LatencyHistogram
 
 BaseClient.__module__ = __name__
 BaseSubscription.__module__ = __name__
 BaseSubscriptionPool.__module__ = __name__
+LatencyHistogram.__module__ = __name__
+OverflowPolicy.__module__ = __name__
+Watermarks.__module__ = __name__
@@ -1,13 +1,121 @@
+import concurrent.futures
+import enum
+import threading
+import time
 import typing
 
 from ... import data
+from ...providers._registry import in_flight_gets, stream_registry
+from ...tracing import _tracing
+from ._metrics import LatencyHistogram
 
 if typing.TYPE_CHECKING:
     from ...data import PropertyAccessQuery, PropertyRetrievalResponse
-    from ...providers._core import BasePropertyStream, BaseProvider
+    from ...providers._core import (
+        BasePropertyStream,
+        BaseProvider,
+        StreamResponseHandlerProtocol,
+    )
     from ...providers._middleware import StreamMiddleware
 
     SelectorArgumentType = typing.Union[str, data.Selector]
+    #: A query may be given either fully formed, or as a mapping of the
+    #: ``device``, ``prop`` and (optional) ``selector`` arguments.
+    QueryArgumentType = typing.Union[PropertyAccessQuery, typing.Mapping[str, typing.Any]]
+
+
+class OverflowPolicy(enum.Enum):
+    """
+    What a bounded subscription queue does with a new response when it is full.
+
+    """
+    #: Wait until there is space in the queue (the default).
+    BLOCK = 'block'
+    #: Discard the oldest queued response to make space for the new one.
+    DROP_OLDEST = 'drop-oldest'
+    #: Discard the new response.
+    DROP_NEWEST = 'drop-newest'
+    #: Only ever hold the latest response (the queue size is forced to 1).
+    KEEP_LATEST = 'keep-latest'
+
+
+class Watermarks:
+    """
+    The high and low watermarks of the queue depth of a subscription (or pool).
+
+    The owner is congested once its ``queue_depth`` reaches ``high``, until it has
+    drained to ``low`` (by default, half of ``high``). Each change is signalled
+    to the property streams feeding the owner, which then hold back their source.
+
+    """
+    def __init__(self, owner: typing.Any, high: int, low: typing.Optional[int] = None):
+        if low is None:
+            low = high // 2
+        if not 0 <= low < high:
+            raise ValueError(
+                f"The watermarks must satisfy 0 <= low < high. Got low={low}, high={high}",
+            )
+        self._owner = owner
+        self.high = high
+        self.low = low
+        self.congested = False
+        # Re-entrant, as signalling may deliver (conflated) responses to the owner.
+        self._lock = threading.RLock()
+
+    def update(self) -> None:
+        """Check the depth of the owner's queue, signalling any change of congestion."""
+        # Checked without the lock first, as this is done for every response.
+        depth = self._depth()
+        if (depth > self.low) if self.congested else (depth < self.high):
+            return
+        with self._lock:
+            depth = self._depth()
+            congested = (depth > self.low) if self.congested else (depth >= self.high)
+            if congested != self.congested:
+                self.congested = congested
+                self._signal(congested)
+
+    def release(self) -> None:
+        """Signal the end of any congestion, such as when the watermarks are replaced."""
+        with self._lock:
+            if self.congested:
+                self.congested = False
+                self._signal(False)
+
+    def _depth(self) -> int:
+        return self._owner.queue_depth
+
+    def _signal(self, congested: bool) -> None:
+        self._owner._signal_backpressure(congested)
+
+
+class _DeliveryWatermarks(Watermarks):
+    """
+    Private watermarks of the responses delivered to a subscription which have
+    not been consumed yet, wherever they are waiting (in the subscription's own
+    queue, or in that of its pool), which are signalled to a single stream.
+
+    These are used by stream stages (such as conflation) which are driven by the
+    consumer, independently of the watermarks set by the user.
+
+    """
+    def __init__(
+            self,
+            owner: "BaseSubscription",
+            stream: "BasePropertyStream",
+            high: int,
+            low: typing.Optional[int] = None,
+    ):
+        super().__init__(owner, high, low)
+        self._stream = stream
+
+    def _depth(self) -> int:
+        return self._owner._delivery_depth
+
+    def _signal(self, congested: bool) -> None:
+        # The watermarks themselves are the consumer, so that the congestion they signal
+        # is distinct from that of the subscription's own watermarks.
+        self._stream._backpressure(self, congested)
 
 
 class BaseSubscription:
@@ -18,14 +126,139 @@ class BaseSubscription:
     def __init__(self, property_stream: "BasePropertyStream", query: "PropertyAccessQuery"):
         self._property_stream = property_stream
         self._query = query
+        self._latest: typing.Optional["PropertyRetrievalResponse"] = None
+        #: Handlers which are given every response received by this subscription.
+        self._attached: typing.Tuple["StreamResponseHandlerProtocol", ...] = ()
+        #: The number of responses received, and how many of them were errors.
+        self.received = 0
+        self.errors = 0
+        #: The latencies from acquisition to the delivery of responses to the consumer.
+        self.latency = LatencyHistogram()
+        self.watermarks: typing.Optional[Watermarks] = None
+        #: The private watermarks of the delivery to the consumer, by the stream they signal.
+        self._delivery_watermarks: typing.Dict[typing.Any, _DeliveryWatermarks] = {}
 
     @property
     def query(self) -> "PropertyAccessQuery":
         return self._query
 
+    def latest(self) -> typing.Optional["PropertyRetrievalResponse"]:
+        """
+        The most recent response received by this subscription (None if there
+        has been none yet). Does not block, nor consume anything from any queue.
+
+        """
+        return self._latest
+
+    def attach(self, handler: "StreamResponseHandlerProtocol") -> None:
+        """
+        Pass every response received by this subscription to the given handler
+        too (such as a :class:`~pyda.data.FieldHistory`), in the thread in which
+        it is received.
+
+        """
+        self._attached = self._attached + (handler,)
+
+    def detach(self, handler: "StreamResponseHandlerProtocol") -> None:
+        self._attached = tuple(attached for attached in self._attached if attached is not handler)
+
+    def set_watermarks(self, high: typing.Optional[int], low: typing.Optional[int] = None) -> None:
+        """
+        Apply backpressure to the property stream of this subscription whilst
+        ``high`` (or more) responses are waiting to be delivered to the consumer,
+        until no more than ``low`` are. The stream then pauses its source, or
+        conflates its responses. Passing None for ``high`` removes the watermarks.
+
+        """
+        previous = self.watermarks
+        self.watermarks = None if high is None else Watermarks(self, high, low)
+        if previous is not None:
+            previous.release()
+        if self.watermarks is not None:
+            self.watermarks.update()
+
+    def _signal_backpressure(self, congested: bool) -> None:
+        self._property_stream._backpressure(self, congested)
+
+    def _watch_delivery(
+            self,
+            stream: "BasePropertyStream",
+            high: int,
+            low: typing.Optional[int] = None,
+    ) -> None:
+        """
+        Signal backpressure to the given stream whilst ``high`` (or more) responses
+        delivered to this subscription have not been consumed (see ``_delivery_depth``),
+        until no more than ``low`` are. The user's watermarks are unaffected.
+
+        """
+        self._unwatch_delivery(stream)
+        watermarks = _DeliveryWatermarks(self, stream, high, low)
+        self._delivery_watermarks = {**self._delivery_watermarks, stream: watermarks}
+        self._delivery_watermarks_changed()
+        watermarks.update()
+
+    def _unwatch_delivery(self, stream: "BasePropertyStream") -> None:
+        watermarks = self._delivery_watermarks.get(stream)
+        if watermarks is not None:
+            self._delivery_watermarks = {
+                watched: other for watched, other in self._delivery_watermarks.items()
+                if watched is not stream
+            }
+            self._delivery_watermarks_changed()
+            watermarks.release()
+
+    def _delivery_watermarks_changed(self) -> None:
+        # Subscriptions whose queues check the watermarks should update them here.
+        pass
+
+    def _update_delivery_watermarks(self) -> None:
+        for watermarks in self._delivery_watermarks.values():
+            watermarks.update()
+
+    @property
+    def _delivery_depth(self) -> int:
+        # The number of responses delivered to this subscription which have not been
+        # consumed yet, including those waiting in the queue of its pool.
+        return self.queue_depth
+
+    @property
+    def dropped(self) -> int:
+        """The number of responses which have been discarded (by overflow policies)."""
+        return 0
+
+    @property
+    def queue_depth(self) -> int:
+        """The number of responses waiting to be delivered to the consumer."""
+        return 0
+
+    def metrics(self) -> typing.Dict[str, typing.Any]:
+        return {
+            'query': str(self._query),
+            'received': self.received,
+            'errors': self.errors,
+            'dropped': self.dropped,
+            'queue_depth': self.queue_depth,
+            'latency': self.latency.snapshot(),
+        }
+
     def _response_received(self, response: "PropertyRetrievalResponse"):
-        # Dummy method for now to implement the StreamResponseHandlerProtocol protocol.
-        return self.subs_response_received(response)
+        # Implements the StreamResponseHandlerProtocol protocol.
+        self._latest = response
+        self.received += 1
+        # (The attribute rather than the property, as this is done for every response.)
+        if getattr(response, '_exception', None) is not None:
+            self.errors += 1
+        for handler in self._attached:
+            handler._response_received(response)
+        if _tracing._HOOKS:
+            _tracing._emit(_tracing.SUBSCRIPTION_ENQUEUE, _tracing.BEGIN, self._query)
+            try:
+                self.subs_response_received(response)
+            finally:
+                _tracing._emit(_tracing.SUBSCRIPTION_ENQUEUE, _tracing.END, self._query)
+        else:
+            self.subs_response_received(response)
 
     def subs_response_received(self, response: "PropertyRetrievalResponse"):
         # Called when the property stream has received data. For immediate
@@ -55,14 +288,93 @@ class BaseSubscriptionPool:
     """
     def __init__(self):
         self._subs: typing.List[BaseSubscription] = []
+        self._attached: typing.List["StreamResponseHandlerProtocol"] = []
+        #: The latencies from acquisition to the delivery of responses through the pool.
+        self.latency = LatencyHistogram()
+        self.watermarks: typing.Optional[Watermarks] = None
 
     def _add_subscription(self, subs: BaseSubscription):
         self._subs.append(subs)
+        for handler in self._attached:
+            subs.attach(handler)
+        watermarks = self.watermarks
+        if watermarks is not None:
+            with watermarks._lock:
+                if watermarks.congested:
+                    subs._property_stream._backpressure(self, True, subs)
+
+    def set_watermarks(self, high: typing.Optional[int], low: typing.Optional[int] = None) -> None:
+        """
+        Apply backpressure to the property streams of the subscriptions of this
+        pool whilst ``high`` (or more) responses are waiting in the pool's queue,
+        until no more than ``low`` are. Passing None for ``high`` removes the watermarks.
+
+        """
+        previous = self.watermarks
+        self.watermarks = None if high is None else Watermarks(self, high, low)
+        if previous is not None:
+            previous.release()
+        if self.watermarks is not None:
+            self.watermarks.update()
+
+    def _signal_backpressure(self, congested: bool) -> None:
+        for subs in list(self._subs):
+            subs._property_stream._backpressure(self, congested, subs)
+
+    def attach(self, handler: "StreamResponseHandlerProtocol") -> None:
+        """
+        Pass every response received by the subscriptions of this pool (current
+        and future) to the given handler too.
+
+        """
+        self._attached.append(handler)
+        for subs in self._subs:
+            subs.attach(handler)
+
+    def detach(self, handler: "StreamResponseHandlerProtocol") -> None:
+        self._attached.remove(handler)
+        for subs in self._subs:
+            subs.detach(handler)
+
+    @property
+    def subscriptions(self) -> typing.Tuple[BaseSubscription, ...]:
+        """The subscriptions of the pool."""
+        return tuple(self._subs)
+
+    @property
+    def received(self) -> int:
+        """The number of responses received by the subscriptions of the pool."""
+        return sum(subs.received for subs in self.subscriptions)
+
+    @property
+    def errors(self) -> int:
+        """The number of the received responses which carry an exception."""
+        return sum(subs.errors for subs in self.subscriptions)
+
+    @property
+    def dropped(self) -> int:
+        """The number of responses which have been discarded (by overflow policies)."""
+        return 0
+
+    @property
+    def queue_depth(self) -> int:
+        """The number of responses waiting to be delivered to the consumer."""
+        return 0
+
+    def metrics(self) -> typing.Dict[str, typing.Any]:
+        return {
+            'received': self.received,
+            'errors': self.errors,
+            'dropped': self.dropped,
+            'queue_depth': self.queue_depth,
+            'latency': self.latency.snapshot(),
+        }
 
 
 class BaseClient:
     def __init__(self, *, provider: "BaseProvider"):
         self._provider = provider
+        self._in_flight_gets = in_flight_gets(provider)
         self.subscriptions = BaseSubscriptionPool()
         self._stream_middlewares: typing.List[StreamMiddleware] = []
 
@@ -84,8 +396,64 @@ class BaseClient:
     def provider(self) -> "BaseProvider":
         return self._provider
 
+    def metrics(self) -> typing.Dict[str, typing.Any]:
+        """
+        A snapshot of the metrics of the client: of each of its subscriptions, of its
+        subscription pool, and of the (shared) property streams of its provider.
+
+        """
+        pool = self.subscriptions
+        subscriptions = pool.subscriptions
+        latency = pool.latency
+        for subs in subscriptions:
+            latency = latency.merge(subs.latency)
+        return {
+            'received': sum(subs.received for subs in subscriptions),
+            'errors': sum(subs.errors for subs in subscriptions),
+            'dropped': sum(subs.dropped for subs in subscriptions) + pool.dropped,
+            'latency': latency.snapshot(),
+            'subscriptions': [subs.metrics() for subs in subscriptions],
+            'pool': pool.metrics(),
+            'streams': [
+                stream.metrics() for stream in stream_registry(self.provider).active_streams()
+            ],
+            'gets': {
+                'coalesced': self._in_flight_gets.coalesced,
+                'in_flight': self._in_flight_gets.in_flight(),
+            },
+        }
+
+    def _get_property(self, query: data.PropertyAccessQuery) -> concurrent.futures.Future:
+        # Concurrent gets of identical queries (across all of the clients of the
+        # provider) share a single request to the provider.
+        return self._in_flight_gets.get_property(query)
+
+    def _get_properties(
+            self,
+            queries: typing.Sequence[data.PropertyAccessQuery],
+    ) -> typing.List[concurrent.futures.Future]:
+        return self._in_flight_gets.get_properties(queries)
+
+    def _streamed_response(
+            self,
+            query: data.PropertyAccessQuery,
+            max_age: float,
+    ) -> typing.Optional["PropertyRetrievalResponse"]:
+        # The last response of an active stream of the query, if it was acquired
+        # no more than max_age seconds ago.
+        stream = stream_registry(self.provider).active_stream(query)
+        response = stream.latest if stream is not None else None
+        if response is None or response.exception is not None:
+            return None
+        stamp = response.value.header.acquisition_timestamp
+        if stamp is None or time.time_ns() - stamp > max_age * 1e9:
+            return None
+        return response
+
     def _create_property_stream(self, query: data.PropertyAccessQuery) -> "BasePropertyStream":
-        data_stream = self.provider._create_property_stream(query)
+        # Identical queries share the same upstream stream (across all of the clients
+        # of the provider). Middlewares are then applied for this client only.
+        data_stream: "BasePropertyStream" = stream_registry(self.provider).property_stream(query)
         for middleware in self._stream_middlewares:
             data_stream = middleware.wrap_stream(data_stream)
         return data_stream
@@ -95,6 +463,24 @@ class BaseClient:
             return data.Selector(selector)
         return selector
 
+    def _ensure_query(self, query: "QueryArgumentType") -> data.PropertyAccessQuery:
+        if isinstance(query, data.PropertyAccessQuery):
+            return query
+        selector = self._ensure_selector(query.get('selector', data.Selector('')))
+        return self._build_query(query['device'], query['prop'], selector)
+
+    def _ensure_queries(
+            self,
+            queries: typing.Iterable["QueryArgumentType"],
+    ) -> typing.List[data.PropertyAccessQuery]:
+        return [self._ensure_query(query) for query in queries]
+
+    def _ensure_set_items(
+            self,
+            items: typing.Iterable[typing.Tuple["QueryArgumentType", typing.Any]],
+    ) -> typing.List[typing.Tuple[data.PropertyAccessQuery, typing.Any]]:
+        return [(self._ensure_query(query), value) for query, value in items]
+
     def _build_subscription(self, stream: "BasePropertyStream", query: "PropertyAccessQuery"):
         return BaseSubscription(stream, query)
 
@@ -0,0 +1,101 @@
+import bisect
+import time
+import typing
+
+if typing.TYPE_CHECKING:
+    from ...data import PropertyRetrievalResponse
+
+
+#: The upper bounds (in seconds) of the buckets of the latency histograms. Latencies
+#: greater than the last bound are counted in a final, unbounded, bucket.
+LATENCY_BUCKETS: typing.Tuple[float, ...] = (
+    1e-5, 2.5e-5, 5e-5,
+    1e-4, 2.5e-4, 5e-4,
+    1e-3, 2.5e-3, 5e-3,
+    1e-2, 2.5e-2, 5e-2,
+    0.1, 0.25, 0.5,
+    1., 2.5, 5., 10.,
+)
+
+
+class LatencyHistogram:
+    """
+    A histogram of latencies with fixed buckets, cheap enough to be recorded
+    for every response.
+
+    The counts are plain integers, updated without locking, so a snapshot taken
+    whilst responses are being recorded is not necessarily consistent.
+
+    """
+    def __init__(self, bounds: typing.Sequence[float] = LATENCY_BUCKETS):
+        self._bounds = tuple(bounds)
+        # The bounds are compared in integer nanoseconds, which is cheaper.
+        self._bounds_ns = tuple(round(bound * 1e9) for bound in self._bounds)
+        self._counts = [0] * (len(self._bounds) + 1)
+        self.count = 0
+        self._total_ns = 0
+
+    @property
+    def total(self) -> float:
+        """The sum of the observed latencies, in seconds."""
+        return self._total_ns / 1e9
+
+    def observe(self, seconds: float) -> None:
+        self.observe_ns(round(seconds * 1e9))
+
+    def observe_ns(self, nanoseconds: int) -> None:
+        self._counts[bisect.bisect_left(self._bounds_ns, nanoseconds)] += 1
+        self.count += 1
+        self._total_ns += nanoseconds
+
+    def observe_response(self, response: "PropertyRetrievalResponse") -> None:
+        """Record the time since the acquisition of the given response."""
+        try:
+            stamp = response.acquisition_timestamp
+        except AttributeError:
+            # Not a response (such as the values given to subscriptions in tests).
+            return
+        if stamp is not None:
+            # observe_ns, inlined.
+            nanoseconds = time.time_ns() - stamp
+            self._counts[bisect.bisect_left(self._bounds_ns, nanoseconds)] += 1
+            self.count += 1
+            self._total_ns += nanoseconds
+
+    def merge(self, other: "LatencyHistogram") -> "LatencyHistogram":
+        """A new histogram with the counts of this histogram and the other."""
+        if other._bounds != self._bounds:
+            raise ValueError('Only histograms with the same buckets can be merged')
+        merged = LatencyHistogram(self._bounds)
+        merged._counts = [a + b for a, b in zip(self._counts, other._counts)]
+        merged.count = self.count + other.count
+        merged._total_ns = self._total_ns + other._total_ns
+        return merged
+
+    def quantile(self, q: float) -> typing.Optional[float]:
+        """
+        The upper bound of the bucket containing the given quantile (None if
+        there have been no observations, or if it is beyond the last bound).
+
+        """
+        counts = list(self._counts)
+        target = q * sum(counts)
+        if not target:
+            return None
+        cumulative = 0
+        for bound, count in zip(self._bounds, counts):
+            cumulative += count
+            if cumulative >= target:
+                return bound
+        return None
+
+    def snapshot(self) -> typing.Dict[str, typing.Any]:
+        counts = list(self._counts)
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else None,
+            'p50': self.quantile(0.5),
+            'p99': self.quantile(0.99),
+            # The count of each bucket, by its upper bound (None for the unbounded bucket).
+            'buckets': dict(zip(self._bounds + (None,), counts)),
+        }
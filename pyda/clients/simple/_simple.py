@@ -3,6 +3,7 @@ import typing
 
 from .. import core
 from ... import data
+from ...tracing import _tracing
 
 if typing.TYPE_CHECKING:
     from ...data import (
@@ -11,7 +12,57 @@ if typing.TYPE_CHECKING:
         PropertyUpdateResponse,
     )
     from ...providers._core import BasePropertyStream
-    from ..core._core import SelectorArgumentType
+    from ..core._core import QueryArgumentType, SelectorArgumentType
+
+
+class ResponseQueue(queue.Queue):
+    """
+    A (thread-safe) queue of responses, which applies an overflow policy when bounded.
+
+    """
+    def __init__(
+            self,
+            maxsize: int = 0,
+            overflow: core.OverflowPolicy = core.OverflowPolicy.BLOCK,
+    ):
+        overflow = core.OverflowPolicy(overflow)
+        if overflow is core.OverflowPolicy.KEEP_LATEST:
+            maxsize = 1
+        super().__init__(maxsize)
+        self.overflow = overflow
+        #: The number of responses which have been discarded because of the overflow policy.
+        self.dropped = 0
+        #: The watermarks of the subscription (or pool) whose queue this is, if any.
+        self.watermarks: typing.Optional[core.Watermarks] = None
+        #: The private delivery watermarks of the subscriptions which this queue is enabled for.
+        self.delivery_watermarks: typing.Tuple[core.Watermarks, ...] = ()
+
+    def offer(self, item: typing.Any) -> None:
+        self._offer(item)
+        self.update_watermarks()
+
+    def update_watermarks(self) -> None:
+        """Check all of the watermarks depending on this queue, after its depth has changed."""
+        if self.watermarks is not None:
+            self.watermarks.update()
+        for watermarks in self.delivery_watermarks:
+            watermarks.update()
+
+    def _offer(self, item: typing.Any) -> None:
+        if self.maxsize <= 0 or self.overflow is core.OverflowPolicy.BLOCK:
+            self.put(item)
+            return
+        with self.mutex:
+            if self._qsize() >= self.maxsize:
+                self.dropped += 1
+                if self.overflow is core.OverflowPolicy.DROP_NEWEST:
+                    return
+                # Replace the oldest item. The number of unfinished tasks is unchanged.
+                self._get()
+            else:
+                self.unfinished_tasks += 1
+            self._put(item)
+            self.not_empty.notify()
 
 
 class SimpleSubscription(core.BaseSubscription):
@@ -19,20 +70,65 @@ class SimpleSubscription(core.BaseSubscription):
             self,
             property_stream: "BasePropertyStream",
             query: "PropertyAccessQuery",
+            *,
+            maxsize: int = 0,
+            overflow: core.OverflowPolicy = core.OverflowPolicy.BLOCK,
     ):
-        self._q: queue.Queue = queue.Queue()
-        self._enabled_queues: typing.List[queue.Queue] = []
+        self._q = ResponseQueue(maxsize, overflow)
+        self._enabled_queues: typing.List[ResponseQueue] = []
         super().__init__(property_stream, query)
 
+    @property
+    def dropped(self) -> int:
+        """The number of responses this subscription's queue has discarded."""
+        return self._q.dropped
+
+    @property
+    def queue_depth(self) -> int:
+        return self._q.qsize()
+
+    @property
+    def _delivery_depth(self) -> int:
+        return max((q.qsize() for q in self._enabled_queues), default=0)
+
+    def set_watermarks(self, high: typing.Optional[int], low: typing.Optional[int] = None) -> None:
+        super().set_watermarks(high, low)
+        self._q.watermarks = self.watermarks
+
+    def _delivery_watermarks_changed(self) -> None:
+        for q in self._enabled_queues:
+            self._sync_delivery_watermarks(q)
+
+    def _sync_delivery_watermarks(self, q: ResponseQueue) -> None:
+        # The queue keeps the delivery watermarks of the other subscriptions it is enabled for.
+        others = tuple(
+            watermarks for watermarks in q.delivery_watermarks
+            if watermarks._owner is not self
+        )
+        if q in self._enabled_queues:
+            others += tuple(self._delivery_watermarks.values())
+        q.delivery_watermarks = others
+
+    def _enable_queue(self, q: ResponseQueue) -> None:
+        self._enabled_queues.append(q)
+        self._sync_delivery_watermarks(q)
+        self._update_delivery_watermarks()
+
+    def _disable_queue(self, q: ResponseQueue) -> None:
+        self._enabled_queues.remove(q)
+        self._sync_delivery_watermarks(q)
+        # The responses left in the queue are no longer waiting to be delivered.
+        self._update_delivery_watermarks()
+
     def subs_response_received(self, response: "PropertyRetrievalResponse"):
         for q in self._enabled_queues:
-            q.put(response)
+            q.offer(response)
 
     def __enter__(self):
-        self._enabled_queues.append(self._q)
+        self._enable_queue(self._q)
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self._enabled_queues.remove(self._q)
+        self._disable_queue(self._q)
 
     def __iter__(self):
         # TODO: Check that the pool is doing this inside a managed context.
@@ -41,21 +137,43 @@ class SimpleSubscription(core.BaseSubscription):
     def __next__(self) -> "PropertyRetrievalResponse":
         response = self._q.get()
         self._q.task_done()
+        self._q.update_watermarks()
+        self.latency.observe_response(response)
+        if _tracing._HOOKS:
+            _tracing._emit(_tracing.SUBSCRIPTION_DEQUEUE, _tracing.INSTANT, self._query)
         return response
 
 
 class SimpleSubscriptionPool(core.BaseSubscriptionPool):
-    def __init__(self):
+    def __init__(
+            self,
+            *,
+            maxsize: int = 0,
+            overflow: core.OverflowPolicy = core.OverflowPolicy.BLOCK,
+    ):
         super().__init__()
-        self._q = queue.Queue()
+        self._q = ResponseQueue(maxsize, overflow)
+
+    @property
+    def dropped(self) -> int:
+        """The number of responses this pool's queue has discarded."""
+        return self._q.dropped
+
+    @property
+    def queue_depth(self) -> int:
+        return self._q.qsize()
+
+    def set_watermarks(self, high: typing.Optional[int], low: typing.Optional[int] = None) -> None:
+        super().set_watermarks(high, low)
+        self._q.watermarks = self.watermarks
 
     def __enter__(self):
         for sub in self._subs:
-            sub._enabled_queues.append(self._q)
+            sub._enable_queue(self._q)
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         for sub in self._subs:
-            sub._enabled_queues.remove(self._q)
+            sub._disable_queue(self._q)
 
     def __iter__(self):
         # TODO: Check that the pool is doing this inside a managed context.
@@ -64,14 +182,25 @@ class SimpleSubscriptionPool(core.BaseSubscriptionPool):
     def __next__(self):
         resp = self._q.get()
         self._q.task_done()
+        self._q.update_watermarks()
+        self.latency.observe_response(resp)
+        if _tracing._HOOKS:
+            name = getattr(resp, 'query', 'pool')
+            _tracing._emit(_tracing.SUBSCRIPTION_DEQUEUE, _tracing.INSTANT, name)
         return resp
 
 
 class SimpleClient(core.BaseClient):
-    def __init__(self, *, provider):
+    def __init__(
+            self,
+            *,
+            provider,
+            pool_maxsize: int = 0,
+            pool_overflow: core.OverflowPolicy = core.OverflowPolicy.BLOCK,
+    ):
         super().__init__(provider=provider)
         # TODO: Simplify by injecting the type into the base client.
-        self.subscriptions = SimpleSubscriptionPool()
+        self.subscriptions = SimpleSubscriptionPool(maxsize=pool_maxsize, overflow=pool_overflow)
 
     def get(
             self,
@@ -79,12 +208,37 @@ class SimpleClient(core.BaseClient):
             device: str,
             prop: str,
             selector: "SelectorArgumentType" = data.Selector(''),
+            max_age: typing.Optional[float] = None,
     ) -> "PropertyRetrievalResponse":
+        """
+        Get a device property.
+
+        If ``max_age`` is given (in seconds), and a subscription to the same query
+        is running, the last response of its (shared) stream is returned instead
+        of making a request, provided it was acquired no more than ``max_age`` ago.
+
+        """
         selector = self._ensure_selector(selector)
         query = self._build_query(device, prop, selector)
-        future = self.provider._get_property(query)
+        if max_age is not None:
+            response = self._streamed_response(query, max_age)
+            if response is not None:
+                return response
+        future = self._get_property(query)
         return future.result()
 
+    def get_many(
+            self,
+            queries: typing.Iterable["QueryArgumentType"],
+    ) -> typing.List["PropertyRetrievalResponse"]:
+        """
+        Get many device properties in one go, returning the responses in the
+        same order as the given queries.
+
+        """
+        futures = self._get_properties(self._ensure_queries(queries))
+        return [future.result() for future in futures]
+
     def set(
             self,
             *,
@@ -98,18 +252,34 @@ class SimpleClient(core.BaseClient):
         future = self.provider._set_property(query, value)
         return future.result()
 
+    def set_many(
+            self,
+            items: typing.Iterable[typing.Tuple["QueryArgumentType", typing.Any]],
+    ) -> typing.List["PropertyUpdateResponse"]:
+        """
+        Set many device properties in one go, given ``(query, value)`` pairs.
+        The responses are returned in the same order as the given items.
+
+        """
+        futures = self.provider._set_properties(self._ensure_set_items(items))
+        return [future.result() for future in futures]
+
     def subscribe(
             self,
             *,
             device: str,
             prop: str,
             selector: "SelectorArgumentType" = data.Selector(''),
+            maxsize: int = 0,
+            overflow: core.OverflowPolicy = core.OverflowPolicy.BLOCK,
     ) -> SimpleSubscription:
         selector = self._ensure_selector(selector)
         query = self._build_query(device, prop, selector)
         subs = SimpleSubscription(
             self._create_property_stream(query),
             query,
+            maxsize=maxsize,
+            overflow=overflow,
         )
-        self.subscriptions._subs.append(subs)
+        self.subscriptions._add_subscription(subs)
         return subs
@@ -1,5 +1,7 @@
 from ._data import (
     AcquiredPropertyData,
+    ConversionPlan,
+    CopyOnWriteData,
     Header,
     PropertyAccessError,
     PropertyAccessQuery,
@@ -7,13 +9,23 @@ from ._data import (
     PropertyUpdateResponse,
     Selector,
     UpdateHeader,
+    datetime64_from_headers,
 )
+from ._history import FieldHistory, HistoryWindow
+from ._recording import Recording, StreamRecorder
 
 AcquiredPropertyData.__module__ = __name__
+ConversionPlan.__module__ = __name__
+CopyOnWriteData.__module__ = __name__
+FieldHistory.__module__ = __name__
+HistoryWindow.__module__ = __name__
 PropertyAccessError.__module__ = __name__
 PropertyAccessQuery.__module__ = __name__
 PropertyRetrievalResponse.__module__ = __name__
 PropertyUpdateResponse.__module__ = __name__
+Recording.__module__ = __name__
+StreamRecorder.__module__ = __name__
 UpdateHeader.__module__ = __name__
 Header.__module__ = __name__
 Selector.__module__ = __name__
+datetime64_from_headers.__module__ = __name__
@@ -1,7 +1,9 @@
+import collections.abc
 import dataclasses
 import datetime
 from datetime import timezone
 import json
+import threading
 import typing
 
 import numpy as np
@@ -20,6 +22,9 @@ class Selector:
     def __eq__(self, other):
         return type(self) is type(other) and str(self) == str(other)
 
+    def __hash__(self):
+        return hash((type(self), str(self)))
+
     def __str__(self):
         return self._value
 
@@ -29,9 +34,15 @@ class Selector:
 
 class Header:
 
-    def __init__(self, context: pyds_model.AnyContext):
+    def __init__(self, context: typing.Union[pyds_model.AnyContext, "_StampContext"]):
         super().__init__()
         self._context = context
+        # The stamps, as exact integer nanoseconds.
+        self._acquisition_stamp = _ns_or_none(context.acquisition_stamp)
+        self._set_stamp = _ns_or_none(getattr(context, 'set_stamp', None))
+        self._cycle_stamp = _ns_or_none(getattr(context, 'cycle_stamp', None))
+        # The datetimes converted from the stamps (computed on first use), by stamp name.
+        self._times: typing.Dict[str, typing.Optional[datetime.datetime]] = {}
 
     @property
     def selector(self) -> typing.Optional[Selector]:
@@ -41,33 +52,39 @@ class Header:
         return selector
 
     @property
-    def acquisition_timestamp(self) -> float:
-        return self._context.acquisition_stamp
+    def acquisition_timestamp(self) -> typing.Optional[int]:
+        return self._acquisition_stamp
 
-    def acquisition_time(self) -> datetime.datetime:
-        return datetime_from_ns(self.acquisition_timestamp)
+    def acquisition_time(self) -> typing.Optional[datetime.datetime]:
+        return self._time('acquisition', self._acquisition_stamp)
 
     @property
-    def set_timestamp(self) -> typing.Optional[float]:
-        return getattr(self._context, 'set_stamp', None)
+    def set_timestamp(self) -> typing.Optional[int]:
+        return self._set_stamp
 
     def set_time(self) -> typing.Optional[datetime.datetime]:
-        timestamp = self.set_timestamp
-        return (
-            datetime_from_ns(timestamp)
-            if timestamp is not None else None
-        )
+        return self._time('set', self._set_stamp)
 
     @property
-    def cycle_timestamp(self) -> typing.Optional[float]:
-        return getattr(self._context, 'cycle_stamp', None)
+    def cycle_timestamp(self) -> typing.Optional[int]:
+        return self._cycle_stamp
 
     def cycle_time(self) -> typing.Optional[datetime.datetime]:
-        timestamp = self.cycle_timestamp
-        return (
-            datetime_from_ns(timestamp)
-            if timestamp is not None else None
-        )
+        return self._time('cycle', self._cycle_stamp)
+
+    def _time(
+            self,
+            name: str,
+            timestamp: typing.Optional[int],
+    ) -> typing.Optional[datetime.datetime]:
+        try:
+            return self._times[name]
+        except KeyError:
+            converted = self._times[name] = (
+                datetime_from_ns(timestamp)
+                if timestamp is not None else None
+            )
+            return converted
 
     def __str__(self):
         items = []
@@ -84,57 +101,173 @@ class Header:
         return f'[{", ".join(items)}]'
 
 
-def datetime_from_ns(timestamp: float) -> datetime.datetime:
-    sec = timestamp / 1e9
-    us = round((timestamp / 1e3) % 1e6)
-    dt = datetime.datetime.fromtimestamp(sec, tz=timezone.utc)
-    dt = dt.replace(microsecond=us)
-    return dt
+class _StampContext(typing.NamedTuple):
+    # The attributes of a context which a Header reads, for headers which are
+    # not built from a context of the control system (e.g. recorded or synthetic data).
+    acquisition_stamp: typing.Optional[int]
+    cycle_stamp: typing.Optional[int] = None
+    set_stamp: typing.Optional[int] = None
+    selector: typing.Optional[Selector] = None
+
+
+def _ns_or_none(timestamp: typing.Optional[typing.Any]) -> typing.Optional[int]:
+    return int(timestamp) if timestamp is not None else None
+
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def datetime_from_ns(timestamp: int) -> datetime.datetime:
+    # Exact integer arithmetic, rounding to the nearest microsecond (the
+    # resolution of a datetime).
+    us = (int(timestamp) + 500) // 1000
+    return _EPOCH + datetime.timedelta(microseconds=us)
+
+
+#: The int64 value of numpy.datetime64('NaT').
+_NAT = np.iinfo(np.int64).min
+
+
+def datetime64_from_headers(
+        headers: typing.Iterable[Header],
+        stamp: str = 'acquisition',
+) -> np.ndarray:
+    """
+    Convert the stamps of many headers into a ``datetime64[ns]`` array, in one go.
+
+    :param stamp: The stamp to convert. One of ``acquisition``, ``set`` or ``cycle``.
+        Headers which do not have such a stamp result in ``NaT``.
+
+    """
+    if stamp not in ('acquisition', 'set', 'cycle'):
+        raise ValueError(f"Unknown stamp {stamp!r}")
+    attr = f'_{stamp}_stamp'
+    stamps = (getattr(header, attr) for header in headers)
+    ns = np.fromiter((_NAT if value is None else value for value in stamps), dtype=np.int64)
+    return ns.view('datetime64[ns]')
 
 
 class AcquiredPropertyData:
     # Known as AcquiredParameterValue in UCAP
 
-    def __init__(self, dtv: pyds_model.DataTypeValue, header: Header):
+    def __init__(
+            self,
+            dtv: typing.Union[pyds_model.DataTypeValue, typing.Mapping[str, typing.Any]],
+            header: Header,
+    ):
         # TODO: Ensure we proxy all of the appropriate methods from DTV.
         self._dtv = dtv
         self._header = header
 
     def __getitem__(self, key):
-        # TODO: If a numpy type, make it read-only.
-        return self._dtv[key]
+        return _read_only(self._dtv[key])
 
     def __contains__(self, key):
         return key in self._dtv
 
     def get(self, key: str, default: typing.Optional[typing.Any] = None):
-        return self._dtv.get(key, default)
+        return _read_only(self._dtv.get(key, default))
 
     def keys(self) -> typing.Iterable[typing.Any]:
         return self._dtv.keys()
 
     def values(self) -> typing.Iterable[typing.Any]:
-        return self._dtv.values()
+        return [_read_only(value) for value in self._dtv.values()]
 
     def items(self) -> typing.Iterable[typing.Tuple[typing.Any, typing.Any]]:
-        return self._dtv.items()
+        return [(key, _read_only(value)) for key, value in self._dtv.items()]
 
     @property
     def header(self) -> Header:
         return self._header
 
     @property
-    def data_type(self) -> pyds_model.DataType:
+    def data_type(self) -> typing.Optional[pyds_model.DataType]:
         # TODO: This should be immutable.
-        return self._dtv.data_type
+        # Values which are not built from a DataTypeValue (such as recorded or
+        # synthetic data, whose fields are a plain mapping) have no data type.
+        return getattr(self._dtv, 'data_type', None)
 
-    def mutable_data(self) -> typing.Dict[str, typing.Any]:
-        return {k: v for k, v in self.items()}
+    def mutable_data(self) -> "CopyOnWriteData":
+        return CopyOnWriteData(self)
 
     def __str__(self):
         return f"{self.__class__.__qualname__} {self.header}\n{self._dtv}"
 
 
+def _read_only(value: typing.Any) -> typing.Any:
+    # A read-only view of numpy arrays (sharing the same memory), other values as-is.
+    if isinstance(value, np.ndarray) and value.flags.writeable:
+        value = value.view()
+        value.flags.writeable = False
+    return value
+
+
+class CopyOnWriteData(collections.abc.MutableMapping):
+    """
+    A mutable mapping of the fields of an :class:`AcquiredPropertyData`.
+
+    Fields which have not been assigned share the (read-only) data of the
+    original value. Only assigned fields, and those obtained with
+    :meth:`writable`, are held by the mapping itself.
+
+    """
+    def __init__(self, source: AcquiredPropertyData):
+        self._source = source
+        self._changed: typing.Dict[str, typing.Any] = {}
+        self._deleted: typing.Set[str] = set()
+
+    def __getitem__(self, key: str) -> typing.Any:
+        if key in self._changed:
+            return self._changed[key]
+        if key in self._deleted:
+            raise KeyError(key)
+        return self._source[key]
+
+    def __setitem__(self, key: str, value: typing.Any) -> None:
+        self._changed[key] = value
+        self._deleted.discard(key)
+
+    def __delitem__(self, key: str) -> None:
+        if key in self._changed:
+            del self._changed[key]
+            if key not in self._source:
+                return
+        elif key not in self._source or key in self._deleted:
+            raise KeyError(key)
+        self._deleted.add(key)
+
+    def __iter__(self) -> typing.Iterator[str]:
+        for key in self._source.keys():
+            if key not in self._changed and key not in self._deleted:
+                yield key
+        yield from self._changed
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    @property
+    def source(self) -> AcquiredPropertyData:
+        """The value whose fields are shared."""
+        return self._source
+
+    def writable(self, key: str) -> typing.Any:
+        """
+        Get a field for modification in-place. Array fields are copied the first
+        time, after which the same (writable) copy is returned.
+
+        """
+        if key not in self._changed:
+            value = self[key]
+            if isinstance(value, np.ndarray):
+                value = value.copy()
+            self[key] = value
+        return self._changed[key]
+
+    def __repr__(self):
+        return f'{self.__class__.__qualname__}({dict(self)!r})'
+
+
 class PropertyAccessError(Exception):
     # Known as ParameterException in UCAP
     # This is a placeholder for any relevant meta-information
@@ -158,6 +291,23 @@ class PropertyAccessQuery:
         return val
 
 
+#: The key of :func:`canonical_query_key`: the device, property and selector, followed
+#: by the (sorted) names and reprs of the data filters.
+QueryKey = typing.Tuple[str, str, str, typing.Tuple[typing.Tuple[str, str], ...]]
+
+
+def canonical_query_key(query: PropertyAccessQuery) -> QueryKey:
+    """
+    A hashable key which is equal for all queries which address the same data
+    (the same device, property, selector and data filters).
+
+    """
+    if not query.data_filters:
+        return (query.device, query.prop, str(query.selector), ())
+    filters = tuple(sorted((key, repr(value)) for key, value in query.data_filters.items()))
+    return (query.device, query.prop, str(query.selector), filters)
+
+
 class PropertyRetrievalResponse:
     # Known as FailSafeParameterValue in UCAP
 
@@ -195,6 +345,16 @@ class PropertyRetrievalResponse:
     def notification_type(self) -> typing.Optional[str]:
         return self._notification_type
 
+    @property
+    def acquisition_timestamp(self) -> typing.Optional[int]:
+        """
+        The acquisition stamp of the value, without raising for responses which
+        carry an exception (for which it is None).
+
+        """
+        value = self._value
+        return value._header._acquisition_stamp if value is not None else None
+
     def __str__(self):
         val = f"-- {self.__class__.__qualname__} from {self.query} --\n\n"
         try:
@@ -260,22 +420,257 @@ class PropertyUpdateResponse:
         return val
 
 
-def anydata_from_dict(value: typing.Dict) -> AnyData:
+class ConversionPlan:
+    """
+    The target numpy dtype of each field of a property, used when converting
+    dictionaries into AnyData.
+
+    A value is only cast to its planned dtype when nothing can be lost: when numpy's
+    ``safe`` casting rules allow it, or when it is a Python scalar (or list) which the
+    planned dtype represents exactly (e.g. ``1000`` to an ``int16`` field, but not to an
+    ``int8`` field, and ``0.5`` to a ``float32`` field, but not ``0.1``). Other values, and
+    fields which are not part of the plan, are inferred as usual. Arrays which already have
+    the planned dtype are not copied.
+
+    """
+    def __init__(
+            self,
+            dtypes: typing.Optional[typing.Mapping[str, typing.Optional[np.dtype]]] = None,
+    ):
+        #: The dtype of each field (None for fields which are always inferred, such as strings).
+        self._dtypes: typing.Dict[str, typing.Optional[np.dtype]] = dict(dtypes or {})
+
+    @classmethod
+    def from_value(
+            cls,
+            value: typing.Union["AcquiredPropertyData", typing.Mapping[str, typing.Any]],
+    ) -> "ConversionPlan":
+        """
+        Create a plan from an existing value of the property (such as one which
+        has been received), whose fields are typed according to its data type.
+
+        """
+        return cls({key: _plan_dtype(field) for key, field in value.items()})
+
+    @classmethod
+    def learn(
+            cls,
+            value: typing.Mapping[str, typing.Any],
+            known: typing.Optional["ConversionPlan"] = None,
+    ) -> "ConversionPlan":
+        """
+        Create a plan for the fields of the given value (such as a dictionary being set):
+        the dtypes of the ``known`` plan for the fields which it has, and otherwise
+        those inferred from the value itself.
+
+        """
+        dtypes = known._dtypes if known is not None else {}
+        return cls({
+            key: dtypes[key] if key in dtypes else _plan_dtype(np.asarray(field))
+            for key, field in value.items()
+        })
+
+    @property
+    def dtypes(self) -> typing.Mapping[str, typing.Optional[np.dtype]]:
+        return dict(self._dtypes)
+
+    def convert(self, field: str, value: typing.Any) -> typing.Any:
+        return _unwrap_0d(_cast(np.asarray(value), self._dtypes.get(field), value))
+
+    def convert_column(
+            self,
+            field: str,
+            values: typing.Sequence[typing.Any],
+    ) -> typing.List[typing.Any]:
+        """
+        Convert the values of one field of many dictionaries in one go.
+
+        Python values (scalars, or lists) of the same shape are converted together, and
+        the results are (numpy scalars, or) views onto a single array. Numpy values are
+        converted one by one, such that those which need no casting are kept as they are.
+
+        """
+        if any(isinstance(value, (np.ndarray, np.generic)) for value in values):
+            return [self.convert(field, value) for value in values]
+        first = np.asarray(values[0])
+        if not _same_shape(values, first.shape):
+            # Values of different shapes (ragged), which cannot be converted together.
+            return [self.convert(field, value) for value in values]
+        column = np.asarray(values)
+        if column.dtype != first.dtype:
+            # The values are not all alike, so must be converted one by one
+            # (e.g. a mix of int and float values, which would otherwise all be floats).
+            return [self.convert(field, value) for value in values]
+        dtype = self._dtypes.get(field)
+        if dtype is None or column.dtype == dtype:
+            return list(column)
+        if np.can_cast(column.dtype, dtype, 'safe') or _fits(column, dtype):
+            return list(column.astype(dtype))
+        # Some of the values may not fit, so each is cast (or inferred) on its own.
+        return [self.convert(field, value) for value in values]
+
+
+def _same_shape(values: typing.Sequence[typing.Any], shape: typing.Tuple[int, ...]) -> bool:
+    # Whether all of the (Python) values have the given shape. Checked on an object
+    # array, as numpy does not infer the dtype of ragged values without complaining.
+    if not shape:
+        return not any(isinstance(value, (list, tuple)) for value in values)
+    try:
+        objects = np.array(values, dtype=object)
+    except ValueError:
+        return False
+    return objects.shape == (len(values),) + shape
+
+
+def _plan_dtype(value: typing.Any) -> typing.Optional[np.dtype]:
+    # The dtype to plan for the given (converted) value. Text and object fields are
+    # not planned, as their dtypes (e.g. string length) are specific to each value.
+    if isinstance(value, (np.ndarray, np.generic)) and value.dtype.kind not in 'OUSV':
+        return value.dtype
+    return None
+
+
+def _scalar_fits(value: typing.Any, dtype: np.dtype) -> bool:
+    # Whether the Python scalar can be represented by the (non-float) dtype without overflowing.
+    if isinstance(value, int) and not isinstance(value, bool) and dtype.kind in 'iu':
+        info = np.iinfo(dtype)
+        return bool(info.min <= value <= info.max)
+    return bool(np.can_cast(np.min_scalar_type(value), dtype, 'safe'))
+
+
+def _fits(value: np.ndarray, dtype: np.dtype) -> bool:
+    # Whether the values of an array inferred from Python scalars (or lists of them)
+    # can all be represented exactly by the dtype.
+    if value.dtype.kind not in 'biufc':
+        return False
+    if value.size == 0:
+        return True
+    if dtype.kind in 'fc':
+        # Floats are never narrowed: every value must survive the cast unchanged
+        # (which the range of the values alone does not tell).
+        if value.dtype.kind == 'c' and dtype.kind != 'c':
+            return False
+        with np.errstate(over='ignore'):
+            cast = value.astype(dtype)
+        return bool(np.array_equal(cast, value, equal_nan=True))
+    return _scalar_fits(value.min().item(), dtype) and _scalar_fits(value.max().item(), dtype)
+
+
+def _cast(value: np.ndarray, dtype: typing.Optional[np.dtype], original: typing.Any) -> np.ndarray:
+    # Cast the converted value to the planned dtype, unless that would lose information
+    # (in which case the inferred value is kept, rather than truncating or overflowing).
+    if dtype is None or value.dtype == dtype:
+        return value
+    if np.can_cast(value.dtype, dtype, 'safe') or (
+            not isinstance(original, (np.ndarray, np.generic)) and _fits(value, dtype)):
+        return value.astype(dtype)
+    return value
+
+
+def _unwrap_0d(value: np.ndarray) -> typing.Any:
+    if value.ndim == 0:
+        # Take the scalar out of a 0-d array. Note that .item() will extract Python
+        # types, whereas we want to preserve numpy types (scalars).
+        return value[()]
+    return value
+
+
+class ConversionPlanCache:
+    """
+    The conversion plans of each device property (of a provider), by the fields
+    of the values being converted.
+
+    A plan is learned on first use of its fields, and then reused: from the plan
+    set for the property (as seeded from a value of the property which has been
+    received) for the fields it has, and otherwise inferred from the value itself.
+
+    """
+    def __init__(self):
+        #: The plans, by device property and fields.
+        self._plans: typing.Dict[
+            typing.Tuple[str, str, typing.Tuple[str, ...]], ConversionPlan,
+        ] = {}
+        #: The plans set for each device property.
+        self._property_plans: typing.Dict[typing.Tuple[str, str], ConversionPlan] = {}
+        self._lock = threading.Lock()
+
+    def has_plan(self, query: PropertyAccessQuery) -> bool:
+        """Whether a plan has been set for the device property of the query."""
+        return (query.device, query.prop) in self._property_plans
+
+    def plan_for(
+            self,
+            query: PropertyAccessQuery,
+            value: typing.Mapping[str, typing.Any],
+    ) -> ConversionPlan:
+        """The plan for values with the same fields as the given one."""
+        key = (query.device, query.prop, tuple(value.keys()))
+        plan = self._plans.get(key)
+        if plan is None:
+            known = self._property_plans.get(key[:2])
+            with self._lock:
+                plan = self._plans.setdefault(key, ConversionPlan.learn(value, known))
+        return plan
+
+    def set_plan(self, query: PropertyAccessQuery, plan: ConversionPlan) -> None:
+        """Set the plan of the device property, from which those of its fields are learned."""
+        prop_key = (query.device, query.prop)
+        with self._lock:
+            self._property_plans[prop_key] = plan
+            # The plans which were learned without it are learned again.
+            self._plans = {
+                key: learned for key, learned in self._plans.items() if key[:2] != prop_key
+            }
+
+
+def anydata_from_dict(
+        value: typing.Mapping,
+        plan: typing.Optional[ConversionPlan] = None,
+) -> AnyData:
     """
     Convert a dictionary into an AnyData using numpy type casting rules.
 
+    If a conversion plan is given, the fields are cast to their planned dtypes.
+
     """
-    # TODO: We will want to extend this transformation on a per-provider basis
-    #       when we have additional property metadata (including type info) as
-    #       this will allow us to make more informed decisions when converting
-    #       to numpy types.
     data: AnyData = AnyData.create()
 
     for k, v in value.items():
-        vs = np.array(v)
-        if vs.ndim == 0:
-            # Take the scalar out of a 0-d array. Note that .item() will extract Python
-            # types, whereas we want to preserve numpy types (scalars).
-            vs = vs[()]
-        data[k] = vs
+        if plan is not None:
+            data[k] = plan.convert(k, v)
+        else:
+            # Note: Arrays are not copied (unlike with np.array).
+            data[k] = _unwrap_0d(np.asarray(v))
     return data
+
+
+def anydata_from_dicts(
+        values: typing.Sequence[typing.Mapping],
+        plan: typing.Optional[ConversionPlan] = None,
+) -> typing.List[AnyData]:
+    """
+    Convert a sequence of dictionaries into AnyData instances, in the same order.
+
+    Dictionaries with the same fields are converted together, one (vectorized)
+    conversion per field.
+
+    """
+    by_schema: typing.Dict[typing.Tuple[str, ...], typing.List[int]] = {}
+    for i, value in enumerate(values):
+        by_schema.setdefault(tuple(value.keys()), []).append(i)
+
+    results: typing.List[typing.Optional[AnyData]] = [None] * len(values)
+    for fields, indices in by_schema.items():
+        if len(indices) == 1:
+            results[indices[0]] = anydata_from_dict(values[indices[0]], plan)
+            continue
+        # Without a plan, each field is inferred (as if converted one by one).
+        group_plan = plan if plan is not None else ConversionPlan()
+        group = [AnyData.create() for _ in indices]
+        for field in fields:
+            column = group_plan.convert_column(field, [values[i][field] for i in indices])
+            for data, converted in zip(group, column):
+                data[field] = converted
+        for i, data in zip(indices, group):
+            results[i] = data
+    return typing.cast(typing.List[AnyData], results)
@@ -0,0 +1,166 @@
+import logging
+import threading
+import typing
+
+import numpy as np
+
+from ._data import _fits
+
+if typing.TYPE_CHECKING:
+    from ._data import AcquiredPropertyData, PropertyRetrievalResponse
+
+LOG = logging.getLogger(__name__)
+
+
+class HistoryWindow(typing.NamedTuple):
+    #: The acquisition stamps (int64 nanoseconds) of the entries.
+    timestamps: np.ndarray
+    #: The values of each field, with the entries along the first axis.
+    fields: typing.Dict[str, np.ndarray]
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+
+class FieldHistory:
+    """
+    A fixed-capacity history of selected fields of :class:`AcquiredPropertyData`,
+    along with their acquisition stamps, held in preallocated numpy ring buffers.
+
+    Scalar fields are held as 1-D arrays, and array fields (which must keep the
+    same shape) as 2-D (or higher) arrays, with the entries along the first axis.
+
+    The dtype of each field is that of its first entry. Later values which cannot
+    be held by that dtype without loss (e.g. a float for an integer field) are
+    rejected, as are values without an acquisition stamp.
+
+    A history is a stream handler, so it can be attached to a subscription (or
+    pool), or started on any property stream. Responses which cannot be recorded
+    are skipped (and counted in :attr:`dropped`). Windows of the history are read-only
+    views of the buffers (no copy is made), which are overwritten as the history
+    wraps around: copy them if they are needed for longer.
+
+    """
+    def __init__(self, fields: typing.Sequence[str], capacity: int):
+        if capacity < 1:
+            raise ValueError(f"capacity must be a positive integer. Got {capacity}")
+        self._fields = tuple(fields)
+        self._capacity = capacity
+        self._lock = threading.Lock()
+        # Every entry is written twice, at i and i + capacity, such that any window
+        # of up to ``capacity`` entries is contiguous in the buffers.
+        self._timestamps = np.empty(2 * capacity, dtype=np.int64)
+        self._buffers: typing.Optional[typing.Dict[str, np.ndarray]] = None
+        #: The total number of entries which have been appended.
+        self._count = 0
+        #: The number of responses which were skipped, as they could not be recorded.
+        self._dropped = 0
+
+    @property
+    def fields(self) -> typing.Tuple[str, ...]:
+        return self._fields
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def dropped(self) -> int:
+        """The number of responses which were skipped, as they could not be recorded."""
+        return self._dropped
+
+    def __len__(self) -> int:
+        return min(self._count, self._capacity)
+
+    def _response_received(self, response: "PropertyRetrievalResponse") -> None:
+        if response.exception is not None:
+            return
+        try:
+            self.append(response.value)
+        except (KeyError, TypeError, ValueError) as exc:
+            with self._lock:
+                self._dropped += 1
+            LOG.warning(f'Unable to record {response.query} in the history: {exc}')
+
+    def append(self, value: "AcquiredPropertyData") -> None:
+        stamp = value.header.acquisition_timestamp
+        if stamp is None:
+            raise ValueError('The value has no acquisition stamp')
+        originals = [value[field] for field in self._fields]
+        field_values = [np.asarray(original) for original in originals]
+        with self._lock:
+            if self._buffers is None:
+                self._buffers = {
+                    field: np.empty((2 * self._capacity,) + field_value.shape, field_value.dtype)
+                    for field, field_value in zip(self._fields, field_values)
+                }
+            for field, field_value in zip(self._fields, field_values):
+                if field_value.shape != self._buffers[field].shape[1:]:
+                    raise ValueError(
+                        f'Field {field!r} has shape {field_value.shape}, but the history '
+                        f'holds {self._buffers[field].shape[1:]}',
+                    )
+            for field, field_value, original in zip(self._fields, field_values, originals):
+                dtype = self._buffers[field].dtype
+                if not _holds(dtype, field_value, original):
+                    raise ValueError(
+                        f'Field {field!r} has dtype {field_value.dtype}, which the history '
+                        f'cannot hold as {dtype} without loss',
+                    )
+            i = self._count % self._capacity
+            for field, field_value in zip(self._fields, field_values):
+                buffer = self._buffers[field]
+                buffer[i] = buffer[i + self._capacity] = field_value
+            self._timestamps[i] = self._timestamps[i + self._capacity] = stamp
+            self._count += 1
+
+    def last(self, n: typing.Optional[int] = None) -> HistoryWindow:
+        """
+        The (up to) ``n`` most recent entries, oldest first. All entries if ``n`` is None.
+
+        """
+        with self._lock:
+            size = len(self)
+            n = size if n is None else max(0, min(n, size))
+            end = self._count % self._capacity + self._capacity
+            return self._window(end - n, end)
+
+    def between(self, start: int, end: int) -> HistoryWindow:
+        """
+        The entries with acquisition stamps (nanoseconds) in ``[start, end)``.
+
+        The entries are expected to have been appended in order of acquisition stamp.
+
+        """
+        with self._lock:
+            stop = self._count % self._capacity + self._capacity
+            first = stop - len(self)
+            timestamps = self._timestamps[first:stop]
+            lo, hi = np.searchsorted(timestamps, [start, end], side='left')
+            return self._window(first + int(lo), first + int(hi))
+
+    def _window(self, start: int, stop: int) -> HistoryWindow:
+        # Called with the lock held.
+        timestamps = _read_only_view(self._timestamps[start:stop])
+        if self._buffers is None:
+            fields = {field: np.empty(0) for field in self._fields}
+        else:
+            fields = {
+                field: _read_only_view(buffer[start:stop])
+                for field, buffer in self._buffers.items()
+            }
+        return HistoryWindow(timestamps, fields)
+
+
+def _holds(dtype: np.dtype, value: np.ndarray, original: typing.Any) -> bool:
+    # Whether the value can be written into a buffer of the given dtype without loss,
+    # using the same rules as the conversion plans.
+    if value.dtype == dtype or np.can_cast(value.dtype, dtype, 'safe'):
+        return True
+    return not isinstance(original, (np.ndarray, np.generic)) and _fits(value, dtype)
+
+
+def _read_only_view(array: np.ndarray) -> np.ndarray:
+    view = array.view()
+    view.flags.writeable = False
+    return view
@@ -0,0 +1,367 @@
+import json
+import logging
+import mmap
+import os
+import pathlib
+import threading
+import typing
+
+import numpy as np
+
+from ._data import (
+    AcquiredPropertyData,
+    Header,
+    PropertyAccessQuery,
+    PropertyRetrievalResponse,
+    Selector,
+    _StampContext,
+)
+
+LOG = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+META_FILE = 'meta.json'
+RECORDS_FILE = 'records.bin'
+DATA_FILE = 'data.bin'
+INDEX_FILE = 'index.bin'
+
+#: The stamp recorded for a stamp which a header does not have.
+MISSING_STAMP = np.iinfo(np.int64).min
+
+#: One fixed-size record per response. The fields of the response are in the data
+#: file, at ``offset``, laid out as described by the schema.
+RECORD_DTYPE = np.dtype([
+    ('acquisition_stamp', '<i8'),
+    ('cycle_stamp', '<i8'),
+    ('set_stamp', '<i8'),
+    ('offset', '<u8'),
+    ('length', '<u8'),
+    ('query', '<u4'),
+    ('schema', '<u4'),
+    # The selector of the header, or -1 if the header has none.
+    ('selector', '<i4'),
+    # Reserved for future use.
+    ('flags', '<u4'),
+])
+
+#: One entry per block of records, with the range of acquisition stamps in the block.
+INDEX_DTYPE = np.dtype([
+    ('record', '<u8'),
+    ('min_stamp', '<i8'),
+    ('max_stamp', '<i8'),
+])
+
+# The fields are 8-byte aligned in the data file, so that they can be viewed in place.
+_ALIGNMENT = 8
+
+_Schema = typing.Tuple[typing.Tuple[str, str, typing.Tuple[int, ...]], ...]
+
+
+class StreamRecorder:
+    """
+    Records the responses of property streams to an append-only directory,
+    which can be read back with :class:`Recording`.
+
+    A recorder is a stream handler, so it can be started on any property stream,
+    or attached to a subscription (or pool). Streams only hold weak references to
+    their handlers, so a reference to the recorder must be kept while recording.
+    Responses carrying an exception are not recorded.
+
+    """
+    def __init__(self, path: typing.Union[str, "os.PathLike[str]"], *, index_interval: int = 1024):
+        if index_interval < 1:
+            raise ValueError(f"index_interval must be a positive integer. Got {index_interval}")
+        self._path = pathlib.Path(path)
+        self._path.mkdir(parents=True, exist_ok=True)
+        self._index_interval = index_interval
+        self._lock = threading.Lock()
+        # Fail (rather than overwrite) if the directory already contains a recording.
+        self._records = open(self._path / RECORDS_FILE, 'xb')
+        self._data = open(self._path / DATA_FILE, 'xb')
+        self._index = open(self._path / INDEX_FILE, 'xb')
+        self._query_ids: typing.Dict[typing.Tuple[str, str, str], int] = {}
+        self._schema_ids: typing.Dict[_Schema, int] = {}
+        self._selector_ids: typing.Dict[str, int] = {}
+        self._meta_changed = True
+        self._data_offset = 0
+        self._block_min = self._block_max = 0
+        self._closed = False
+        #: The number of responses which have been recorded.
+        self.recorded = 0
+        #: The number of responses which were not recorded (exceptions, or unsupported data).
+        self.skipped = 0
+        self._write_meta()
+
+    @property
+    def path(self) -> pathlib.Path:
+        return self._path
+
+    def __enter__(self) -> "StreamRecorder":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _response_received(self, response: PropertyRetrievalResponse) -> None:
+        if response.exception is not None:
+            self.skipped += 1
+            return
+        try:
+            self.record(response)
+        except (TypeError, ValueError) as exc:
+            self.skipped += 1
+            LOG.warning(f'Unable to record {response.query}: {exc}')
+
+    def record(self, response: PropertyRetrievalResponse) -> None:
+        value = response.value
+        header = value.header
+        arrays = [(name, np.asarray(field)) for name, field in value.items()]
+        for name, array in arrays:
+            if array.dtype.hasobject:
+                raise TypeError(f'Field {name!r} of type {array.dtype} cannot be recorded')
+        schema: _Schema = tuple((name, array.dtype.str, array.shape) for name, array in arrays)
+        chunks = []
+        for _, array in arrays:
+            chunk = array.tobytes()
+            chunks.append(chunk + bytes(-len(chunk) % _ALIGNMENT))
+        payload = b''.join(chunks)
+
+        query = response.query
+        selector = header.selector
+
+        with self._lock:
+            if self._closed:
+                raise ValueError('The recorder is closed')
+            record = np.zeros((), dtype=RECORD_DTYPE)
+            record['acquisition_stamp'] = _stamp_or_missing(header.acquisition_timestamp)
+            record['cycle_stamp'] = _stamp_or_missing(header.cycle_timestamp)
+            record['set_stamp'] = _stamp_or_missing(header.set_timestamp)
+            record['offset'] = self._data_offset
+            record['length'] = len(payload)
+            record['query'] = self._id_of(
+                self._query_ids, (query.device, query.prop, str(query.selector)),
+            )
+            record['schema'] = self._id_of(self._schema_ids, schema)
+            record['selector'] = -1 if selector is None else self._id_of(
+                self._selector_ids, str(selector),
+            )
+            self._records.write(record.tobytes())
+            self._data.write(payload)
+            self._data_offset += len(payload)
+            self._update_index(int(record['acquisition_stamp']))
+            self.recorded += 1
+
+    def _id_of(self, ids: typing.Dict[typing.Any, int], key: typing.Any) -> int:
+        # Called with the lock held.
+        try:
+            return ids[key]
+        except KeyError:
+            self._meta_changed = True
+            ids[key] = len(ids)
+            return ids[key]
+
+    def _update_index(self, stamp: int) -> None:
+        # Called with the lock held, before the record count is incremented.
+        if self.recorded % self._index_interval == 0:
+            self._block_min = self._block_max = stamp
+        else:
+            self._block_min = min(self._block_min, stamp)
+            self._block_max = max(self._block_max, stamp)
+        if (self.recorded + 1) % self._index_interval == 0:
+            entry = np.zeros((), dtype=INDEX_DTYPE)
+            entry['record'] = self.recorded + 1 - self._index_interval
+            entry['min_stamp'] = self._block_min
+            entry['max_stamp'] = self._block_max
+            self._index.write(entry.tobytes())
+
+    def flush(self) -> None:
+        """Make everything recorded so far readable by a :class:`Recording`."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        # Called with the lock held. The data goes first, such that a record
+        # never refers to data which has not been written.
+        for file in (self._data, self._records, self._index):
+            file.flush()
+        if self._meta_changed:
+            self._write_meta()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._flush()
+            for file in (self._data, self._records, self._index):
+                file.close()
+            self._closed = True
+
+    def _write_meta(self) -> None:
+        meta = {
+            'version': FORMAT_VERSION,
+            'index_interval': self._index_interval,
+            'queries': [
+                {'device': device, 'prop': prop, 'selector': selector}
+                for device, prop, selector in self._query_ids
+            ],
+            'schemas': [
+                [
+                    {'name': name, 'dtype': dtype, 'shape': list(shape)}
+                    for name, dtype, shape in schema
+                ]
+                for schema in self._schema_ids
+            ],
+            'selectors': list(self._selector_ids),
+        }
+        tmp_path = self._path / (META_FILE + '.tmp')
+        tmp_path.write_text(json.dumps(meta))
+        tmp_path.replace(self._path / META_FILE)
+        self._meta_changed = False
+
+
+class Recording:
+    """
+    Read access to a directory written by a :class:`StreamRecorder`.
+
+    The files are memory-mapped: the records are a structured numpy array, and the
+    fields of a response are returned as read-only views of the data file.
+
+    """
+    def __init__(self, path: typing.Union[str, "os.PathLike[str]"]):
+        self._path = pathlib.Path(path)
+        meta = json.loads((self._path / META_FILE).read_text())
+        if meta['version'] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported recording format version {meta['version']}")
+        self._index_interval: int = meta['index_interval']
+        self._queries = [
+            PropertyAccessQuery(device=query['device'], prop=query['prop'],
+                                selector=Selector(query['selector']))
+            for query in meta['queries']
+        ]
+        self._schemas = [
+            [(field['name'], np.dtype(field['dtype']), tuple(field['shape'])) for field in schema]
+            for schema in meta['schemas']
+        ]
+        self._selectors = [Selector(selector) for selector in meta['selectors']]
+        # The records are mapped before the data, as the recorder writes the data
+        # of a record before the record itself.
+        raw_records = np.frombuffer(_map(self._path / RECORDS_FILE), dtype=np.uint8)
+        self._data = _map(self._path / DATA_FILE)
+        records: np.ndarray = raw_records[
+            :len(raw_records) - len(raw_records) % RECORD_DTYPE.itemsize
+        ].view(RECORD_DTYPE)
+        # Only consider the records for which the metadata and the data have been
+        # written, in case the recording is still in progress.
+        complete = (
+            (records['query'] < len(self._queries))
+            & (records['schema'] < len(self._schemas))
+            & (records['offset'] + records['length'] <= len(self._data))
+        )
+        n_records = len(records) if complete.all() else int(np.argmin(complete))
+        #: The records of the recording, in the order they were recorded.
+        self.records: np.ndarray = records[:n_records]
+        raw_index = np.frombuffer(_map(self._path / INDEX_FILE), dtype=np.uint8)
+        index: np.ndarray = raw_index[
+            :len(raw_index) - len(raw_index) % INDEX_DTYPE.itemsize
+        ].view(INDEX_DTYPE)
+        self._block_index = index[index['record'] + self._index_interval <= n_records]
+
+    @property
+    def queries(self) -> typing.List[PropertyAccessQuery]:
+        """The (distinct) queries of the recorded responses."""
+        return list(self._queries)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def select(
+            self,
+            start: typing.Optional[int] = None,
+            end: typing.Optional[int] = None,
+            query: typing.Optional[PropertyAccessQuery] = None,
+    ) -> np.ndarray:
+        """
+        The numbers of the records with acquisition stamps (nanoseconds) in
+        ``[start, end)``, and for the given query (if any), in recording order.
+
+        Only the blocks of records which the sparse time index says can
+        overlap the range are scanned.
+
+        """
+        stamps = self.records['acquisition_stamp']
+        start = MISSING_STAMP + 1 if start is None else start
+        end = np.iinfo(np.int64).max if end is None else end
+        index = self._block_index
+        overlapping = index[(index['max_stamp'] >= start) & (index['min_stamp'] < end)]
+        candidates = [
+            np.arange(first, first + self._index_interval)
+            for first in overlapping['record'].astype(np.int64)
+        ]
+        # The records after the last complete block are not in the index.
+        candidates.append(np.arange(len(index) * self._index_interval, len(stamps)))
+        numbers = np.concatenate(candidates)
+        selected = (stamps[numbers] >= start) & (stamps[numbers] < end)
+        if query is not None:
+            query_id = self._query_id(query)
+            if query_id is None:
+                return numbers[:0]
+            selected &= self.records['query'][numbers] == query_id
+        return numbers[selected]
+
+    def _query_id(self, query: PropertyAccessQuery) -> typing.Optional[int]:
+        for query_id, recorded in enumerate(self._queries):
+            if (recorded.device, recorded.prop, str(recorded.selector)) == \
+                    (query.device, query.prop, str(query.selector)):
+                return query_id
+        return None
+
+    def fields(self, number: int) -> typing.Dict[str, np.ndarray]:
+        """The fields of the given record, as read-only views of the data file."""
+        record = self.records[number]
+        offset = int(record['offset'])
+        fields = {}
+        for name, dtype, shape in self._schemas[record['schema']]:
+            count = int(np.prod(shape, dtype=np.int64))
+            array = np.frombuffer(self._data, dtype=dtype, count=count, offset=offset)
+            fields[name] = array.reshape(shape)
+            offset += -(-array.nbytes // _ALIGNMENT) * _ALIGNMENT
+        return fields
+
+    def response(self, number: int) -> PropertyRetrievalResponse:
+        """The given record, as the response which was recorded."""
+        record = self.records[number]
+        selector = int(record['selector'])
+        context = _StampContext(
+            acquisition_stamp=_stamp_or_none(record['acquisition_stamp']),
+            cycle_stamp=_stamp_or_none(record['cycle_stamp']),
+            set_stamp=_stamp_or_none(record['set_stamp']),
+            selector=None if selector < 0 else self._selectors[selector],
+        )
+        value = AcquiredPropertyData(dtv=self.fields(number), header=Header(context))
+        return PropertyRetrievalResponse(query=self._queries[record['query']], value=value)
+
+    def responses(
+            self,
+            start: typing.Optional[int] = None,
+            end: typing.Optional[int] = None,
+            query: typing.Optional[PropertyAccessQuery] = None,
+    ) -> typing.Iterator[PropertyRetrievalResponse]:
+        for number in self.select(start, end, query):
+            yield self.response(int(number))
+
+
+def _stamp_or_missing(stamp: typing.Optional[int]) -> int:
+    return MISSING_STAMP if stamp is None else stamp
+
+
+def _stamp_or_none(stamp: np.int64) -> typing.Optional[int]:
+    return None if stamp == MISSING_STAMP else int(stamp)
+
+
+def _map(path: pathlib.Path) -> typing.Union[mmap.mmap, bytes]:
+    with open(path, 'rb') as fh:
+        if not fh.seek(0, 2):
+            # An empty file cannot be memory-mapped.
+            return b''
+        return mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
@@ -1,3 +1,12 @@
+from ._async import AsyncPropertyStream, AsyncProvider
+from ._caching import CachingProvider
 from ._core import BaseProvider
+from ._replay import ReplayProvider
+from ._synthetic import SyntheticProvider
 
+AsyncPropertyStream.__module__ = __name__
+AsyncProvider.__module__ = __name__
 BaseProvider.__module__ = __name__
+CachingProvider.__module__ = __name__
+ReplayProvider.__module__ = __name__
+SyntheticProvider.__module__ = __name__
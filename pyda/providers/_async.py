@@ -0,0 +1,161 @@
+import asyncio
+import concurrent.futures
+import functools
+import threading
+import typing
+
+from ._core import BasePropertyStream, BaseProvider, StreamResponseHandlerProtocol
+
+if typing.TYPE_CHECKING:
+    from ..data import (
+        PropertyAccessQuery,
+        PropertyRetrievalResponse,
+        PropertyUpdateResponse,
+    )
+
+
+class AsyncPropertyStream(BasePropertyStream):
+    """
+    A stream whose responses are produced by the coroutine ``_run``, on the
+    event loop of its provider.
+
+    The coroutine is started when the first handler starts, and is cancelled once
+    the last handler has stopped. Responses are delivered from within the loop,
+    such that the subscriptions of an :class:`~pyda.AsyncIOClient` running on
+    the same loop receive them without any thread hop.
+
+    """
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        super().__init__()
+        self._loop = loop
+        self._run_lock = threading.Lock()
+        self._running: typing.Optional[concurrent.futures.Future] = None
+
+    def start(self, stream_handler: StreamResponseHandlerProtocol):
+        super().start(stream_handler)
+        with self._run_lock:
+            if self._running is None:
+                self._running = asyncio.run_coroutine_threadsafe(self._run(), self._loop)
+
+    def stop(self, stream_handler: StreamResponseHandlerProtocol):
+        super().stop(stream_handler)
+        with self._run_lock:
+            if not self._stream_handlers and self._running is not None:
+                # Cancelling the future cancels the task (from within the loop).
+                self._running.cancel()
+                self._running = None
+
+    async def _run(self) -> None:
+        # The coroutine producing the responses (through ``_response_received``),
+        # until it completes or is cancelled.
+        pass
+
+
+class AsyncProvider(BaseProvider):
+    """
+    The base of providers implemented with coroutines, which run on an asyncio
+    event loop (by default, the loop running when the provider is created).
+
+    Subclasses implement ``_get_property_async`` and ``_set_property_async`` (and,
+    if they are able to batch requests, ``_get_properties_async`` and
+    ``_set_properties_async``), and create :class:`AsyncPropertyStream` streams. An
+    :class:`~pyda.AsyncIOClient` on the provider's loop awaits the coroutines directly,
+    whereas other clients (and other loops) are given futures of them, run on the
+    provider's loop.
+
+    """
+    def __init__(self, *, loop: typing.Optional[asyncio.AbstractEventLoop] = None):
+        if loop is None:
+            loop = asyncio.get_running_loop()
+        self._loop: asyncio.AbstractEventLoop = loop
+        super().__init__()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self._loop
+
+    async def _get_property_async(
+            self,
+            query: "PropertyAccessQuery",
+    ) -> "PropertyRetrievalResponse":
+        pass
+
+    async def _get_properties_async(
+            self,
+            queries: typing.Sequence["PropertyAccessQuery"],
+    ) -> typing.List["PropertyRetrievalResponse"]:
+        # Providers which are able to batch requests should override this method,
+        # returning one response per query, in order. By default, every query is
+        # awaited through ``_get_property_async`` concurrently.
+        return list(await asyncio.gather(*(self._get_property_async(query) for query in queries)))
+
+    async def _set_property_async(
+            self,
+            query: "PropertyAccessQuery",
+            value: typing.Any,
+    ) -> "PropertyUpdateResponse":
+        pass
+
+    async def _set_properties_async(
+            self,
+            items: typing.Sequence[typing.Tuple["PropertyAccessQuery", typing.Any]],
+    ) -> typing.List["PropertyUpdateResponse"]:
+        # Providers which are able to send many settings in one go should override
+        # this method, returning one response per item, in order. By default, every
+        # item is awaited through ``_set_property_async`` concurrently.
+        return list(await asyncio.gather(
+            *(self._set_property_async(query, value) for query, value in items),
+        ))
+
+    def _get_property(self, query: "PropertyAccessQuery") -> concurrent.futures.Future:
+        return asyncio.run_coroutine_threadsafe(self._get_property_async(query), self._loop)
+
+    def _get_properties(
+            self,
+            queries: typing.Sequence["PropertyAccessQuery"],
+    ) -> typing.List[concurrent.futures.Future]:
+        batch = asyncio.run_coroutine_threadsafe(self._get_properties_async(queries), self._loop)
+        return _split_future(batch, len(queries))
+
+    def _set_property(
+            self,
+            query: "PropertyAccessQuery",
+            value: typing.Any,
+    ) -> concurrent.futures.Future:
+        return asyncio.run_coroutine_threadsafe(self._set_property_async(query, value), self._loop)
+
+    def _set_properties(
+            self,
+            items: typing.Sequence[typing.Tuple["PropertyAccessQuery", typing.Any]],
+    ) -> typing.List[concurrent.futures.Future]:
+        batch = asyncio.run_coroutine_threadsafe(self._set_properties_async(items), self._loop)
+        return _split_future(batch, len(items))
+
+
+def _split_future(
+        batch: "concurrent.futures.Future[typing.List[typing.Any]]",
+        size: int,
+) -> typing.List[concurrent.futures.Future]:
+    # One future per result of a batch, in order, resolved once the batch is done.
+    futures: typing.List[concurrent.futures.Future] = [
+        concurrent.futures.Future() for _ in range(size)
+    ]
+    batch.add_done_callback(functools.partial(_resolve_split, futures))
+    return futures
+
+
+def _resolve_split(
+        futures: typing.Sequence[concurrent.futures.Future],
+        batch: "concurrent.futures.Future[typing.List[typing.Any]]",
+) -> None:
+    if batch.cancelled():
+        for future in futures:
+            future.cancel()
+        return
+    error = batch.exception()
+    if error is not None:
+        for future in futures:
+            future.set_exception(error)
+        return
+    for future, result in zip(futures, batch.result()):
+        future.set_result(result)
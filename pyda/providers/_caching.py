@@ -0,0 +1,215 @@
+import collections
+import concurrent.futures
+import functools
+import threading
+import time
+import typing
+
+from ..data._data import QueryKey, canonical_query_key
+from ._core import BasePropertyStream, BaseProvider
+from ._middleware import StreamChain
+
+if typing.TYPE_CHECKING:
+    from ..data import PropertyAccessQuery, PropertyRetrievalResponse
+
+
+class _CacheEntry(typing.NamedTuple):
+    response: "PropertyRetrievalResponse"
+    #: The (monotonic) time after which the entry has expired.
+    expiry: float
+    selector: str
+    cycle_stamp: typing.Optional[int]
+
+
+class CachingProvider(BaseProvider):
+    """
+    A provider which serves gets from a bounded LRU cache of the responses of
+    another provider, and passes everything else through.
+
+    Cached responses expire ``ttl`` seconds after they were fetched, or as soon as
+    a response with a newer cycle stamp is seen for the same selector (by a get,
+    or on any property stream created through this provider). Setting a property
+    invalidates its cached responses. Responses carrying an exception are not cached.
+
+    """
+    def __init__(
+            self,
+            provider: BaseProvider,
+            *,
+            maxsize: int = 1024,
+            ttl: typing.Optional[float] = 1.0,
+    ):
+        if maxsize < 1:
+            raise ValueError(f"maxsize must be a positive integer. Got {maxsize}")
+        self._provider = provider
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "collections.OrderedDict[QueryKey, _CacheEntry]" = \
+            collections.OrderedDict()
+        # The most recent cycle stamp seen for each selector.
+        self._cycle_stamps: typing.Dict[str, int] = {}
+        # Incremented by every invalidation, so that a response which was requested
+        # before an invalidation is not cached when it arrives.
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        super().__init__()
+
+    @property
+    def provider(self) -> BaseProvider:
+        return self._provider
+
+    def stats(self) -> typing.Dict[str, int]:
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
+
+    def invalidate(self, query: typing.Optional["PropertyAccessQuery"] = None) -> None:
+        """
+        Discard the cached responses of the given device property and selector
+        (whatever their data filters), or all of them if no query is given.
+
+        """
+        with self._lock:
+            self._generation += 1
+            if query is None:
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+                return
+            device, prop, selector, _ = canonical_query_key(query)
+            stale = [
+                key for key in self._entries
+                if key[0] == device and key[1] == prop and key[2] == selector
+            ]
+            for key in stale:
+                del self._entries[key]
+                self.invalidations += 1
+
+    def _get_property(self, query: "PropertyAccessQuery") -> concurrent.futures.Future:
+        return self._get_properties([query])[0]
+
+    def _get_properties(
+            self,
+            queries: typing.Sequence["PropertyAccessQuery"],
+    ) -> typing.List[concurrent.futures.Future]:
+        # Hits are served from the cache, and the misses are forwarded to the
+        # wrapped provider as a single batch.
+        keys = [canonical_query_key(query) for query in queries]
+        futures: typing.List[typing.Optional[concurrent.futures.Future]] = []
+        missed: typing.List[int] = []
+        with self._lock:
+            for index, key in enumerate(keys):
+                response = self._cached_response(key)
+                if response is None:
+                    futures.append(None)
+                    missed.append(index)
+                    continue
+                future: concurrent.futures.Future = concurrent.futures.Future()
+                future.set_result(response)
+                futures.append(future)
+            generation = self._generation
+
+        if missed:
+            fetched = self._provider._get_properties([queries[index] for index in missed])
+            for index, future in zip(missed, fetched):
+                future.add_done_callback(
+                    functools.partial(self._response_fetched, keys[index], generation),
+                )
+                futures[index] = future
+        return typing.cast(typing.List[concurrent.futures.Future], futures)
+
+    def _cached_response(self, key: QueryKey) -> typing.Optional["PropertyRetrievalResponse"]:
+        # Called with the lock held. Counts the lookup as a hit or a miss.
+        entry = self._entries.get(key)
+        if entry is not None:
+            if self._is_fresh(entry):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.response
+            del self._entries[key]
+            self.expirations += 1
+        self.misses += 1
+        return None
+
+    def _is_fresh(self, entry: _CacheEntry) -> bool:
+        # Called with the lock held.
+        if entry.expiry < time.monotonic():
+            return False
+        if entry.cycle_stamp is not None:
+            return self._cycle_stamps.get(entry.selector, entry.cycle_stamp) <= entry.cycle_stamp
+        return True
+
+    def _response_fetched(
+            self,
+            key: QueryKey,
+            generation: int,
+            future: concurrent.futures.Future,
+    ) -> None:
+        if future.cancelled() or future.exception() is not None:
+            return
+        response = future.result()
+        if response.exception is not None:
+            return
+        header = response.value.header
+        selector = str(header.selector or '')
+        cycle_stamp = header.cycle_timestamp
+        expiry = time.monotonic() + (float('inf') if self._ttl is None else self._ttl)
+        with self._lock:
+            self._observe_cycle_stamp(selector, cycle_stamp)
+            if generation != self._generation or not self._is_latest_cycle(selector, cycle_stamp):
+                return
+            self._entries[key] = _CacheEntry(response, expiry, selector, cycle_stamp)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _is_latest_cycle(self, selector: str, cycle_stamp: typing.Optional[int]) -> bool:
+        # Called with the lock held.
+        return cycle_stamp is None or self._cycle_stamps.get(selector, cycle_stamp) <= cycle_stamp
+
+    def _observe_cycle_stamp(self, selector: str, cycle_stamp: typing.Optional[int]) -> None:
+        # Called with the lock held.
+        if cycle_stamp is not None and cycle_stamp > self._cycle_stamps.get(selector, -1):
+            self._cycle_stamps[selector] = cycle_stamp
+
+    def _observe_response(
+            self,
+            response: "PropertyRetrievalResponse",
+    ) -> "PropertyRetrievalResponse":
+        # The processor of the streams, which only looks at the cycle stamps.
+        if response.exception is None:
+            header = response.value.header
+            if header.cycle_timestamp is not None:
+                with self._lock:
+                    self._observe_cycle_stamp(str(header.selector or ''), header.cycle_timestamp)
+        return response
+
+    def _set_property(
+            self,
+            query: "PropertyAccessQuery",
+            value: typing.Any,
+    ) -> concurrent.futures.Future:
+        self.invalidate(query)
+        return self._provider._set_property(query, value)
+
+    def _set_properties(
+            self,
+            items: typing.Sequence[typing.Tuple["PropertyAccessQuery", typing.Any]],
+    ) -> typing.List[concurrent.futures.Future]:
+        for query, _ in items:
+            self.invalidate(query)
+        return self._provider._set_properties(items)
+
+    def _create_property_stream(self, query: "PropertyAccessQuery") -> BasePropertyStream:
+        return StreamChain(self._provider._create_property_stream(query), self._observe_response)
@@ -1,11 +1,21 @@
+import collections.abc
 import concurrent.futures
+import threading
+import time
 import typing
 import weakref
 
 from pyds_model._ds_model import AnyData  # noqa
 import typing_extensions
 
-from ..data._data import anydata_from_dict
+from ..data._data import (
+    ConversionPlan,
+    ConversionPlanCache,
+    CopyOnWriteData,
+    anydata_from_dict,
+    anydata_from_dicts,
+)
+from ..tracing import _tracing
 
 if typing.TYPE_CHECKING:
     from ..data import PropertyAccessQuery, PropertyRetrievalResponse
@@ -22,20 +32,88 @@ class BasePropertyStream:
     # This is the basis of data for subscriptions.
 
     def __init__(self):
-        #: A set of stream handlers (e.g. client subscriptions) (weakrefs)
-        #: which will be called (with only the response) each time data arrives.
-        self._stream_handlers = weakref.WeakSet()
+        #: The stream handlers (e.g. client subscriptions) (weakrefs) which will
+        #: be called (with only the response) each time data arrives. The tuple is
+        #: never modified, but replaced as a whole (under the lock) when a handler
+        #: is added or removed, so responses are broadcast without any locking.
+        self._handler_refs: typing.Tuple["weakref.ref[typing.Any]", ...] = ()
+        self._handlers_lock = threading.Lock()
+        #: The number of responses broadcast by the stream, and how many of them were errors.
+        self.updates = 0
+        self.errors = 0
+        #: Whether the stream is holding back its responses, as its consumers are congested.
+        self.congested = False
+        #: The number of responses which were discarded by conflation whilst congested.
+        self.conflated = 0
+        # The consumers (handlers, or pools of them) which have signalled that they are
+        # congested, each paired with the handler on whose behalf it has signalled.
+        self._congested_sources: typing.Set[typing.Tuple[typing.Any, typing.Any]] = set()
+        self._congestion_lock = threading.Lock()
+        self._conflating = False
+        self._conflated_response: typing.Optional["PropertyRetrievalResponse"] = None
+        # Whether a conflated response is being delivered (outside of the lock).
+        self._flushing = False
+        # The congestion last passed on to the source of the stream, and whether it is
+        # being passed on (outside of the lock).
+        self._held_back = False
+        self._holding_back = False
+
+    @property
+    def _stream_handlers(self) -> typing.Tuple[StreamResponseHandlerProtocol, ...]:
+        # The handlers which are still alive.
+        handlers = (ref() for ref in self._handler_refs)
+        return tuple(handler for handler in handlers if handler is not None)
 
     def _register_stream_handler(self, subs):
-        self._stream_handlers.add(subs)
+        with self._handlers_lock:
+            if any(ref() is subs for ref in self._handler_refs):
+                return
+            # (The references to collected handlers are dropped at the same time.)
+            self._handler_refs = tuple(
+                ref for ref in self._handler_refs if ref() is not None
+            ) + (weakref.ref(subs),)
+
+    def _unregister_stream_handler(self, subs):
+        with self._handlers_lock:
+            handlers = [ref() for ref in self._handler_refs]
+            if not any(handler is subs for handler in handlers):
+                raise KeyError(subs)
+            self._handler_refs = tuple(
+                ref for ref, handler in zip(self._handler_refs, handlers)
+                if handler is not None and handler is not subs
+            )
 
     def _response_received(self, response: "PropertyRetrievalResponse") -> None:
         # Called by the provider sources when a response is received.
-        self._broadcast_response(response)
+        if _tracing._HOOKS:
+            name = type(self).__name__
+            _tracing._emit(_tracing.PROVIDER_RECEIVE, _tracing.BEGIN, name)
+            try:
+                self._broadcast_response(response)
+            finally:
+                _tracing._emit(_tracing.PROVIDER_RECEIVE, _tracing.END, name)
+        else:
+            self._broadcast_response(response)
 
     def _broadcast_response(self, response: "PropertyRetrievalResponse"):
-        for stream_handler in self._stream_handlers:
-            stream_handler._response_received(response)
+        if self._conflating:
+            with self._congestion_lock:
+                if self._conflating:
+                    if self._conflated_response is not None:
+                        self.conflated += 1
+                    self._conflated_response = response
+                    return
+        self._deliver_response(response)
+
+    def _deliver_response(self, response: "PropertyRetrievalResponse"):
+        self.updates += 1
+        # (The attribute rather than the property, as this is done for every response.)
+        if getattr(response, '_exception', None) is not None:
+            self.errors += 1
+        for ref in self._handler_refs:
+            stream_handler = ref()
+            if stream_handler is not None:
+                stream_handler._response_received(response)
 
     def start(self, stream_handler: StreamResponseHandlerProtocol):
         self._register_stream_handler(stream_handler)
@@ -44,13 +122,197 @@ class BasePropertyStream:
         """
         **Note!**: Stop is not guaranteed to be called upon destruction.
         """
-        self._stream_handlers.remove(stream_handler)
+        self._unregister_stream_handler(stream_handler)
+        if self._congested_sources:
+            with self._congestion_lock:
+                self._congested_sources = {
+                    (source, handler) for source, handler in self._congested_sources
+                    if handler is not stream_handler
+                }
+                if not self._stream_handlers:
+                    # Whatever congestion remains (such as of pools) no longer matters.
+                    self._congested_sources.clear()
+                self._update_congestion()
+            self._pass_on_congestion()
+            self._flush_conflated()
+
+    def metrics(self) -> typing.Dict[str, typing.Any]:
+        return {
+            'updates': self.updates,
+            'errors': self.errors,
+            'handlers': len(self._stream_handlers),
+            'congested': self.congested,
+            'conflated': self.conflated,
+        }
+
+    def _backpressure(
+            self,
+            source: typing.Any,
+            congested: bool,
+            handler: typing.Any = None,
+    ) -> None:
+        """
+        Signal that a consumer of the stream (one of its handlers, or a pool fed
+        by them) has too many responses waiting (``congested``), or has drained.
+        The stream is congested whilst any of its consumers is.
+
+        A consumer which is not itself a handler of the stream (such as a pool)
+        gives the ``handler`` on whose behalf it signals.
+
+        """
+        key = (source, source if handler is None else handler)
+        with self._congestion_lock:
+            if congested:
+                self._congested_sources.add(key)
+            else:
+                self._congested_sources.discard(key)
+            self._update_congestion()
+        self._pass_on_congestion()
+        self._flush_conflated()
+
+    def _is_congested(self) -> bool:
+        # Called with the congestion lock held.
+        return bool(self._congested_sources)
+
+    def _update_congestion(self) -> None:
+        # Called with the congestion lock held.
+        congested = self._is_congested()
+        if congested != self.congested:
+            self.congested = congested
+            self._congestion_changed(congested)
+
+    def _congestion_changed(self, congested: bool) -> None:
+        # Called (with the congestion lock held) when the stream becomes congested, or
+        # is no longer. Streams whose source can be paused (or throttled) should do so.
+        # By default, the responses are conflated: only the latest is kept, and is
+        # delivered once decongested.
+        if congested:
+            self._conflating = True
+
+    def _hold_back_source(self, congested: bool) -> None:
+        # Called (without any lock held, and by one thread at a time) once the stream
+        # has become congested, or is no longer. Streams fed by other streams pass the
+        # signal on here: the source may well deliver its held back responses from
+        # within the call, and those may congest the stream again.
+        pass
+
+    def _pass_on_congestion(self) -> None:
+        # Bring the source in line with the congestion of the stream, outside of the
+        # lock. A change which happens meanwhile (even from within the call to the
+        # source) is passed on by the thread already doing so.
+        while True:
+            with self._congestion_lock:
+                if self._holding_back or self._held_back == self.congested:
+                    return
+                congested = self._held_back = self.congested
+                self._holding_back = True
+            try:
+                self._hold_back_source(congested)
+            finally:
+                with self._congestion_lock:
+                    self._holding_back = False
+
+    def _flush_conflated(self) -> None:
+        # Deliver the conflated response (if any) once decongested. This is done outside
+        # of the lock, as the handlers may signal congestion themselves, but the stream
+        # keeps conflating until then, such that no response overtakes it.
+        while self._conflating:
+            with self._congestion_lock:
+                if self.congested or self._flushing:
+                    return
+                response, self._conflated_response = self._conflated_response, None
+                if response is None:
+                    self._conflating = False
+                    return
+                self._flushing = True
+            try:
+                self._deliver_response(response)
+            finally:
+                with self._congestion_lock:
+                    self._flushing = False
+
+
+class _ThreadedPropertyStream(BasePropertyStream):
+    # A stream whose responses are produced by ``_run`` on a background thread,
+    # which runs whilst the stream has handlers. ``_run`` must return promptly once
+    # its ``stopping`` event is set, and should set ``finished`` if it runs to completion.
+
+    def __init__(self):
+        super().__init__()
+        self._thread_lock = threading.Lock()
+        # The event which stops the current run, if any.
+        self._stopping: typing.Optional[threading.Event] = None
+        self._finished = threading.Event()
+        # Cleared whilst the stream is congested, which pauses the run.
+        self._decongested = threading.Event()
+        self._decongested.set()
+
+    def start(self, stream_handler: StreamResponseHandlerProtocol):
+        super().start(stream_handler)
+        with self._thread_lock:
+            if self._stopping is None:
+                # Each run has its own events, so that a run which is being
+                # stopped cannot be mistaken for a new one.
+                self._stopping = threading.Event()
+                self._finished = threading.Event()
+                thread = threading.Thread(
+                    target=self._run, args=(self._stopping, self._finished), daemon=True,
+                )
+                thread.start()
+
+    def stop(self, stream_handler: StreamResponseHandlerProtocol):
+        super().stop(stream_handler)
+        with self._thread_lock:
+            if not self._stream_handlers and self._stopping is not None:
+                self._stopping.set()
+                self._stopping = None
+
+    def wait(self, timeout: typing.Optional[float] = None) -> bool:
+        """Wait for the current run to complete, returning whether it has."""
+        return self._finished.wait(timeout)
+
+    def _congestion_changed(self, congested: bool) -> None:
+        # The run is paused, rather than conflating its responses.
+        if congested:
+            self._decongested.clear()
+        else:
+            self._decongested.set()
+
+    def _wait_while_congested(self) -> float:
+        """
+        Wait (if the stream is congested) until it is no longer, returning how long
+        was waited. To be called by ``_run`` between its responses.
+
+        """
+        if self._decongested.is_set():
+            return 0.
+        start = time.monotonic()
+        # Stopping the last handler also ends the congestion.
+        self._decongested.wait()
+        return time.monotonic() - start
+
+    def _run(self, stopping: threading.Event, finished: threading.Event) -> None:
+        raise NotImplementedError
 
 
 class BaseProvider:
+    def __init__(self):
+        # The conversion plans of each device property, used when preparing values for set.
+        self._conversion_plans = ConversionPlanCache()
+
     def _get_property(self, query: "PropertyAccessQuery") -> concurrent.futures.Future:
         pass
 
+    def _get_properties(
+            self,
+            queries: typing.Sequence["PropertyAccessQuery"],
+    ) -> typing.List[concurrent.futures.Future]:
+        # Providers which are able to pipeline requests (or to group them by device)
+        # should override this method, returning one future per query, in order.
+        # By default, every query is issued through ``_get_property`` before any of
+        # the results are waited upon, such that the requests are in flight concurrently.
+        return [self._get_property(query) for query in queries]
+
     def _set_property(
             self,
             query: "PropertyAccessQuery",
@@ -58,23 +320,88 @@ class BaseProvider:
     ) -> concurrent.futures.Future:
         pass
 
+    def _set_properties(
+            self,
+            items: typing.Sequence[typing.Tuple["PropertyAccessQuery", typing.Any]],
+    ) -> typing.List[concurrent.futures.Future]:
+        # Providers which are able to send many settings in one go should override
+        # this method (making use of ``_prepare_values_for_set``), returning one future
+        # per item, in order. By default, the values of the whole batch are prepared
+        # together, and every item is then issued through ``_set_property`` (for which
+        # the prepared AnyData is only validated again) before any of the results are
+        # waited upon.
+        prepared = self._prepare_values_for_set(items)
+        return [
+            self._set_property(query, value) for (query, _), value in zip(items, prepared)
+        ]
+
     def _prepare_value_for_set(
             self,
             query: "PropertyAccessQuery",
             value: typing.Any,
     ) -> AnyData:
         # TODO: This would become a DeviceProperty behaviour if we have such a type in the future.
+        self._validate_value_for_set(value)
 
-        if not isinstance(value, (AnyData, dict)):
-            raise TypeError(f"Value must be either AnyData or dict. Got {type(value)}")
-
-        if isinstance(value, dict):
-            # We don't use the query in this base implementation, but it is useful if context
-            # specific conversions are needed (as is done in PyJapc).
-            _ = query
-            value = anydata_from_dict(value)
+        if not isinstance(value, AnyData):
+            # Providers needing further context specific conversions may override this
+            # method (as is done in PyJapc).
+            value = anydata_from_dict(value, self._conversion_plan(query, value))
 
         return value
 
+    def _prepare_values_for_set(
+            self,
+            items: typing.Sequence[typing.Tuple["PropertyAccessQuery", typing.Any]],
+    ) -> typing.List[AnyData]:
+        # The batch equivalent of ``_prepare_value_for_set``. The whole batch is
+        # validated before any conversion takes place, and all of the dictionaries
+        # are then converted together.
+        for _, value in items:
+            self._validate_value_for_set(value)
+
+        if type(self)._prepare_value_for_set is not BaseProvider._prepare_value_for_set:
+            # Providers with conversions of their own get them for every item, as for a single set.
+            return [self._prepare_value_for_set(query, value) for query, value in items]
+
+        prepared: typing.List[typing.Any] = [value for _, value in items]
+        # The values to convert, grouped by device property and fields (so that they
+        # share a conversion plan).
+        to_convert: typing.Dict[
+            typing.Tuple[str, str, typing.Tuple[str, ...]], typing.List[int],
+        ] = {}
+        for i, (query, value) in enumerate(items):
+            if not isinstance(value, AnyData):
+                to_convert.setdefault((query.device, query.prop, tuple(value.keys())), []).append(i)
+        for indices in to_convert.values():
+            # The plan is shared by the group, and is looked up once. A received value
+            # (set again as mutable data) is preferred, as it may seed the property's plan.
+            first = next(
+                (i for i in indices if isinstance(prepared[i], CopyOnWriteData)), indices[0],
+            )
+            plan = self._conversion_plan(items[first][0], prepared[first])
+            converted = anydata_from_dicts([prepared[i] for i in indices], plan)
+            for i, value in zip(indices, converted):
+                prepared[i] = value
+        return prepared
+
+    def _conversion_plan(
+            self,
+            query: "PropertyAccessQuery",
+            value: typing.Mapping[str, typing.Any],
+    ) -> ConversionPlan:
+        # The plan of the property is seeded (once) from the fields of a received value
+        # (which are typed according to the property's data type) when it is set again
+        # as mutable data. The plan for the fields of the value is learned from it on
+        # first use, and inferred from the value itself for any other fields.
+        if isinstance(value, CopyOnWriteData) and not self._conversion_plans.has_plan(query):
+            self._conversion_plans.set_plan(query, ConversionPlan.from_value(value.source))
+        return self._conversion_plans.plan_for(query, value)
+
+    def _validate_value_for_set(self, value: typing.Any) -> None:
+        # Any mapping is accepted (such as the result of AcquiredPropertyData.mutable_data).
+        if not isinstance(value, (AnyData, collections.abc.Mapping)):
+            raise TypeError(f"Value must be either AnyData or dict. Got {type(value)}")
+
     def _create_property_stream(self, query: "PropertyAccessQuery") -> BasePropertyStream:
         pass
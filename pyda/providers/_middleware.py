@@ -1,15 +1,64 @@
-import functools
+import collections
+import heapq
+import itertools
 import logging
+import threading
+import time
 import typing
+import weakref
 
+from ..tracing import _tracing
 from ._core import BasePropertyStream
 
 if typing.TYPE_CHECKING:
     from ..data import PropertyRetrievalResponse
 
+LOG = logging.getLogger(__name__)
 SYNC_LOG = logging.getLogger(f'{__name__}.synchroniser')
 
 
+class _Scheduler:
+    """
+    A single (daemon) thread which calls functions at given :func:`time.monotonic` deadlines.
+
+    It is shared by all of the middlewares which need timers, rather than each
+    of them running timers (and threads) of their own.
+
+    """
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._heap: typing.List[typing.Tuple[float, int, typing.Callable[[], None]]] = []
+        self._counter = itertools.count()
+        self._thread: typing.Optional[threading.Thread] = None
+
+    def call_at(self, deadline: float, function: typing.Callable[[], None]) -> None:
+        with self._condition:
+            heapq.heappush(self._heap, (deadline, next(self._counter), function))
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='pyda-middleware-scheduler', daemon=True,
+                )
+                self._thread.start()
+            self._condition.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while True:
+                    timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                    if timeout is not None and timeout <= 0:
+                        break
+                    self._condition.wait(timeout)
+                _, _, function = heapq.heappop(self._heap)
+            try:
+                function()
+            except Exception:
+                LOG.exception(f'Scheduled middleware function {function} failed')
+
+
+_SCHEDULER = _Scheduler()
+
+
 class StreamChain(BasePropertyStream):
     """
     A non-leaf stage of stream processing.
@@ -28,7 +77,15 @@ class StreamChain(BasePropertyStream):
         super().__init__()
 
     def _response_received(self, response: "PropertyRetrievalResponse"):
-        processed_resp = self._processor(response)
+        if _tracing._HOOKS:
+            name = getattr(self._processor, '__qualname__', type(self).__name__)
+            _tracing._emit(_tracing.STREAM_PROCESS, _tracing.BEGIN, name)
+            try:
+                processed_resp = self._processor(response)
+            finally:
+                _tracing._emit(_tracing.STREAM_PROCESS, _tracing.END, name)
+        else:
+            processed_resp = self._processor(response)
         if processed_resp is not None:
             self._broadcast_response(processed_resp)
 
@@ -40,6 +97,13 @@ class StreamChain(BasePropertyStream):
         super().stop(subs)
         self._stream.stop(self)
 
+    def _congestion_changed(self, congested: bool) -> None:
+        # Not conflated here, but passed on for the source to be held back.
+        pass
+
+    def _hold_back_source(self, congested: bool) -> None:
+        self._stream._backpressure(self, congested)
+
 
 class StreamMiddleware:
     """
@@ -59,19 +123,341 @@ class StreamMiddleware:
         return stream
 
 
-class SynchronizerMiddleware(StreamMiddleware):
+class ConflatingStream(StreamChain):
+    """
+    A stream stage which collapses bursts of responses into the most recent one.
+
+    The consumer drives the conflation: whilst a response handed to a subscription
+    has not been consumed yet (it is still waiting in any of the queues delivering
+    to the consumer, such as that of the subscription's pool, or its callback has
+    not started), newer responses replace one another, and only the latest is
+    delivered once the previous one is consumed. Responses arriving whilst a
+    previous response is still being delivered (or, with a ``min_interval``,
+    before that interval has elapsed since the last delivery) are conflated likewise.
+
+    """
+    def __init__(self, stream: BasePropertyStream, min_interval: float = 0.0):
+        super().__init__(stream, lambda response: response)
+        self._min_interval = min_interval
+        self._lock = threading.Lock()
+        self._pending: typing.Optional["PropertyRetrievalResponse"] = None
+        #: Whether a delivery is in progress, or scheduled.
+        self._delivering = False
+        self._last_delivery = float('-inf')
+        #: The number of responses which were replaced by a more recent one.
+        self.conflated = 0
+
+    def start(self, subs):
+        # Subscriptions signal (privately, leaving their own watermarks to the user)
+        # as soon as a response delivered to them has not been consumed.
+        watch_delivery = getattr(subs, '_watch_delivery', None)
+        if watch_delivery is not None:
+            watch_delivery(self, 1, low=0)
+        super().start(subs)
+
+    def stop(self, subs):
+        unwatch_delivery = getattr(subs, '_unwatch_delivery', None)
+        if unwatch_delivery is not None:
+            unwatch_delivery(self)
+        super().stop(subs)
+
+    def _congestion_changed(self, congested: bool) -> None:
+        # Conflated here (rather than passed on), as this is what the stage is for.
+        BasePropertyStream._congestion_changed(self, congested)
+
+    def _hold_back_source(self, congested: bool) -> None:
+        pass
+
+    def _response_received(self, response: "PropertyRetrievalResponse"):
+        with self._lock:
+            if self._pending is not None:
+                self.conflated += 1
+            self._pending = response
+            if self._delivering:
+                return
+            self._delivering = True
+            next_delivery = self._last_delivery + self._min_interval
+            if next_delivery > time.monotonic():
+                _SCHEDULER.call_at(next_delivery, self._deliver)
+                return
+        self._deliver()
+
+    def _deliver(self) -> None:
+        while True:
+            with self._lock:
+                response = self._pending
+                if response is None:
+                    self._delivering = False
+                    return
+                self._pending = None
+                self._last_delivery = time.monotonic()
+            self._broadcast_response(response)
+            if self._min_interval > 0:
+                with self._lock:
+                    if self._pending is None:
+                        self._delivering = False
+                    else:
+                        _SCHEDULER.call_at(self._last_delivery + self._min_interval, self._deliver)
+                return
+
+
+class ConflatingMiddleware(StreamMiddleware):
+    """
+    A middleware which delivers only the latest response of each stream,
+    discarding those which arrive faster than they can be consumed.
+
+    :param min_interval: The minimum time (in seconds) between two deliveries
+        of the same stream. Responses arriving in between replace one another.
+
+    """
+    def __init__(self, min_interval: float = 0.0):
+        self._min_interval = min_interval
+        self._streams: "weakref.WeakSet[ConflatingStream]" = weakref.WeakSet()
+
+    def wrap_stream(self, stream: BasePropertyStream) -> BasePropertyStream:
+        wrapped_stream = ConflatingStream(stream, self._min_interval)
+        self._streams.add(wrapped_stream)
+        return wrapped_stream
+
+    @property
+    def conflated(self) -> int:
+        """The number of responses (of all streams) replaced by a more recent one."""
+        return sum(stream.conflated for stream in list(self._streams))
+
+
+class _ResponseFilter:
+    # The processor of a filtering StreamChain. Returns None for dropped responses.
+    def __init__(self):
+        self._lock = threading.Lock()
+        #: The number of responses which have been dropped by this filter.
+        self.dropped = 0
+
+    def __call__(
+            self,
+            response: "PropertyRetrievalResponse",
+    ) -> typing.Optional["PropertyRetrievalResponse"]:
+        with self._lock:
+            keep = self._keep()
+            if not keep:
+                self.dropped += 1
+        return response if keep else None
+
+    def _keep(self) -> bool:
+        # Called with the lock held.
+        return True
+
+
+class _EveryNthFilter(_ResponseFilter):
+    def __init__(self, n: int):
+        super().__init__()
+        self._n = n
+        self._count = 0
+
+    def _keep(self) -> bool:
+        keep = self._count == 0
+        self._count = (self._count + 1) % self._n
+        return keep
+
+
+class _MinIntervalFilter(_ResponseFilter):
+    def __init__(self, min_interval: float):
+        super().__init__()
+        self._min_interval = min_interval
+        self._next_allowed = float('-inf')
+
+    def _keep(self) -> bool:
+        now = time.monotonic()
+        if now < self._next_allowed:
+            return False
+        self._next_allowed = now + self._min_interval
+        return True
+
+
+class _FilteringMiddleware(StreamMiddleware):
+    # A middleware which drops responses of each stream, according to a filter per stream.
     def __init__(self):
-        self._streams = []
-        self._accumulations = {}
-        # TODO: Handle thread-safety in this class.
+        self._filters: "weakref.WeakSet[_ResponseFilter]" = weakref.WeakSet()
+
+    def _create_filter(self) -> _ResponseFilter:
+        raise NotImplementedError()
 
     def wrap_stream(self, stream: BasePropertyStream) -> BasePropertyStream:
-        wrapped_stream = StreamChain(
-            stream,
-            functools.partial(self.synchronised_response_handler, stream=stream),
+        response_filter = self._create_filter()
+        self._filters.add(response_filter)
+        return StreamChain(stream, response_filter)
+
+    @property
+    def dropped(self) -> int:
+        """The number of responses (of all streams) which have been dropped."""
+        return sum(response_filter.dropped for response_filter in list(self._filters))
+
+
+class DecimatingMiddleware(_FilteringMiddleware):
+    """
+    A middleware which passes on only every ``n``-th response of each stream
+    (starting with the first).
+
+    """
+    def __init__(self, n: int):
+        if n < 1:
+            raise ValueError(f"n must be a positive integer. Got {n}")
+        super().__init__()
+        self._n = n
+
+    def _create_filter(self) -> _ResponseFilter:
+        return _EveryNthFilter(self._n)
+
+
+class RateLimitingMiddleware(_FilteringMiddleware):
+    """
+    A middleware which passes on at most one response of each stream every
+    ``min_interval`` seconds, dropping the responses in between.
+
+    """
+    def __init__(self, min_interval: float):
+        super().__init__()
+        self._min_interval = min_interval
+
+    def _create_filter(self) -> _ResponseFilter:
+        return _MinIntervalFilter(self._min_interval)
+
+
+class _SynchronisedStream(StreamChain):
+    # A stream stage whose responses are held back by a SynchronizerMiddleware.
+    def __init__(self, stream: BasePropertyStream, synchronizer: "SynchronizerMiddleware"):
+        super().__init__(stream, lambda response: response)
+        self._synchronizer = synchronizer
+
+    def _response_received(self, response: "PropertyRetrievalResponse"):
+        self._synchronizer.synchronised_response_handler(response, stream=self)
+
+    def start(self, subs):
+        # Waited for before the source starts, so that its first response is synchronised.
+        self._synchronizer._stream_started(self)
+        super().start(subs)
+
+    def stop(self, subs):
+        super().stop(subs)
+        if not self._stream_handlers:
+            self._synchronizer._stream_stopped(self)
+
+
+class _CycleAccumulation:
+    __slots__ = ('deadline', 'responses', 'received')
+
+    def __init__(self, deadline: float):
+        self.deadline = deadline
+        self.responses: typing.Dict[StreamChain, "PropertyRetrievalResponse"] = {}
+        #: The number of active streams which have a response in the accumulation.
+        self.received = 0
+
+
+class SynchronizerMiddleware(StreamMiddleware):
+    """
+    A middleware which synchronises the streams it wraps by cycle: the responses
+    of a cycle (identified by the header's cycle stamp) are only passed on once
+    every stream has produced a response for that cycle.
+
+    Responses which cannot be synchronised (exceptions, and data without a cycle
+    stamp) are passed on immediately. Responses which arrive for a cycle which has
+    already been passed on (or has timed out) are discarded.
+
+    :param timeout: The time (in seconds) after the first response of a cycle
+        within which the cycle must complete.
+    :param max_open_cycles: The maximum number of incomplete cycles held at any one
+        time. Beyond this, the oldest cycle is handled as if it had timed out.
+    :param emit_incomplete: Whether the responses of cycles which did not complete
+        are passed on regardless (True), or discarded (False).
+
+    """
+    def __init__(
+            self,
+            *,
+            timeout: float = 1.0,
+            max_open_cycles: int = 16,
+            emit_incomplete: bool = False,
+    ):
+        self._timeout = timeout
+        self._max_open_cycles = max_open_cycles
+        self._emit_incomplete = emit_incomplete
+        self._lock = threading.Lock()
+        # The wrapped streams which have handlers: a cycle is complete once each of
+        # them has produced a response for it.
+        self._active_streams: "weakref.WeakSet[StreamChain]" = weakref.WeakSet()
+        #: The accumulations of the open cycles, by cycle stamp. As the timeout is
+        #: the same for all cycles, this is also ordered by deadline.
+        self._accumulations: typing.OrderedDict[int, _CycleAccumulation] = \
+            collections.OrderedDict()
+        #: The stamps of the most recently closed (completed or incomplete) cycles,
+        #: in order of closing, such that late responses do not open them again.
+        self._closed_cycles: typing.OrderedDict[int, None] = collections.OrderedDict()
+        #: The newest stamp which is no longer held in the closed cycles: responses
+        #: of cycles up to this one are late too.
+        self._closed_horizon: typing.Optional[int] = None
+        #: Whether the shared scheduler will call back to expire the oldest cycle.
+        self._expiry_scheduled = False
+        #: The number of cycles which completed.
+        self.completed_cycles = 0
+        #: The number of cycles which timed out (or were evicted) before completing.
+        self.incomplete_cycles = 0
+        #: The number of responses which were discarded (incomplete cycles, or
+        #: superseded by a newer response of the same stream and cycle).
+        self.discarded_responses = 0
+
+    def wrap_stream(self, stream: BasePropertyStream) -> BasePropertyStream:
+        return _SynchronisedStream(stream, self)
+
+    def _stream_started(self, stream: StreamChain) -> None:
+        with self._lock:
+            if stream in self._active_streams:
+                return
+            self._active_streams.add(stream)
+            # Any responses it gave before it last stopped count again.
+            for accumulation in self._accumulations.values():
+                if stream in accumulation.responses:
+                    accumulation.received += 1
+
+    def _stream_stopped(self, stream: StreamChain) -> None:
+        # The open cycles may now be complete, as the stream is no longer waited for.
+        to_emit: typing.List[typing.Tuple[StreamChain, "PropertyRetrievalResponse"]] = []
+        with self._lock:
+            if stream not in self._active_streams:
+                return
+            self._active_streams.discard(stream)
+            for cycle_stamp, accumulation in list(self._accumulations.items()):
+                if stream in accumulation.responses:
+                    accumulation.received -= 1
+                if self._is_complete(accumulation):
+                    del self._accumulations[cycle_stamp]
+                    self._cycle_closed(cycle_stamp)
+                    self.completed_cycles += 1
+                    to_emit.extend(accumulation.responses.items())
+        for wrapped_stream, resp in to_emit:
+            wrapped_stream._broadcast_response(resp)
+
+    def _is_complete(self, accumulation: _CycleAccumulation) -> bool:
+        # Called with the lock held.
+        return accumulation.received >= len(self._active_streams)
+
+    def _cycle_closed(self, cycle_stamp: int) -> None:
+        # Called with the lock held, once the cycle's accumulation has been removed.
+        self._closed_cycles[cycle_stamp] = None
+        while len(self._closed_cycles) > self._max_open_cycles:
+            forgotten, _ = self._closed_cycles.popitem(last=False)
+            if self._closed_horizon is None or forgotten > self._closed_horizon:
+                self._closed_horizon = forgotten
+
+    def _is_closed(self, cycle_stamp: int) -> bool:
+        # Called with the lock held.
+        return cycle_stamp in self._closed_cycles or (
+            self._closed_horizon is not None and cycle_stamp <= self._closed_horizon
         )
-        self._streams.append(wrapped_stream)
-        return wrapped_stream
+
+    @staticmethod
+    def _cycle_stamp(response: "PropertyRetrievalResponse") -> typing.Optional[int]:
+        if response.exception is not None:
+            return None
+        return response.value.header.cycle_timestamp
 
     def synchronised_response_handler(
             self,
@@ -79,23 +465,86 @@ class SynchronizerMiddleware(StreamMiddleware):
             *,
             stream: StreamChain,
     ) -> None:
+        cycle_stamp = self._cycle_stamp(response)
+        if cycle_stamp is None:
+            stream._broadcast_response(response)
+            return
+
+        to_emit: typing.List[typing.Tuple[StreamChain, "PropertyRetrievalResponse"]] = []
+        with self._lock:
+            accumulation = self._accumulations.get(cycle_stamp)
+            if accumulation is None:
+                if self._is_closed(cycle_stamp):
+                    SYNC_LOG.info(
+                        f'Dropping data for {stream} of a cycle which has already been closed',
+                    )
+                    self.discarded_responses += 1
+                    return
+                accumulation = _CycleAccumulation(time.monotonic() + self._timeout)
+                self._accumulations[cycle_stamp] = accumulation
+                while len(self._accumulations) > self._max_open_cycles:
+                    oldest_stamp, oldest = self._accumulations.popitem(last=False)
+                    self._cycle_closed(oldest_stamp)
+                    to_emit.extend(self._close_incomplete(oldest))
+                self._schedule_expiry()
+            elif stream in accumulation.responses:
+                SYNC_LOG.info(
+                    f'Dropping existing data for {stream} before the accumulation is '
+                    f'complete, as newer data has arrived',
+                )
+                self.discarded_responses += 1
+            if stream not in accumulation.responses and stream in self._active_streams:
+                accumulation.received += 1
+            accumulation.responses[stream] = response
+
+            if self._is_complete(accumulation):
+                SYNC_LOG.debug("Accumulation is complete")
+                del self._accumulations[cycle_stamp]
+                self._cycle_closed(cycle_stamp)
+                self.completed_cycles += 1
+                to_emit.extend(accumulation.responses.items())
+
+        for wrapped_stream, resp in to_emit:
+            # Let the wrapped stream continue to process the data.
+            wrapped_stream._broadcast_response(resp)
+
+    def _close_incomplete(
+            self,
+            accumulation: _CycleAccumulation,
+    ) -> typing.Iterable[typing.Tuple[StreamChain, "PropertyRetrievalResponse"]]:
+        # Called with the lock held. Returns the responses to be passed on.
+        self.incomplete_cycles += 1
+        if self._emit_incomplete:
+            return accumulation.responses.items()
+        SYNC_LOG.info(
+            f'Discarding {len(accumulation.responses)} responses of a cycle which '
+            f'did not complete',
+        )
+        self.discarded_responses += len(accumulation.responses)
+        return ()
+
+    def _schedule_expiry(self) -> None:
+        # Called with the lock held. Only one expiry call is ever scheduled per
+        # middleware, for the oldest open cycle.
+        if self._expiry_scheduled or not self._accumulations:
+            return
+        oldest = next(iter(self._accumulations.values()))
+        self._expiry_scheduled = True
+        _SCHEDULER.call_at(oldest.deadline, self._expire)
+
+    def _expire(self) -> None:
+        to_emit: typing.List[typing.Tuple[StreamChain, "PropertyRetrievalResponse"]] = []
+        with self._lock:
+            self._expiry_scheduled = False
+            now = time.monotonic()
+            while self._accumulations:
+                oldest = next(iter(self._accumulations.values()))
+                if oldest.deadline > now:
+                    break
+                oldest_stamp, _ = self._accumulations.popitem(last=False)
+                self._cycle_closed(oldest_stamp)
+                to_emit.extend(self._close_incomplete(oldest))
+            self._schedule_expiry()
 
-        if not self._accumulations:
-            # TODO: Start a timer which will raise if the accumulation does not
-            #       complete in time.
-            pass
-
-        if id(stream) in self._accumulations:
-            SYNC_LOG.info(
-                f'Dropping existing data for {stream} before the accumulation is '
-                f'complete, as newer data has arrived',
-            )
-        self._accumulations[id(stream)] = response
-
-        if len(self._accumulations) == len(self._streams):
-            SYNC_LOG.debug("Accumulation is complete")
-            for stream in self._streams:
-                resp = self._accumulations.pop(id(stream._stream))
-                # Let the wrapped stream continue to process the data.
-                stream._broadcast_response(resp)
-        return None
+        for wrapped_stream, resp in to_emit:
+            wrapped_stream._broadcast_response(resp)
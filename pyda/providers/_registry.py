@@ -0,0 +1,415 @@
+import asyncio
+import concurrent.futures
+import functools
+import threading
+import typing
+import weakref
+
+from ..data._data import canonical_query_key
+from ._core import BasePropertyStream, StreamResponseHandlerProtocol
+
+if typing.TYPE_CHECKING:
+    from ..data import PropertyAccessQuery, PropertyRetrievalResponse
+    from ._async import AsyncProvider
+    from ._core import BaseProvider
+
+
+class SharedPropertyStream(BasePropertyStream):
+    """
+    A property stream which is shared by all of the handlers interested in
+    the same query of a provider.
+
+    The upstream (provider) stream is started when the first handler starts, and is
+    only stopped once the last handler has stopped. The upstream stream is started
+    and stopped without any lock held (it may well deliver responses, or call back
+    into this stream, from within its own ``start`` and ``stop``).
+
+    The upstream stream is only held back whilst *all* of the handlers are congested,
+    such that a slow consumer does not hold back the others (a consumer may have
+    its own responses conflated with a ``ConflatingMiddleware``).
+
+    """
+    def __init__(self, stream: BasePropertyStream, query: "PropertyAccessQuery"):
+        super().__init__()
+        self._stream = stream
+        self._query = query
+        self._lock = threading.Lock()
+        self._latest: typing.Optional["PropertyRetrievalResponse"] = None
+        # Whether the upstream stream has been started, and whether a thread is
+        # bringing it in line with the handlers (both guarded by the lock).
+        self._upstream_started = False
+        self._updating_upstream = False
+
+    @property
+    def query(self) -> "PropertyAccessQuery":
+        return self._query
+
+    @property
+    def latest(self) -> typing.Optional["PropertyRetrievalResponse"]:
+        """The last response received by the stream (None if there hasn't been one)."""
+        return self._latest
+
+    def _response_received(self, response: "PropertyRetrievalResponse") -> None:
+        self._latest = response
+        self._broadcast_response(response)
+
+    def metrics(self) -> typing.Dict[str, typing.Any]:
+        return {'query': str(self._query), **super().metrics()}
+
+    def _is_congested(self) -> bool:
+        # Called with the congestion lock held.
+        congested_handlers = {handler for _, handler in self._congested_sources}
+        return bool(congested_handlers) and all(
+            handler in congested_handlers for handler in self._stream_handlers
+        )
+
+    def _congestion_changed(self, congested: bool) -> None:
+        # Not conflated here, but passed on for the source to be held back.
+        pass
+
+    def _hold_back_source(self, congested: bool) -> None:
+        self._stream._backpressure(self, congested)
+
+    def start(self, stream_handler: StreamResponseHandlerProtocol):
+        with self._lock:
+            super().start(stream_handler)
+        self._update_upstream()
+        if self._congested_sources:
+            # A new handler is not congested, so the stream may no longer be.
+            with self._congestion_lock:
+                self._update_congestion()
+            self._pass_on_congestion()
+            self._flush_conflated()
+
+    def stop(self, stream_handler: StreamResponseHandlerProtocol):
+        with self._lock:
+            super().stop(stream_handler)
+        self._update_upstream()
+
+    def _update_upstream(self) -> None:
+        # Starts or stops the upstream stream until it is in line with whether there
+        # are any handlers. Only one thread does so at a time: a start or stop which
+        # happens meanwhile (even from within the upstream call) is picked up by
+        # that thread's next iteration.
+        with self._lock:
+            if self._updating_upstream:
+                return
+            self._updating_upstream = True
+        try:
+            while True:
+                with self._lock:
+                    wanted = bool(self._stream_handlers)
+                    if wanted == self._upstream_started:
+                        self._updating_upstream = False
+                        return
+                    self._upstream_started = wanted
+                    if not wanted:
+                        self._latest = None
+                if wanted:
+                    self._stream.start(self)
+                else:
+                    self._stream.stop(self)
+        except BaseException:
+            with self._lock:
+                self._upstream_started = not self._upstream_started
+                self._updating_upstream = False
+            raise
+
+
+class PropertyStreamRegistry:
+    """
+    The registry of the property streams of a single provider, such that
+    identical queries share a single upstream stream.
+
+    Streams are only held weakly: once no subscription refers to a stream any
+    longer, the next identical query will create a new one.
+
+    """
+    def __init__(self, provider: "BaseProvider"):
+        self._provider = weakref.ref(provider)
+        self._streams: "weakref.WeakValueDictionary[typing.Hashable, SharedPropertyStream]" = \
+            weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def property_stream(self, query: "PropertyAccessQuery") -> SharedPropertyStream:
+        key = canonical_query_key(query)
+        with self._lock:
+            stream = self._streams.get(key)
+            if stream is None:
+                provider = self._provider()
+                assert provider is not None
+                stream = SharedPropertyStream(provider._create_property_stream(query), query)
+                self._streams[key] = stream
+        return stream
+
+    def active_stream(self, query: "PropertyAccessQuery") -> typing.Optional[SharedPropertyStream]:
+        """The stream of the given query, if it exists and is started."""
+        with self._lock:
+            stream = self._streams.get(canonical_query_key(query))
+        if stream is None or not stream._stream_handlers:
+            return None
+        return stream
+
+    def active_streams(self) -> typing.List[SharedPropertyStream]:
+        with self._lock:
+            return list(self._streams.values())
+
+
+class _PendingGet:
+    # An entry of the in-flight table. Its future (or the error raised by the provider)
+    # is published, under the table's condition, once the request has been made.
+    __slots__ = ('future', 'error')
+
+    def __init__(self):
+        self.future: typing.Optional[concurrent.futures.Future] = None
+        self.error: typing.Optional[BaseException] = None
+
+
+class InFlightGets:
+    """
+    The gets which are in flight from a single provider, such that concurrent
+    gets of identical queries share a single request: the future returned by the
+    provider (and hence the response) is shared by all of them.
+
+    A get is only shared whilst it is in flight: once its response has arrived,
+    the next get of the same query makes a new request.
+
+    """
+    def __init__(self, provider: "BaseProvider"):
+        self._provider = weakref.ref(provider)
+        self._gets: typing.Dict[typing.Hashable, _PendingGet] = {}
+        # The gets of an AsyncProvider which are in flight within its event loop
+        # (and only ever used from within it).
+        self._tasks: typing.Dict[typing.Hashable, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        # Notified when the futures of requests are published.
+        self._issued = threading.Condition(self._lock)
+        # The number of getters waiting for the future of a request to be published.
+        self._waiting = 0
+        #: The number of gets which were served by a request already in flight.
+        self.coalesced = 0
+
+    def get_property(self, query: "PropertyAccessQuery") -> concurrent.futures.Future:
+        key = canonical_query_key(query)
+        with self._lock:
+            pending = self._gets.get(key)
+            if pending is not None:
+                self.coalesced += 1
+                return self._wait(pending)
+            pending = self._gets[key] = _PendingGet()
+        provider = self._provider()
+        assert provider is not None
+        try:
+            future = provider._get_property(query)
+        except BaseException as exc:
+            self._failed([(key, pending)], exc)
+            raise
+        self._published([(key, pending, future)])
+        return future
+
+    def get_properties(
+            self,
+            queries: typing.Sequence["PropertyAccessQuery"],
+    ) -> typing.List[concurrent.futures.Future]:
+        """
+        Get the futures of the given queries, requesting those which are not in
+        flight already through the provider's ``_get_properties``.
+
+        """
+        pending_gets: typing.List[_PendingGet] = []
+        # The queries which must be requested, with their keys and (new) entries.
+        requests: typing.List[
+            typing.Tuple["PropertyAccessQuery", typing.Hashable, _PendingGet]
+        ] = []
+        with self._lock:
+            for query in queries:
+                key = canonical_query_key(query)
+                pending = self._gets.get(key)
+                if pending is None:
+                    pending = self._gets[key] = _PendingGet()
+                    requests.append((query, key, pending))
+                else:
+                    self.coalesced += 1
+                pending_gets.append(pending)
+        if requests:
+            provider = self._provider()
+            assert provider is not None
+            try:
+                futures = provider._get_properties([query for query, _, _ in requests])
+            except BaseException as exc:
+                self._failed([(key, pending) for _, key, pending in requests], exc)
+                raise
+            self._published([
+                (key, pending, future) for (_, key, pending), future in zip(requests, futures)
+            ])
+        with self._lock:
+            return [self._wait(pending) for pending in pending_gets]
+
+    def _published(
+            self,
+            requests: typing.Sequence[
+                typing.Tuple[typing.Hashable, _PendingGet, concurrent.futures.Future]
+            ],
+    ) -> None:
+        # Publish the futures of requests which have been made.
+        for key, pending, future in requests:
+            pending.future = future
+        # A getter counts itself as waiting before checking for the future, so that
+        # it is either notified or has seen the future.
+        if self._waiting:
+            with self._lock:
+                self._issued.notify_all()
+        for key, pending, future in requests:
+            # Called immediately if the future is done already, such as from
+            # providers which answer immediately.
+            future.add_done_callback(functools.partial(self._request_done, key, pending))
+
+    def _failed(
+            self,
+            requests: typing.Sequence[typing.Tuple[typing.Hashable, _PendingGet]],
+            error: BaseException,
+    ) -> None:
+        # The provider raised, rather than returning futures.
+        with self._lock:
+            for key, pending in requests:
+                del self._gets[key]
+                pending.error = error
+            self._issued.notify_all()
+
+    def _wait(self, pending: _PendingGet) -> concurrent.futures.Future:
+        # Called with the lock held.
+        if pending.future is not None:
+            return pending.future
+        self._waiting += 1
+        try:
+            while pending.future is None:
+                if pending.error is not None:
+                    raise pending.error
+                self._issued.wait()
+        finally:
+            self._waiting -= 1
+        return pending.future
+
+    async def get_property_async(self, query: "PropertyAccessQuery") -> "PropertyRetrievalResponse":
+        """
+        Get a property of an :class:`~pyda.providers.AsyncProvider`, from within
+        the provider's event loop.
+
+        """
+        key = canonical_query_key(query)
+        task = self._tasks.get(key)
+        if task is None:
+            provider = typing.cast("AsyncProvider", self._provider())
+            assert provider is not None
+            task = self._tasks[key] = asyncio.ensure_future(provider._get_property_async(query))
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        else:
+            with self._lock:
+                self.coalesced += 1
+        # The task is shared, so it must not be cancelled if this get is.
+        return await asyncio.shield(task)
+
+    async def get_properties_async(
+            self,
+            queries: typing.Sequence["PropertyAccessQuery"],
+    ) -> typing.List["PropertyRetrievalResponse"]:
+        """
+        Get properties of an :class:`~pyda.providers.AsyncProvider`, from within the
+        provider's event loop, requesting those which are not in flight already
+        through the provider's ``_get_properties_async``.
+
+        """
+        loop = asyncio.get_running_loop()
+        tasks: typing.List[asyncio.Future] = []
+        # The queries which must be requested, with the futures of their responses.
+        requests: typing.List[typing.Tuple["PropertyAccessQuery", asyncio.Future]] = []
+        for query in queries:
+            key = canonical_query_key(query)
+            task = self._tasks.get(key)
+            if task is None:
+                task = self._tasks[key] = loop.create_future()
+                task.add_done_callback(functools.partial(self._task_done, key))
+                requests.append((query, task))
+            else:
+                with self._lock:
+                    self.coalesced += 1
+            tasks.append(task)
+        if requests:
+            provider = typing.cast("AsyncProvider", self._provider())
+            assert provider is not None
+            batch = asyncio.ensure_future(
+                provider._get_properties_async([query for query, _ in requests]),
+            )
+            batch.add_done_callback(
+                functools.partial(_resolve_batch, [task for _, task in requests]),
+            )
+        # The tasks are shared, so they must not be cancelled if this get is.
+        return list(await asyncio.gather(*(asyncio.shield(task) for task in tasks)))
+
+    def _task_done(self, key: typing.Hashable, task: asyncio.Future) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._gets) + len(self._tasks)
+
+    def _request_done(
+            self,
+            key: typing.Hashable,
+            pending: _PendingGet,
+            future: concurrent.futures.Future,
+    ) -> None:
+        with self._lock:
+            if self._gets.get(key) is pending:
+                del self._gets[key]
+
+
+def _resolve_batch(tasks: typing.Sequence[asyncio.Future], batch: asyncio.Future) -> None:
+    # Resolve the futures of each query of a batch of gets, once the batch is done.
+    if batch.cancelled():
+        for task in tasks:
+            task.cancel()
+        return
+    error = batch.exception()
+    if error is not None:
+        for task in tasks:
+            if not task.done():
+                task.set_exception(error)
+        return
+    for task, response in zip(tasks, batch.result()):
+        if not task.done():
+            task.set_result(response)
+
+
+_REGISTRIES: "weakref.WeakKeyDictionary[BaseProvider, PropertyStreamRegistry]" = \
+    weakref.WeakKeyDictionary()
+_REGISTRIES_LOCK = threading.Lock()
+
+
+def stream_registry(provider: "BaseProvider") -> PropertyStreamRegistry:
+    """
+    Get the (lazily created) property stream registry of the given provider.
+
+    """
+    with _REGISTRIES_LOCK:
+        registry = _REGISTRIES.get(provider)
+        if registry is None:
+            registry = _REGISTRIES[provider] = PropertyStreamRegistry(provider)
+    return registry
+
+
+_IN_FLIGHT_GETS: "weakref.WeakKeyDictionary[BaseProvider, InFlightGets]" = \
+    weakref.WeakKeyDictionary()
+
+
+def in_flight_gets(provider: "BaseProvider") -> InFlightGets:
+    """
+    Get the (lazily created) table of the gets in flight from the given provider.
+
+    """
+    with _REGISTRIES_LOCK:
+        gets = _IN_FLIGHT_GETS.get(provider)
+        if gets is None:
+            gets = _IN_FLIGHT_GETS[provider] = InFlightGets(provider)
+    return gets
@@ -0,0 +1,126 @@
+import concurrent.futures
+import os
+import threading
+import time
+import typing
+
+import numpy as np
+
+from ..data._data import (
+    PropertyAccessError,
+    PropertyRetrievalResponse,
+    PropertyUpdateResponse,
+)
+from ..data._recording import Recording
+from ._core import BaseProvider, _ThreadedPropertyStream
+
+if typing.TYPE_CHECKING:
+    from ..data import PropertyAccessQuery
+
+
+class ReplayPropertyStream(_ThreadedPropertyStream):
+    """
+    A stream which replays the recorded responses of a query, in order of
+    acquisition stamp, from a background thread.
+
+    The replay begins when the first handler is started, and is abandoned if all
+    of the handlers are stopped. It is paused whilst its consumers are congested.
+    The recorded header stamps are kept as they are.
+
+    """
+    def __init__(
+            self,
+            recording: Recording,
+            query: "PropertyAccessQuery",
+            *,
+            speed: typing.Optional[float] = 1.0,
+    ):
+        super().__init__()
+        self._recording = recording
+        self._query = query
+        self._speed = speed
+
+    def _run(self, stopping: threading.Event, finished: threading.Event) -> None:
+        recording = self._recording
+        numbers = recording.select(query=self._query)
+        stamps = recording.records['acquisition_stamp'][numbers]
+        order = np.argsort(stamps, kind='stable')
+        numbers, stamps = numbers[order], stamps[order]
+        started = time.monotonic()
+        first_stamp = int(stamps[0]) if len(stamps) else 0
+        for number, stamp in zip(numbers.tolist(), stamps.tolist()):
+            # The pace is resumed from where it was paused.
+            started += self._wait_while_congested()
+            if self._speed is not None:
+                # Everything which is already due is delivered without waiting.
+                delay = started + (stamp - first_stamp) / 1e9 / self._speed - time.monotonic()
+                if delay > 0 and stopping.wait(delay):
+                    return
+            if stopping.is_set():
+                return
+            response = recording.response(number)
+            self._response_received(
+                PropertyRetrievalResponse(query=self._query, value=response.value),
+            )
+        finished.set()
+
+
+class ReplayProvider(BaseProvider):
+    """
+    A provider of the data in a recording made with a :class:`~pyda.data.StreamRecorder`,
+    which can be used to run clients offline against recorded traffic.
+
+    Gets return the last recorded response for the query, and subscriptions replay
+    the recorded responses at the original pace (``speed=1``), ``speed`` times
+    faster, or as fast as possible (``speed=None``). Sets are refused.
+
+    """
+    def __init__(
+            self,
+            recording: typing.Union[Recording, str, "os.PathLike[str]"],
+            *,
+            speed: typing.Optional[float] = 1.0,
+    ):
+        if speed is not None and speed <= 0:
+            raise ValueError(f"speed must be positive (or None). Got {speed}")
+        if not isinstance(recording, Recording):
+            recording = Recording(recording)
+        self._recording = recording
+        self.speed = speed
+        super().__init__()
+
+    @property
+    def recording(self) -> Recording:
+        return self._recording
+
+    def _get_property(self, query: "PropertyAccessQuery") -> concurrent.futures.Future:
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        numbers = self._recording.select(query=query)
+        if len(numbers) == 0:
+            response = PropertyRetrievalResponse(
+                query=query,
+                exception=PropertyAccessError(f'No data was recorded for {query}'),
+            )
+        else:
+            stamps = self._recording.records['acquisition_stamp'][numbers]
+            # The last of the responses with the greatest stamp.
+            latest = numbers[len(stamps) - 1 - np.argmax(stamps[::-1])]
+            value = self._recording.response(int(latest)).value
+            response = PropertyRetrievalResponse(query=query, value=value)
+        future.set_result(response)
+        return future
+
+    def _set_property(
+            self,
+            query: "PropertyAccessQuery",
+            value: typing.Any,
+    ) -> concurrent.futures.Future:
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        future.set_result(PropertyUpdateResponse(
+            query=query,
+            exception=PropertyAccessError(f'Cannot set {query}: the provider replays a recording'),
+        ))
+        return future
+
+    def _create_property_stream(self, query: "PropertyAccessQuery") -> ReplayPropertyStream:
+        return ReplayPropertyStream(self._recording, query, speed=self.speed)
@@ -0,0 +1,177 @@
+import concurrent.futures
+import threading
+import time
+import typing
+
+import numpy as np
+
+from ..data._data import (
+    AcquiredPropertyData,
+    Header,
+    PropertyAccessError,
+    PropertyRetrievalResponse,
+    PropertyUpdateResponse,
+    Selector,
+    UpdateHeader,
+    _StampContext,
+)
+from ._core import BaseProvider, _ThreadedPropertyStream
+
+if typing.TYPE_CHECKING:
+    from ..data import PropertyAccessQuery
+
+
+class SyntheticPropertyStream(_ThreadedPropertyStream):
+    """
+    A stream of the synthetic data of a query, emitted at the provider's rate
+    from a background thread.
+
+    On every tick, all of the updates which have become due since the previous
+    tick are emitted together, so that high rates are reached without sleeping
+    between updates. The stream pauses whilst its consumers are congested.
+
+    """
+    def __init__(self, provider: "SyntheticProvider", query: "PropertyAccessQuery"):
+        super().__init__()
+        self._provider = provider
+        self._query = query
+        #: The number of updates which have been emitted.
+        self.emitted = 0
+
+    def _run(self, stopping: threading.Event, finished: threading.Event) -> None:
+        provider = self._provider
+        max_updates = provider.max_updates
+        started = time.monotonic()
+        first = self.emitted
+        while not stopping.is_set():
+            if self._wait_while_congested():
+                # The updates which became due whilst paused are skipped.
+                started = time.monotonic()
+                first = self.emitted
+            if provider.rate is None:
+                due = self.emitted + provider.batch_size
+            else:
+                due = first + int((time.monotonic() - started) * provider.rate)
+            if max_updates is not None:
+                due = min(due, max_updates)
+            decongested = self._decongested
+            while self.emitted < due and not stopping.is_set() and decongested.is_set():
+                self._response_received(provider._response(self._query, self.emitted))
+                self.emitted += 1
+            if max_updates is not None and self.emitted >= max_updates:
+                finished.set()
+                return
+            if provider.rate is not None:
+                stopping.wait(provider.tick)
+
+
+class SyntheticProvider(BaseProvider):
+    """
+    A provider of deterministic synthetic data, at configurable rates and
+    payload sizes, for exercising clients without a control system.
+
+    The devices are named ``SYNTHETIC.DEVICE<i>``, and any property of them may be
+    accessed with the configured selectors. The data has ``n_scalars`` float
+    fields named ``scalar<k>`` and ``n_arrays`` float array fields of
+    ``array_size`` elements named ``array<k>``. The values and the header stamps
+    of the n-th update of a query are a function of n alone, with updates
+    ``1e9 / rate`` nanoseconds apart from ``start_stamp``. The fields are a plain
+    mapping of numpy values, so the data has no ``data_type``.
+
+    Property streams emit ``rate`` updates per second (or batches of
+    ``batch_size`` as fast as possible if ``rate`` is None), until
+    ``max_updates`` have been emitted. Gets return the next update of the
+    query, and sets are accepted (and discarded).
+
+    """
+    def __init__(
+            self,
+            *,
+            n_devices: int = 1,
+            selectors: typing.Sequence[str] = ('',),
+            rate: typing.Optional[float] = 1000.0,
+            n_scalars: int = 1,
+            n_arrays: int = 0,
+            array_size: int = 1024,
+            start_stamp: int = 1_600_000_000_000_000_000,
+            max_updates: typing.Optional[int] = None,
+            tick: float = 0.001,
+            batch_size: int = 1024,
+    ):
+        if rate is not None and rate <= 0:
+            raise ValueError(f"rate must be positive (or None). Got {rate}")
+        self.devices = [f'SYNTHETIC.DEVICE{i}' for i in range(n_devices)]
+        self._device_numbers = {device: i for i, device in enumerate(self.devices)}
+        self.selectors = [Selector(selector) for selector in selectors]
+        self._selector_names = set(selectors)
+        self.rate = rate
+        self.n_scalars = n_scalars
+        self.n_arrays = n_arrays
+        self.array_size = array_size
+        self.start_stamp = start_stamp
+        self.max_updates = max_updates
+        self.tick = tick
+        self.batch_size = batch_size
+        # The period between updates, in nanoseconds (1us if as fast as possible).
+        self._period = round(1e9 / rate) if rate is not None else 1000
+        self._ramp = np.arange(array_size, dtype=np.float64)
+        # The number of the update last returned by a get, for each query.
+        self._gets: typing.Dict[typing.Tuple[str, str, str], int] = {}
+        self._lock = threading.Lock()
+        super().__init__()
+
+    def _check_query(self, query: "PropertyAccessQuery") -> typing.Optional[PropertyAccessError]:
+        if query.device not in self._device_numbers:
+            return PropertyAccessError(f'Unknown synthetic device {query.device!r}')
+        if str(query.selector) not in self._selector_names:
+            return PropertyAccessError(f'Unknown selector {query.selector} for {query.device!r}')
+        return None
+
+    def _response(self, query: "PropertyAccessQuery", n: int) -> PropertyRetrievalResponse:
+        # The n-th update of the query. The values differ between devices.
+        offset = 1000.0 * self._device_numbers[query.device] + n
+        fields: typing.Dict[str, typing.Any] = {
+            f'scalar{k}': np.float64(offset + k) for k in range(self.n_scalars)
+        }
+        for k in range(self.n_arrays):
+            fields[f'array{k}'] = self._ramp + (offset + k)
+        stamp = self.start_stamp + n * self._period
+        context = _StampContext(
+            acquisition_stamp=stamp,
+            cycle_stamp=stamp if query.selector else None,
+            selector=query.selector if query.selector else None,
+        )
+        value = AcquiredPropertyData(dtv=fields, header=Header(context))
+        return PropertyRetrievalResponse(query=query, value=value)
+
+    def _get_property(self, query: "PropertyAccessQuery") -> concurrent.futures.Future:
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        error = self._check_query(query)
+        if error is not None:
+            future.set_result(PropertyRetrievalResponse(query=query, exception=error))
+            return future
+        key = (query.device, query.prop, str(query.selector))
+        with self._lock:
+            n = self._gets[key] = self._gets.get(key, -1) + 1
+        future.set_result(self._response(query, n))
+        return future
+
+    def _set_property(
+            self,
+            query: "PropertyAccessQuery",
+            value: typing.Any,
+    ) -> concurrent.futures.Future:
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        error = self._check_query(query)
+        if error is not None:
+            future.set_result(PropertyUpdateResponse(query=query, exception=error))
+            return future
+        self._prepare_value_for_set(query, value)
+        future.set_result(PropertyUpdateResponse(query=query, header=UpdateHeader(query.selector)))
+        return future
+
+    def _create_property_stream(self, query: "PropertyAccessQuery") -> SyntheticPropertyStream:
+        error = self._check_query(query)
+        if error is not None:
+            raise error
+        return SyntheticPropertyStream(self, query)
@@ -1,4 +1,6 @@
 import asyncio
+import threading
+import time
 from unittest import mock
 
 import pytest
@@ -6,6 +8,8 @@ import pytest
 import pyda
 from pyda import data
 from pyda.clients import asyncio as asyncio_client
+from pyda.clients import core
+from pyda.data._data import _StampContext
 
 
 @pytest.mark.asyncio
@@ -141,3 +145,145 @@ async def test__AsyncIOClient__subscribe(kwargs, dummy_provider, expected_query_
     )
     assert isinstance(sub, asyncio_client.AsyncIOSubscription)
     assert sub.query == data.PropertyAccessQuery(**expected_query_args)
+
+
+@pytest.mark.asyncio
+async def test__AsyncIOClient__get_many(dummy_provider):
+    responses = [mock.MagicMock(), mock.MagicMock()]
+    futures = []
+    for resp in responses:
+        future = asyncio.Future()
+        future.set_result(resp)
+        futures.append(future)
+    dummy_provider._get_properties.return_value = futures
+    cli = pyda.AsyncIOClient(provider=dummy_provider)
+    result = await cli.get_many([
+        {'device': 'some-device', 'prop': 'some-property', 'selector': 'SOME.SEL'},
+        {'device': 'other-device', 'prop': 'some-property'},
+    ])
+    dummy_provider._get_properties.assert_called_once_with([
+        data.PropertyAccessQuery(
+            device='some-device', prop='some-property', selector=data.Selector('SOME.SEL'),
+        ),
+        data.PropertyAccessQuery(
+            device='other-device', prop='some-property', selector=data.Selector(''),
+        ),
+    ])
+    assert result == responses
+
+
+@pytest.mark.asyncio
+async def test__AsyncIOClient__set_many(dummy_provider):
+    responses = [mock.MagicMock(), mock.MagicMock()]
+    futures = []
+    for resp in responses:
+        future = asyncio.Future()
+        future.set_result(resp)
+        futures.append(future)
+    dummy_provider._set_properties.return_value = futures
+    cli = pyda.AsyncIOClient(provider=dummy_provider)
+    query = data.PropertyAccessQuery(
+        device='some-device', prop='some-property', selector=data.Selector(''),
+    )
+    result = await cli.set_many([(query, {'a': 1}), (query, {'a': 2})])
+    dummy_provider._set_properties.assert_called_once_with([(query, {'a': 1}), (query, {'a': 2})])
+    assert result == responses
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "overflow,expected_responses,expected_dropped", [
+        (core.OverflowPolicy.DROP_OLDEST, [3, 4], 3),
+        (core.OverflowPolicy.DROP_NEWEST, [0, 1], 3),
+        (core.OverflowPolicy.KEEP_LATEST, [4], 4),
+    ],
+)
+async def test__AsyncIOSubscription__overflow(dummy_provider, overflow, expected_responses, expected_dropped):
+    cli = pyda.AsyncIOClient(provider=dummy_provider)
+    sub = cli.subscribe(device='some-device', prop='some-property', maxsize=2, overflow=overflow)
+    async with sub:
+        for i in range(5):
+            sub._q.offer(i)
+        assert [await sub.__anext__() for _ in expected_responses] == expected_responses
+        assert sub._q.empty()
+    assert sub.dropped == expected_dropped
+
+
+@pytest.mark.asyncio
+async def test__AsyncIOSubscription__bound_holds(dummy_provider):
+    cli = pyda.AsyncIOClient(provider=dummy_provider)
+    sub = cli.subscribe(device='some-device', prop='some-property', maxsize=10)
+
+    def produce():
+        for i in range(10_000):
+            sub._response_received(i)
+
+    async with sub:
+        thread = threading.Thread(target=produce)
+        thread.start()
+        while thread.is_alive() or sub._dispatcher._pending:
+            await asyncio.sleep(0.001)
+        await asyncio.sleep(0)
+        # The oldest responses were dropped, rather than held anywhere.
+        assert sub.queue_depth == 10
+        assert sub.dropped == 9990
+        assert [await sub.__anext__() for _ in range(10)] == list(range(9990, 10_000))
+
+
+@pytest.mark.asyncio
+async def test__AsyncIOSubscription__bounded_block_refused(dummy_provider):
+    cli = pyda.AsyncIOClient(provider=dummy_provider)
+    with pytest.raises(ValueError, match="cannot block"):
+        cli.subscribe(device='some-device', prop='some-property', maxsize=1, overflow=core.OverflowPolicy.BLOCK)
+    # Unbounded queues never block anyway.
+    cli.subscribe(device='some-device', prop='some-property', overflow=core.OverflowPolicy.BLOCK)
+
+
+@pytest.mark.asyncio
+async def test__AsyncIOSubscription__delivery_from_threads(dummy_provider):
+    cli = pyda.AsyncIOClient(provider=dummy_provider)
+    sub1 = cli.subscribe(device='some-device', prop='some-property')
+    sub2 = cli.subscribe(device='other-device', prop='some-property')
+
+    def produce(sub, name):
+        for i in range(100):
+            sub._response_received(f'{name}-{i}')
+
+    async with sub1, cli.subscriptions:
+        threads = [
+            threading.Thread(target=produce, args=(sub1, 'sub1')),
+            threading.Thread(target=produce, args=(sub2, 'sub2')),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert [await sub1.__anext__() for _ in range(100)] == [f'sub1-{i}' for i in range(100)]
+        from_pool = [await cli.subscriptions.__anext__() for _ in range(200)]
+    assert [r for r in from_pool if r.startswith('sub1')] == [f'sub1-{i}' for i in range(100)]
+    assert [r for r in from_pool if r.startswith('sub2')] == [f'sub2-{i}' for i in range(100)]
+
+
+@pytest.mark.asyncio
+async def test__AsyncIOSubscription__queue_depth(dummy_provider):
+    cli = pyda.AsyncIOClient(provider=dummy_provider)
+    sub = cli.subscribe(device='some-device', prop='some-property')
+    for i in range(3):
+        sub._q.offer(i)
+    assert sub.queue_depth == 3
+    await sub.__anext__()
+    assert cli.metrics()['subscriptions'][0]['queue_depth'] == 2
+
+
+@pytest.mark.asyncio
+async def test__AsyncIOClient__get__max_age(dummy_provider):
+    cli = pyda.AsyncIOClient(provider=dummy_provider)
+    sub = cli.subscribe(device='some-device', prop='some-property')
+    value = data.AcquiredPropertyData(dtv={}, header=data.Header(_StampContext(time.time_ns())))
+    fresh = data.PropertyRetrievalResponse(query=sub.query, value=value)
+
+    sub.start()
+    sub._property_stream._response_received(fresh)
+    assert await cli.get(device='some-device', prop='some-property', max_age=1) is fresh
+    dummy_provider._get_property.assert_not_called()
+    sub.stop()
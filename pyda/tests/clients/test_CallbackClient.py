@@ -1,3 +1,6 @@
+import concurrent.futures
+import threading
+import time
 from unittest import mock
 
 import pytest
@@ -5,6 +8,8 @@ import pytest
 import pyda
 from pyda import data
 from pyda.clients import callback
+from pyda.data._data import _StampContext
+from pyda.providers._core import BasePropertyStream
 
 
 @pytest.mark.parametrize(
@@ -135,3 +140,148 @@ def test__CallbackClient__subscribe(kwargs, dummy_provider, expected_query_args)
     )
     assert isinstance(sub, callback.CallbackSubscription)
     assert sub.query == data.PropertyAccessQuery(**expected_query_args)
+
+
+def test__CallbackClient__get_many(dummy_provider):
+    futures = [concurrent.futures.Future(), concurrent.futures.Future()]
+    dummy_provider._get_properties.return_value = futures
+    cli = pyda.CallbackClient(provider=dummy_provider)
+    callback = mock.Mock()
+    cli.get_many(
+        [
+            {'device': 'some-device', 'prop': 'some-property'},
+            {'device': 'other-device', 'prop': 'some-property'},
+        ],
+        callback=callback,
+    )
+    futures[1].set_result('second')
+    futures[0].set_result('first')
+    cli._pool.shutdown(wait=True)
+    assert callback.call_args_list == [mock.call('second'), mock.call('first')]
+
+
+def test__CallbackClient__set_many(dummy_provider):
+    futures = [concurrent.futures.Future(), concurrent.futures.Future()]
+    dummy_provider._set_properties.return_value = futures
+    cli = pyda.CallbackClient(provider=dummy_provider)
+    callback = mock.Mock()
+    cli.set_many(
+        [
+            ({'device': 'some-device', 'prop': 'some-property'}, {'a': 1}),
+            ({'device': 'other-device', 'prop': 'some-property'}, {'a': 2}),
+        ],
+        callback=callback,
+    )
+    futures[0].set_result('first')
+    futures[1].set_result('second')
+    cli._pool.shutdown(wait=True)
+    assert callback.call_args_list == [mock.call('first'), mock.call('second')]
+
+
+def test__CallbackClient__shared_executor(dummy_provider):
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+    cli1 = pyda.CallbackClient(provider=dummy_provider, executor=executor)
+    cli2 = pyda.CallbackClient(provider=dummy_provider, executor=executor)
+    assert cli1._pool is cli2._pool is executor
+    with pytest.raises(ValueError):
+        pyda.CallbackClient(provider=dummy_provider, executor=executor, max_workers=2)
+
+
+def test__CallbackClient__keyed_serial(dummy_provider):
+    cli = pyda.CallbackClient(provider=dummy_provider, max_workers=4, keyed_serial=True)
+    received = {'sub1': [], 'sub2': []}
+    both_running = threading.Barrier(2, timeout=5)
+
+    def make_callback(name):
+        def callback(response):
+            if response == 0:
+                # Both subscriptions must be able to run at the same time.
+                both_running.wait()
+            time.sleep(0.001)
+            received[name].append(response)
+        return callback
+
+    sub1 = cli.subscribe(device='some-device', prop='some-property', callback=make_callback('sub1'))
+    sub2 = cli.subscribe(device='other-device', prop='some-property', callback=make_callback('sub2'))
+    for i in range(50):
+        sub1._response_received(i)
+        sub2._response_received(i)
+    cli._pool.shutdown(wait=True)
+    assert received == {'sub1': list(range(50)), 'sub2': list(range(50))}
+
+
+def test__KeyedSerialExecutor__results_and_exceptions():
+    executor = callback.KeyedSerialExecutor(concurrent.futures.ThreadPoolExecutor(max_workers=2))
+    futures = [executor.submit('key', pow, 2, i) for i in range(100)]
+    failure = executor.submit('key', int, 'not-an-int')
+    assert [future.result() for future in futures] == [2 ** i for i in range(100)]
+    with pytest.raises(ValueError):
+        failure.result()
+
+
+def test__KeyedSerialExecutor__submit_after_shutdown():
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    executor = callback.KeyedSerialExecutor(pool)
+    pool.shutdown(wait=True)
+    with pytest.raises(RuntimeError):
+        executor.submit('key', pow, 2, 1)
+    # The key is not left busy, so a later submission is not queued forever.
+    assert executor._pending == {}
+    with pytest.raises(RuntimeError):
+        executor.submit('key', pow, 2, 1)
+    assert executor._pending == {}
+
+
+def test__CallbackSubscription__metrics(dummy_provider):
+    cli = pyda.CallbackClient(provider=dummy_provider)
+    release = threading.Event()
+    sub = cli.subscribe(device='some-device', prop='some-property', callback=lambda response: release.wait(5))
+    for i in range(3):
+        sub._response_received(i)
+    # The first callback is running, the others are waiting for it.
+    time.sleep(0.05)
+    assert sub.queue_depth == 2
+    release.set()
+    cli._pool.shutdown(wait=True)
+    assert sub.metrics()['queue_depth'] == 0
+    assert sub.metrics()['received'] == 3
+
+
+def test__CallbackSubscription__watermarks(dummy_provider):
+    source = BasePropertyStream()
+    dummy_provider._create_property_stream.return_value = source
+    cli = pyda.CallbackClient(provider=dummy_provider)
+    release = threading.Event()
+    received = []
+    sub = cli.subscribe(
+        device='some-device', prop='some-property',
+        callback=lambda response: (release.wait(5), received.append(response)),
+    )
+    sub.set_watermarks(2, low=0)
+    sub.start()
+    for i in range(5):
+        source._response_received(i)
+    # The first callback is running, and two are pending: the rest is held back.
+    assert source.congested
+    release.set()
+    deadline = time.monotonic() + 5
+    while len(received) < 4 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not source.congested
+    assert received == [0, 1, 2, 4]
+    sub.stop()
+
+
+def test__CallbackClient__get__max_age(dummy_provider):
+    cli = pyda.CallbackClient(provider=dummy_provider)
+    sub = cli.subscribe(device='some-device', prop='some-property', callback=mock.Mock())
+    value = data.AcquiredPropertyData(dtv={}, header=data.Header(_StampContext(time.time_ns())))
+    fresh = data.PropertyRetrievalResponse(query=sub.query, value=value)
+    got = concurrent.futures.Future()
+
+    sub.start()
+    sub._property_stream._response_received(fresh)
+    cli.get(device='some-device', prop='some-property', callback=got.set_result, max_age=1)
+    assert got.result(timeout=5) is fresh
+    dummy_provider._get_property.assert_not_called()
+    sub.stop()
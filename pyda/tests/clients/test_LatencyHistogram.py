@@ -0,0 +1,57 @@
+import time
+
+import pytest
+
+from pyda import data
+from pyda.clients.core import LatencyHistogram
+from pyda.data._data import _StampContext
+
+
+def response(acquisition_stamp):
+    value = data.AcquiredPropertyData(dtv={}, header=data.Header(_StampContext(acquisition_stamp)))
+    query = data.PropertyAccessQuery(device='dev', prop='prop', selector=data.Selector(''))
+    return data.PropertyRetrievalResponse(query=query, value=value)
+
+
+def test__LatencyHistogram__observe():
+    histogram = LatencyHistogram(bounds=[0.001, 0.01, 0.1])
+    for latency in [0.0005, 0.001, 0.005, 0.05, 0.05, 1.]:
+        histogram.observe(latency)
+    snapshot = histogram.snapshot()
+    assert snapshot['count'] == 6
+    assert snapshot['mean'] == pytest.approx(1.1065 / 6)
+    assert snapshot['buckets'] == {0.001: 2, 0.01: 1, 0.1: 2, None: 1}
+    assert snapshot['p50'] == 0.01
+    assert snapshot['p99'] is None
+
+
+def test__LatencyHistogram__empty():
+    snapshot = LatencyHistogram().snapshot()
+    assert snapshot['count'] == 0
+    assert snapshot['mean'] is None
+    assert snapshot['p50'] is None
+
+
+def test__LatencyHistogram__merge():
+    h1 = LatencyHistogram(bounds=[1., 2.])
+    h2 = LatencyHistogram(bounds=[1., 2.])
+    h1.observe(0.5)
+    h2.observe(1.5)
+    h2.observe(1.5)
+    merged = h1.merge(h2)
+    assert merged.snapshot()['buckets'] == {1.: 1, 2.: 2, None: 0}
+    assert merged.count == 3
+    with pytest.raises(ValueError):
+        h1.merge(LatencyHistogram())
+
+
+def test__LatencyHistogram__observe_response():
+    histogram = LatencyHistogram()
+    histogram.observe_response(response(time.time_ns() - 3_000_000))
+    assert histogram.count == 1
+    assert 0.003 <= histogram.total < 1
+    # Responses without an acquisition stamp are ignored.
+    query = data.PropertyAccessQuery(device='dev', prop='prop', selector=data.Selector(''))
+    histogram.observe_response(data.PropertyRetrievalResponse(query=query, exception=data.PropertyAccessError()))
+    histogram.observe_response('not a response')
+    assert histogram.count == 1
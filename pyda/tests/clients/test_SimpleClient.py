@@ -1,8 +1,14 @@
+import threading
+import time
+from unittest import mock
+
 import pytest
 
 import pyda
 from pyda import data
-from pyda.clients import simple
+from pyda.clients import core, simple
+from pyda.data._data import _StampContext
+from pyda.providers._core import BasePropertyStream
 
 
 @pytest.mark.parametrize(
@@ -133,3 +139,254 @@ def test__SimpleClient__subscribe(kwargs, dummy_provider, expected_query_args):
     )
     assert isinstance(sub, simple.SimpleSubscription)
     assert sub.query == data.PropertyAccessQuery(**expected_query_args)
+
+
+def test__SimpleClient__get_many(dummy_provider):
+    responses = [mock.MagicMock(), mock.MagicMock()]
+    futures = [mock.Mock(**{'result.return_value': resp}) for resp in responses]
+    dummy_provider._get_properties.return_value = futures
+    cli = pyda.SimpleClient(provider=dummy_provider)
+    result = cli.get_many([
+        {'device': 'some-device', 'prop': 'some-property'},
+        data.PropertyAccessQuery(
+            device='other-device', prop='some-property', selector=data.Selector('SOME.SEL'),
+        ),
+    ])
+    dummy_provider._get_properties.assert_called_once_with([
+        data.PropertyAccessQuery(
+            device='some-device', prop='some-property', selector=data.Selector(''),
+        ),
+        data.PropertyAccessQuery(
+            device='other-device', prop='some-property', selector=data.Selector('SOME.SEL'),
+        ),
+    ])
+    dummy_provider._get_property.assert_not_called()
+    assert result == responses
+
+
+def test__SimpleClient__set_many(dummy_provider):
+    responses = [mock.MagicMock(), mock.MagicMock()]
+    futures = [mock.Mock(**{'result.return_value': resp}) for resp in responses]
+    dummy_provider._set_properties.return_value = futures
+    cli = pyda.SimpleClient(provider=dummy_provider)
+    result = cli.set_many([
+        ({'device': 'some-device', 'prop': 'some-property'}, {'a': 1}),
+        ({'device': 'other-device', 'prop': 'some-property', 'selector': 'SOME.SEL'}, {'a': 2}),
+    ])
+    dummy_provider._set_properties.assert_called_once_with([
+        (
+            data.PropertyAccessQuery(
+                device='some-device', prop='some-property', selector=data.Selector(''),
+            ),
+            {'a': 1},
+        ),
+        (
+            data.PropertyAccessQuery(
+                device='other-device', prop='some-property', selector=data.Selector('SOME.SEL'),
+            ),
+            {'a': 2},
+        ),
+    ])
+    dummy_provider._set_property.assert_not_called()
+    assert result == responses
+
+
+@pytest.mark.parametrize(
+    "overflow,expected_responses,expected_dropped", [
+        (core.OverflowPolicy.DROP_OLDEST, [3, 4], 3),
+        (core.OverflowPolicy.DROP_NEWEST, [0, 1], 3),
+        (core.OverflowPolicy.KEEP_LATEST, [4], 4),
+        ('keep-latest', [4], 4),
+    ],
+)
+def test__SimpleSubscription__overflow(dummy_provider, overflow, expected_responses, expected_dropped):
+    cli = pyda.SimpleClient(provider=dummy_provider)
+    sub = cli.subscribe(device='some-device', prop='some-property', maxsize=2, overflow=overflow)
+    with sub:
+        for i in range(5):
+            sub._response_received(i)
+        assert [next(sub) for _ in expected_responses] == expected_responses
+        assert sub._q.empty()
+    assert sub.dropped == expected_dropped
+
+
+def test__SimpleSubscriptionPool__overflow(dummy_provider):
+    cli = pyda.SimpleClient(
+        provider=dummy_provider, pool_maxsize=3, pool_overflow=core.OverflowPolicy.DROP_OLDEST,
+    )
+    sub1 = cli.subscribe(device='some-device', prop='some-property')
+    sub2 = cli.subscribe(device='other-device', prop='some-property')
+    with cli.subscriptions:
+        for i in range(3):
+            sub1._response_received(f'sub1-{i}')
+            sub2._response_received(f'sub2-{i}')
+        assert [next(cli.subscriptions) for _ in range(3)] == ['sub2-1', 'sub1-2', 'sub2-2']
+    assert cli.subscriptions.dropped == 3
+    assert sub1.dropped == sub2.dropped == 0
+
+
+def test__SimpleSubscription__watermarks(dummy_provider):
+    source = BasePropertyStream()
+    dummy_provider._create_property_stream.return_value = source
+    cli = pyda.SimpleClient(provider=dummy_provider)
+    sub = cli.subscribe(device='some-device', prop='some-property')
+    sub.set_watermarks(3, low=1)
+    sub.start()
+    with sub:
+        for i in range(5):
+            source._response_received(i)
+        assert sub.queue_depth == 3
+        assert source.congested
+        assert [next(sub) for _ in range(2)] == [0, 1]
+        # Drained to the low watermark: the latest of the held back responses follows.
+        assert not source.congested
+        assert [next(sub) for _ in range(2)] == [2, 4]
+    assert source.conflated == 1
+    sub.stop()
+
+
+def test__SimpleSubscription__watermarks__congested_again_by_the_flush(dummy_provider):
+    # The held back response is delivered from within the decongestion, and congests
+    # the subscription again straight away.
+    source = BasePropertyStream()
+    dummy_provider._create_property_stream.return_value = source
+    cli = pyda.SimpleClient(provider=dummy_provider)
+    sub = cli.subscribe(device='some-device', prop='some-property')
+    sub.set_watermarks(2, low=1)
+    sub.start()
+    received = []
+
+    def drain():
+        with sub:
+            for i in range(3):
+                source._response_received(i)
+            assert source.congested
+            received.extend(next(sub) for _ in range(3))
+
+    thread = threading.Thread(target=drain, daemon=True)
+    thread.start()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    assert received == [0, 1, 2]
+    assert not source.congested
+    sub.stop()
+
+
+def test__SimpleSubscription__set_watermarks__replaces(dummy_provider):
+    source = BasePropertyStream()
+    dummy_provider._create_property_stream.return_value = source
+    cli = pyda.SimpleClient(provider=dummy_provider)
+    sub = cli.subscribe(device='some-device', prop='some-property')
+    sub.start()
+    with sub:
+        sub.set_watermarks(1)
+        source._response_received(0)
+        assert source.congested
+        sub.set_watermarks(None)
+        assert not source.congested
+        with pytest.raises(ValueError):
+            sub.set_watermarks(2, low=2)
+    sub.stop()
+
+
+def test__SimpleSubscriptionPool__watermarks(dummy_provider):
+    sources = [BasePropertyStream(), BasePropertyStream()]
+    dummy_provider._create_property_stream.side_effect = sources
+    cli = pyda.SimpleClient(provider=dummy_provider)
+    cli.subscriptions.set_watermarks(2)
+    sub1 = cli.subscribe(device='some-device', prop='some-property')
+    sub1.start()
+    with cli.subscriptions:
+        sources[0]._response_received('sub1-0')
+        sources[0]._response_received('sub1-1')
+        assert sources[0].congested
+    # A subscription added to a congested pool is held back too.
+    cli.subscribe(device='other-device', prop='some-property')
+    assert sources[1].congested
+    with cli.subscriptions:
+        assert next(cli.subscriptions) == 'sub1-0'
+        assert not sources[0].congested and not sources[1].congested
+    sub1.stop()
+
+
+def test__SimpleSubscription__latest(dummy_provider):
+    cli = pyda.SimpleClient(provider=dummy_provider)
+    sub = cli.subscribe(device='some-device', prop='some-property')
+    assert sub.latest() is None
+    sub._response_received('first')
+    sub._response_received('second')
+    assert sub.latest() == 'second'
+    # Nothing was queued, as the subscription was not being iterated.
+    assert sub._q.empty()
+
+
+def test__SimpleSubscriptionPool__attach(dummy_provider):
+    cli = pyda.SimpleClient(provider=dummy_provider)
+    handler = mock.Mock()
+    sub1 = cli.subscribe(device='some-device', prop='some-property')
+    cli.subscriptions.attach(handler)
+    # Subscriptions created after attaching get the handler too.
+    sub2 = cli.subscribe(device='other-device', prop='some-property')
+    sub1._response_received('first')
+    sub2._response_received('second')
+    assert handler._response_received.call_args_list == [mock.call('first'), mock.call('second')]
+
+    cli.subscriptions.detach(handler)
+    sub1._response_received('third')
+    assert handler._response_received.call_count == 2
+    assert sub1.latest() == 'third'
+
+
+def test__SimpleClient__metrics(dummy_provider):
+    cli = pyda.SimpleClient(provider=dummy_provider, pool_maxsize=1, pool_overflow=core.OverflowPolicy.DROP_NEWEST)
+    sub = cli.subscribe(device='some-device', prop='some-property')
+    value = data.AcquiredPropertyData(dtv={}, header=data.Header(_StampContext(time.time_ns() - 2_000_000)))
+    ok = data.PropertyRetrievalResponse(query=sub.query, value=value)
+    error = data.PropertyRetrievalResponse(query=sub.query, exception=data.PropertyAccessError())
+
+    sub.start()
+    with sub, cli.subscriptions:
+        sub._property_stream._response_received(ok)
+        sub._property_stream._response_received(error)
+        assert sub.queue_depth == 2
+        assert next(sub) is ok
+
+    metrics = cli.metrics()
+    assert metrics['received'] == 2
+    assert metrics['errors'] == 1
+    assert metrics['dropped'] == 1
+    assert metrics['latency']['count'] == 1
+    assert metrics['subscriptions'] == [sub.metrics()]
+    assert sub.metrics()['queue_depth'] == 1
+    assert sub.metrics()['latency']['mean'] >= 0.002
+    assert cli.subscriptions.subscriptions == (sub,)
+    assert metrics['pool'] == {
+        'received': 2, 'errors': 1, 'dropped': 1, 'queue_depth': 1,
+        'latency': cli.subscriptions.latency.snapshot(),
+    }
+    [stream] = metrics['streams']
+    assert stream == {'query': str(sub.query), 'updates': 2, 'errors': 1, 'handlers': 1, 'congested': False, 'conflated': 0}
+
+
+def test__SimpleClient__get__max_age(dummy_provider):
+    requested = mock.Mock()
+    dummy_provider._get_property.return_value.result.return_value = requested
+    cli = pyda.SimpleClient(provider=dummy_provider)
+    sub = cli.subscribe(device='some-device', prop='some-property')
+
+    def response(age):
+        value = data.AcquiredPropertyData(dtv={}, header=data.Header(_StampContext(time.time_ns() - age)))
+        return data.PropertyRetrievalResponse(query=sub.query, value=value)
+
+    fresh, stale = response(1_000_000), response(10_000_000_000)
+    # Without a running subscription, a request is always made.
+    assert cli.get(device='some-device', prop='some-property', max_age=1) is requested
+    sub.start()
+    with sub:
+        sub._property_stream._response_received(fresh)
+        assert cli.get(device='some-device', prop='some-property', max_age=1) is fresh
+        assert cli.get(device='some-device', prop='some-property') is requested
+        sub._property_stream._response_received(stale)
+        assert cli.get(device='some-device', prop='some-property', max_age=1) is requested
+    sub.stop()
+    assert sub._property_stream.latest is None
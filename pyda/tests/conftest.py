@@ -2,7 +2,44 @@ from unittest import mock
 
 import pytest
 
+from pyda import data
+
 
 @pytest.fixture
 def dummy_provider():
     return mock.MagicMock()
+
+
+@pytest.fixture
+def query(request):
+    """
+    A factory of queries: ``query(device=None, selector='', **data_filters)``.
+
+    The property, and the device when none is given, are those of the ``PROP`` and
+    ``DEVICE`` attributes of the test module (if it has them).
+
+    """
+    default_device = getattr(request.module, 'DEVICE', 'some-device')
+    prop = getattr(request.module, 'PROP', 'some-property')
+
+    def query(device=None, selector='', **data_filters):
+        return data.PropertyAccessQuery(
+            device=device or default_device, prop=prop, selector=data.Selector(selector),
+            data_filters=data_filters,
+        )
+    return query
+
+
+class RecordingHandler:
+    # A stream handler which records the responses it receives.
+
+    def __init__(self):
+        self.responses = []
+
+    def _response_received(self, response):
+        self.responses.append(response)
+
+
+@pytest.fixture
+def handler_class():
+    return RecordingHandler
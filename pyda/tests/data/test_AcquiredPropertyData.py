@@ -1,6 +1,69 @@
+from unittest import mock
+
+import numpy as np
+import pytest
+
 from pyda import data
 
 
 def test__AcquiredPropertyData__str__():
     resp = data.AcquiredPropertyData(dtv="VALUE_OUTPUT", header="HEADER_OUTPUT")
     assert str(resp) == "AcquiredPropertyData HEADER_OUTPUT\nVALUE_OUTPUT"
+
+
+@pytest.fixture
+def acquired_data():
+    dtv = {'waveform': np.arange(5.), 'scalar': np.int32(3), 'text': 'hello'}
+    return data.AcquiredPropertyData(dtv=dtv, header="HEADER")
+
+
+def test__AcquiredPropertyData__data_type():
+    dtv = mock.Mock()
+    assert data.AcquiredPropertyData(dtv=dtv, header="HEADER").data_type is dtv.data_type
+    assert data.AcquiredPropertyData(dtv={'a': 1}, header="HEADER").data_type is None
+
+
+def test__AcquiredPropertyData__arrays_are_read_only_views(acquired_data):
+    waveform = acquired_data['waveform']
+    assert not waveform.flags.writeable
+    assert np.shares_memory(waveform, acquired_data._dtv['waveform'])
+    with pytest.raises(ValueError):
+        waveform[0] = 42
+    assert not acquired_data.get('waveform').flags.writeable
+    assert not dict(acquired_data.items())['waveform'].flags.writeable
+    assert acquired_data['scalar'] == 3
+    # The underlying data is untouched.
+    assert acquired_data._dtv['waveform'].flags.writeable
+
+
+def test__AcquiredPropertyData__mutable_data__copy_on_write(acquired_data):
+    mutable = acquired_data.mutable_data()
+    assert dict(mutable).keys() == {'waveform', 'scalar', 'text'}
+    # Unchanged fields are shared with the original.
+    assert np.shares_memory(mutable['waveform'], acquired_data._dtv['waveform'])
+    assert mutable._changed == {}
+
+    mutable['scalar'] = 15
+    assert mutable['scalar'] == 15
+    assert acquired_data['scalar'] == 3
+    assert list(mutable._changed) == ['scalar']
+
+    waveform = mutable.writable('waveform')
+    waveform[0] = 42
+    assert mutable.writable('waveform') is waveform
+    assert mutable['waveform'][0] == 42
+    assert acquired_data['waveform'][0] == 0
+
+
+def test__AcquiredPropertyData__mutable_data__delete(acquired_data):
+    mutable = acquired_data.mutable_data()
+    del mutable['text']
+    assert 'text' not in mutable
+    assert len(mutable) == 2
+    with pytest.raises(KeyError):
+        del mutable['text']
+    mutable['text'] = 'world'
+    mutable['new'] = 1
+    assert list(mutable) == ['waveform', 'scalar', 'text', 'new']
+    assert (mutable['text'], mutable['new']) == ('world', 1)
+    assert 'text' in acquired_data
@@ -0,0 +1,126 @@
+import numpy as np
+import pyds_model
+import pytest
+
+from pyda import data
+from pyda.data._data import _StampContext
+
+
+def acquired(stamp, **fields):
+    return data.AcquiredPropertyData(
+        dtv=fields,
+        header=data.Header(pyds_model.AcquisitionContext(acquisition_stamp=stamp)),
+    )
+
+
+def response(stamp, **fields):
+    query = data.PropertyAccessQuery(device='dev', prop='prop', selector=data.Selector(''))
+    return data.PropertyRetrievalResponse(query=query, value=acquired(stamp, **fields))
+
+
+def test__FieldHistory__invalid_capacity():
+    with pytest.raises(ValueError):
+        data.FieldHistory(['a'], capacity=0)
+
+
+def test__FieldHistory__empty():
+    history = data.FieldHistory(['scalar'], capacity=4)
+    window = history.last()
+    assert len(history) == 0
+    assert len(window) == 0
+    assert window.fields['scalar'].shape == (0,)
+
+
+def test__FieldHistory__last_wraps_around():
+    history = data.FieldHistory(['scalar', 'waveform'], capacity=3)
+    for i in range(5):
+        history.append(acquired(100 + i, scalar=np.float64(i), waveform=np.full(4, i), other=-1))
+
+    assert len(history) == 3
+    window = history.last()
+    np.testing.assert_array_equal(window.timestamps, [102, 103, 104])
+    np.testing.assert_array_equal(window.fields['scalar'], [2., 3., 4.])
+    assert window.fields['waveform'].shape == (3, 4)
+    np.testing.assert_array_equal(window.fields['waveform'][:, 0], [2, 3, 4])
+    assert 'other' not in window.fields
+
+    window = history.last(2)
+    np.testing.assert_array_equal(window.timestamps, [103, 104])
+    assert len(history.last(10)) == 3
+    assert len(history.last(0)) == 0
+
+
+def test__FieldHistory__windows_are_read_only_views():
+    history = data.FieldHistory(['waveform'], capacity=2)
+    history.append(acquired(1, waveform=np.arange(3)))
+    history.append(acquired(2, waveform=np.arange(3)))
+    window = history.last()
+    assert np.shares_memory(window.fields['waveform'], history._buffers['waveform'])
+    with pytest.raises(ValueError):
+        window.fields['waveform'][0, 0] = 42
+    with pytest.raises(ValueError):
+        window.timestamps[0] = 42
+
+
+def test__FieldHistory__between():
+    history = data.FieldHistory(['scalar'], capacity=4)
+    for i in range(6):
+        history.append(acquired(10 * i, scalar=i))
+
+    window = history.between(25, 45)
+    np.testing.assert_array_equal(window.timestamps, [30, 40])
+    np.testing.assert_array_equal(window.fields['scalar'], [3, 4])
+    np.testing.assert_array_equal(history.between(0, 1000).timestamps, [20, 30, 40, 50])
+    assert len(history.between(100, 200)) == 0
+
+
+def test__FieldHistory__shape_mismatch():
+    history = data.FieldHistory(['waveform'], capacity=2)
+    history.append(acquired(1, waveform=np.arange(3)))
+    with pytest.raises(ValueError, match='shape'):
+        history.append(acquired(2, waveform=np.arange(4)))
+    # A mismatching response is skipped, rather than raised in the stream's thread.
+    history._response_received(response(3, waveform=np.arange(4)))
+    assert len(history) == 1
+
+
+def test__FieldHistory__response_received():
+    history = data.FieldHistory(['scalar'], capacity=2)
+    history._response_received(response(1, scalar=1.5))
+    query = data.PropertyAccessQuery(device='dev', prop='prop', selector=data.Selector(''))
+    history._response_received(
+        data.PropertyRetrievalResponse(query=query, exception=RuntimeError('boom')),
+    )
+    np.testing.assert_array_equal(history.last().fields['scalar'], [1.5])
+
+
+def test__FieldHistory__missing_stamp_is_dropped():
+    history = data.FieldHistory(['scalar'], capacity=2)
+    unstamped = data.AcquiredPropertyData(dtv={'scalar': 1}, header=data.Header(_StampContext(None)))
+    with pytest.raises(ValueError, match='acquisition stamp'):
+        history.append(unstamped)
+    query = data.PropertyAccessQuery(device='dev', prop='prop', selector=data.Selector(''))
+    history._response_received(data.PropertyRetrievalResponse(query=query, value=unstamped))
+    history._response_received(response(2, scalar=2))
+    assert history.dropped == 1
+    np.testing.assert_array_equal(history.last().timestamps, [2])
+    np.testing.assert_array_equal(history.last().fields['scalar'], [2])
+
+
+def test__FieldHistory__values_are_not_narrowed():
+    history = data.FieldHistory(['scalar', 'name'], capacity=4)
+    history.append(acquired(1, scalar=np.int16(1), name='ab'))
+    # Python values which the dtype can hold, and wider dtypes which cast safely.
+    history.append(acquired(2, scalar=1000, name='cd'))
+    with pytest.raises(ValueError, match='dtype'):
+        history.append(acquired(3, scalar=2.5, name='ef'))
+    with pytest.raises(ValueError, match='dtype'):
+        history.append(acquired(3, scalar=np.int32(7), name='gh'))
+    with pytest.raises(ValueError, match='dtype'):
+        history.append(acquired(3, scalar=3, name='longer'))
+    history._response_received(response(3, scalar=100_000, name='ij'))
+    assert history.dropped == 1
+    window = history.last()
+    assert window.fields['scalar'].dtype == np.int16
+    np.testing.assert_array_equal(window.fields['scalar'], [1, 1000])
+    np.testing.assert_array_equal(window.fields['name'], ['ab', 'cd'])
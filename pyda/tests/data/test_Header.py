@@ -2,6 +2,7 @@ import datetime
 from datetime import timezone
 from unittest import mock
 
+import numpy as np
 import pyds_model
 import pytest
 
@@ -14,6 +15,10 @@ from pyda.data import _data
         (1456698342000000000, (2016, 2, 28, 22, 25, 42, 0, timezone.utc)),
         (1456698342743902000, (2016, 2, 28, 22, 25, 42, 743902, timezone.utc)),
         (1391456625628407589, (2014, 2, 3, 19, 43, 45, 628408, timezone.utc)),
+        # Beyond the precision of a float.
+        (1700000000123456499, (2023, 11, 14, 22, 13, 20, 123456, timezone.utc)),
+        (1700000000123456500, (2023, 11, 14, 22, 13, 20, 123457, timezone.utc)),
+        (1700000000999999500, (2023, 11, 14, 22, 13, 21, 0, timezone.utc)),
     ],
 )
 def test__datetime_from_ns(ns, expected_datetime_args):
@@ -171,3 +176,34 @@ def test__Header__cycle_timestamp(context, expected_stamp):
 def test__Header__str__(context, expected_str):
     header = data.Header(context)
     assert str(header) == expected_str
+
+
+@mock.patch('pyda.data._data.datetime_from_ns')
+def test__Header__times_are_cached(datetime_from_ns):
+    header = data.Header(pyds_model.CycleBoundAcquisitionContext(selector='SEL', cycle_stamp=100, acquisition_stamp=200))
+    str(header)
+    str(header)
+    assert header.acquisition_time() is header.acquisition_time()
+    assert datetime_from_ns.call_args_list == [mock.call(200), mock.call(100)]
+
+
+def test__Header__timestamps_are_exact_ints():
+    stamp = 1700000000123456789
+    header = data.Header(pyds_model.AcquisitionContext(acquisition_stamp=stamp))
+    assert header.acquisition_timestamp == stamp
+    assert isinstance(header.acquisition_timestamp, int)
+
+
+def test__datetime64_from_headers():
+    headers = [
+        data.Header(pyds_model.CycleBoundAcquisitionContext(selector='SEL', cycle_stamp=1700000000123456789, acquisition_stamp=1)),
+        data.Header(pyds_model.AcquisitionContext(acquisition_stamp=2)),
+    ]
+    acquisition = data.datetime64_from_headers(headers)
+    assert acquisition.dtype == np.dtype('datetime64[ns]')
+    np.testing.assert_array_equal(acquisition.view(np.int64), [1, 2])
+    cycle = data.datetime64_from_headers(headers, stamp='cycle')
+    assert cycle[0] == np.datetime64(1700000000123456789, 'ns')
+    assert np.isnat(cycle[1])
+    with pytest.raises(ValueError):
+        data.datetime64_from_headers(headers, stamp='unknown')
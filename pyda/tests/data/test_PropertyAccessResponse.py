@@ -37,6 +37,18 @@ def test__PropertyRetrievalResponse__value_fails():
         resp.value
 
 
+def test__PropertyRetrievalResponse__acquisition_timestamp():
+    val = mock.MagicMock()
+    resp = data.PropertyRetrievalResponse(query=mock.MagicMock(), value=val)
+    assert resp.acquisition_timestamp is val._header._acquisition_stamp
+
+    resp = data.PropertyRetrievalResponse(
+        query=mock.MagicMock(),
+        exception=data.PropertyAccessError("Test error"),
+    )
+    assert resp.acquisition_timestamp is None
+
+
 @pytest.mark.parametrize(
     "kwargs,expected_str", [
         (
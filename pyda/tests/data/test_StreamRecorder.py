@@ -0,0 +1,129 @@
+import numpy as np
+import pyds_model
+import pytest
+
+from pyda import data
+from pyda.providers._core import BasePropertyStream
+
+
+DEVICE = 'dev'
+PROP = 'prop'
+
+
+@pytest.fixture
+def make_response(query):
+    def make_response(stamp, device=None, cycle_stamp=None, **fields):
+        if cycle_stamp is None:
+            context = pyds_model.AcquisitionContext(acquisition_stamp=stamp)
+        else:
+            context = pyds_model.CycleBoundAcquisitionContext(
+                selector='SPS.USER.ALL', cycle_stamp=cycle_stamp, acquisition_stamp=stamp,
+            )
+        value = data.AcquiredPropertyData(dtv=fields, header=data.Header(context))
+        return data.PropertyRetrievalResponse(query=query(device), value=value)
+    return make_response
+
+
+def test__StreamRecorder__roundtrip(tmp_path, query, make_response):
+    with data.StreamRecorder(tmp_path / 'rec') as recorder:
+        recorder._response_received(make_response(
+            100, cycle_stamp=90, waveform=np.arange(5.), scalar=np.int32(3), text='hi',
+        ))
+        recorder._response_received(make_response(200, device='other', matrix=np.ones((2, 3), np.int16)))
+    assert recorder.recorded == 2
+
+    recording = data.Recording(tmp_path / 'rec')
+    assert len(recording) == 2
+    assert recording.queries == [query(), query('other')]
+
+    first = recording.response(0)
+    assert first.query == query()
+    assert first.value.header.acquisition_timestamp == 100
+    assert first.value.header.cycle_timestamp == 90
+    assert first.value.header.set_timestamp is None
+    assert first.value.header.selector == data.Selector('SPS.USER.ALL')
+    np.testing.assert_array_equal(first.value['waveform'], np.arange(5.))
+    assert first.value['scalar'] == 3
+    assert first.value['scalar'].dtype == np.int32
+    assert first.value['text'] == 'hi'
+
+    second = recording.response(1)
+    assert second.value.header.selector is None
+    assert second.value['matrix'].shape == (2, 3)
+    assert second.value['matrix'].dtype == np.int16
+    # Recorded fields are a plain mapping, without a data type.
+    assert second.value.data_type is None
+
+
+def test__Recording__fields_are_views_of_the_file(tmp_path, make_response):
+    with data.StreamRecorder(tmp_path) as recorder:
+        recorder.record(make_response(1, waveform=np.arange(3.)))
+    fields = data.Recording(tmp_path).fields(0)
+    assert not fields['waveform'].flags.writeable
+    assert not fields['waveform'].flags.owndata
+
+
+def test__StreamRecorder__skips_exceptions_and_objects(tmp_path, query, make_response):
+    with data.StreamRecorder(tmp_path) as recorder:
+        recorder._response_received(
+            data.PropertyRetrievalResponse(query=query(), exception=data.PropertyAccessError('boom')),
+        )
+        recorder._response_received(make_response(1, obj=np.array([{}, None], dtype=object)))
+    assert recorder.skipped == 2
+    assert recorder.recorded == 0
+    assert len(data.Recording(tmp_path)) == 0
+
+
+def test__StreamRecorder__refuses_existing_recording(tmp_path):
+    data.StreamRecorder(tmp_path).close()
+    with pytest.raises(FileExistsError):
+        data.StreamRecorder(tmp_path)
+
+
+def test__StreamRecorder__closed(tmp_path, make_response):
+    recorder = data.StreamRecorder(tmp_path)
+    recorder.close()
+    with pytest.raises(ValueError, match='closed'):
+        recorder.record(make_response(1, value=1))
+
+
+@pytest.mark.parametrize('index_interval', [1, 3, 4, 100])
+def test__Recording__select(tmp_path, index_interval, query, make_response):
+    with data.StreamRecorder(tmp_path, index_interval=index_interval) as recorder:
+        for i in range(10):
+            # Slightly out of order stamps, from two devices.
+            stamp = 10 * i + (5 if i % 3 == 0 else 0)
+            recorder.record(make_response(stamp, device=f'dev{i % 2}', value=i))
+    recording = data.Recording(tmp_path)
+    stamps = recording.records['acquisition_stamp']
+
+    for start, end in [(None, None), (0, 1), (20, 61), (36, 1000), (91, 200), (55, 55)]:
+        expected = [
+            i for i, stamp in enumerate(stamps)
+            if (start is None or stamp >= start) and (end is None or stamp < end)
+        ]
+        assert list(recording.select(start, end)) == expected
+
+    assert list(recording.select(20, 61, query=query('dev1'))) == [3, 5]
+    assert list(recording.select(query=query('unknown'))) == []
+    values = [response.value['value'] for response in recording.responses(20, 61)]
+    assert values == [2, 3, 4, 5]
+
+
+def test__Recording__reads_flushed_recording_in_progress(tmp_path, make_response):
+    recorder = data.StreamRecorder(tmp_path)
+    recorder.record(make_response(1, value=1))
+    recorder.flush()
+    recorder.record(make_response(2, value=2))
+    assert len(data.Recording(tmp_path)) == 1
+    recorder.close()
+    assert len(data.Recording(tmp_path)) == 2
+
+
+def test__StreamRecorder__attach_to_stream(tmp_path, make_response):
+    stream = BasePropertyStream()
+    recorder = data.StreamRecorder(tmp_path)
+    stream.start(recorder)
+    stream._broadcast_response(make_response(5, value=1.5))
+    recorder.close()
+    assert data.Recording(tmp_path).response(0).value['value'] == 1.5
@@ -1,7 +1,8 @@
 import numpy as np
 import pyds_model
+import pytest
 
-from pyda.data._data import anydata_from_dict
+from pyda.data._data import ConversionPlan, anydata_from_dict, anydata_from_dicts
 
 
 def test_anydata_from_dict__empty():
@@ -53,3 +54,116 @@ def test_anydata_from_dict__list_poly():
     result = anydata_from_dict({'a': [1, 1.2, 'a string']})
     assert isinstance(result['a'], np.ndarray)
     np.testing.assert_array_equal(result['a'], ['1', '1.2', 'a string'])
+
+
+def test_anydata_from_dicts():
+    result = anydata_from_dicts([{'a': 1}, {'a': 2.5, 'b': 'text'}])
+    assert len(result) == 2
+    assert result[0]['a'] == 1
+    assert isinstance(result[1]['a'], np.float_)
+    assert result[1]['b'] == 'text'
+
+
+def test_anydata_from_dict__plan_casts_to_planned_dtype():
+    plan = ConversionPlan({'a': np.dtype(np.int32), 'b': np.dtype(np.float32)})
+    result = anydata_from_dict({'a': 1, 'b': [1, 2.5], 'c': 'text'}, plan)
+    assert isinstance(result['a'], np.int32)
+    assert result['b'].dtype == np.float32
+    assert result['c'] == 'text'
+    # Fields are not learned.
+    assert plan.dtypes == {'a': np.int32, 'b': np.float32}
+
+
+def test_anydata_from_dict__plan_never_truncates():
+    plan = ConversionPlan({'a': np.dtype(np.int32)})
+    result = anydata_from_dict({'a': 1.5}, plan)
+    assert result['a'] == 1.5
+
+
+def test_anydata_from_dict__plan_does_not_copy_matching_arrays():
+    plan = ConversionPlan({'a': np.dtype(np.float64)})
+    array = np.arange(10.)
+    result = anydata_from_dict({'a': array}, plan)
+    assert result['a'] is array
+
+
+def test_anydata_from_dict__plan_never_overflows():
+    plan = ConversionPlan({'a': np.dtype(np.int8), 'b': np.dtype(np.float32), 'c': np.dtype(np.int8)})
+    result = anydata_from_dict({'a': 1000, 'b': 1e300, 'c': [1, 1000]}, plan)
+    assert result['a'] == 1000
+    assert result['b'] == 1e300
+    np.testing.assert_array_equal(result['c'], [1, 1000])
+    # Python scalars which fit are cast, but numpy values only when it is safe.
+    result = anydata_from_dict({'a': -5, 'b': 2.5, 'c': np.int16(3)}, plan)
+    assert isinstance(result['a'], np.int8)
+    assert isinstance(result['b'], np.float32)
+    assert isinstance(result['c'], np.int16)
+
+
+def test_anydata_from_dict__plan_never_narrows_floats():
+    plan = ConversionPlan({'a': np.dtype(np.float32)})
+    result = anydata_from_dict({'a': 0.1}, plan)
+    assert result['a'] == 0.1
+    assert result['a'].dtype == np.float64
+    result = anydata_from_dicts([{'a': 0.5}, {'a': 0.1}], plan)
+    assert [r['a'].dtype for r in result] == [np.float32, np.float64]
+    assert result[1]['a'] == 0.1
+    np.testing.assert_array_equal(anydata_from_dict({'a': [0.5, 0.1]}, plan)['a'], [0.5, 0.1])
+
+
+def test_ConversionPlan__learn():
+    known = ConversionPlan({'a': np.dtype(np.int16)})
+    plan = ConversionPlan.learn({'a': 1, 'b': 2.5, 'c': 'text'}, known)
+    assert plan.dtypes == {'a': np.int16, 'b': np.float64, 'c': None}
+
+
+def test_ConversionPlan__from_value():
+    plan = ConversionPlan.from_value({'a': np.int8(1), 'b': np.zeros(3, dtype=np.uint16), 'c': 'text'})
+    assert plan.dtypes == {'a': np.int8, 'b': np.uint16, 'c': None}
+
+
+def test_anydata_from_dicts__vectorized_columns():
+    values = [{'a': i, 'b': [i, i + 1.5]} for i in range(5)]
+    plan = ConversionPlan({'a': np.dtype(np.int32)})
+    result = anydata_from_dicts(values, plan)
+    assert [r['a'] for r in result] == list(range(5))
+    assert all(isinstance(r['a'], np.int32) for r in result)
+    assert result[3]['b'].dtype == np.float_
+    np.testing.assert_array_equal(result[3]['b'], [3, 4.5])
+    # The rows share one array.
+    assert np.shares_memory(result[0]['b'], result[4]['b'].base)
+
+
+def test_anydata_from_dicts__plan_never_overflows():
+    plan = ConversionPlan({'a': np.dtype(np.int8)})
+    result = anydata_from_dicts([{'a': 1}, {'a': 1000}, {'a': 2}], plan)
+    assert [r['a'] for r in result] == [1, 1000, 2]
+    assert [type(r['a']) for r in result] == [np.int8, np.int_, np.int8]
+
+
+def test_anydata_from_dicts__mixed_types_match_individual_conversion():
+    values = [{'a': 1}, {'a': 2.5}, {'a': [1, 2]}, {'a': [1, 2, 3]}, {'b': 'x'}]
+    result = anydata_from_dicts(values)
+    for value, converted in zip(values, result):
+        expected = anydata_from_dict(value)
+        for key in value:
+            assert isinstance(converted[key], type(expected[key]))
+            np.testing.assert_array_equal(converted[key], expected[key])
+
+
+@pytest.mark.filterwarnings('error')
+def test_anydata_from_dicts__ragged_columns():
+    values = [{'a': [1, 2]}, {'a': [1, 2, 3]}, {'a': 1}, {'a': [[1, 2], [3, 4]]}]
+    result = anydata_from_dicts(values, ConversionPlan({'a': np.dtype(np.int16)}))
+    np.testing.assert_array_equal(result[0]['a'], [1, 2])
+    np.testing.assert_array_equal(result[1]['a'], [1, 2, 3])
+    assert result[2]['a'] == 1
+    np.testing.assert_array_equal(result[3]['a'], [[1, 2], [3, 4]])
+
+
+def test_anydata_from_dicts__does_not_copy_matching_arrays():
+    plan = ConversionPlan({'a': np.dtype(np.float64), 'b': np.dtype(np.int32)})
+    arrays = [np.arange(3.) for _ in range(3)]
+    result = anydata_from_dicts([{'a': array, 'b': np.int32(i)} for i, array in enumerate(arrays)], plan)
+    assert all(r['a'] is array for r, array in zip(result, arrays))
+    assert [type(r['b']) for r in result] == [np.int32] * 3
@@ -0,0 +1,154 @@
+import asyncio
+import threading
+from unittest import mock
+
+import pytest
+
+import pyda
+from pyda import data
+from pyda.providers import AsyncPropertyStream, AsyncProvider
+
+
+class CountingStream(AsyncPropertyStream):
+    async def _run(self):
+        for i in range(3):
+            await asyncio.sleep(0)
+            self._response_received(i)
+
+
+class Provider(AsyncProvider):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.gets = 0
+        self.sets = []
+
+    async def _get_property_async(self, query):
+        self.gets += 1
+        await asyncio.sleep(0.01)
+        return f'{query.device}/{query.prop}'
+
+    async def _set_property_async(self, query, value):
+        self.sets.append(value)
+        return 'set'
+
+    def _create_property_stream(self, query):
+        return CountingStream(self._loop)
+
+
+def background_loop():
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop
+
+
+def test__AsyncProvider__requires_loop():
+    with pytest.raises(RuntimeError):
+        Provider()
+
+
+@pytest.mark.asyncio
+async def test__AsyncProvider__awaited_directly_on_its_loop():
+    provider = Provider()
+    cli = pyda.AsyncIOClient(provider=provider)
+    with mock.patch.object(provider, '_get_property') as get, \
+            mock.patch.object(provider, '_set_property') as set_:
+        assert await cli.get(device='dev', prop='prop') == 'dev/prop'
+        assert await cli.set(device='dev', prop='prop', value={'a': 1}) == 'set'
+        assert await cli.set_many([({'device': 'dev', 'prop': 'prop'}, {'a': 2})]) == ['set']
+    get.assert_not_called()
+    set_.assert_not_called()
+    assert provider.sets == [{'a': 1}, {'a': 2}]
+
+
+@pytest.mark.asyncio
+async def test__AsyncProvider__concurrent_gets_are_coalesced():
+    provider = Provider()
+    cli = pyda.AsyncIOClient(provider=provider)
+    responses = await asyncio.gather(*(cli.get(device='dev', prop='prop') for _ in range(10)))
+    many = await cli.get_many([{'device': 'dev', 'prop': 'prop'}, {'device': 'other', 'prop': 'prop'}])
+
+    assert responses == ['dev/prop'] * 10
+    assert many == ['dev/prop', 'other/prop']
+    assert provider.gets == 3
+    assert cli.metrics()['gets'] == {'coalesced': 9, 'in_flight': 0}
+
+
+@pytest.mark.asyncio
+async def test__AsyncProvider__other_loop():
+    provider = Provider(loop=background_loop())
+    cli = pyda.AsyncIOClient(provider=provider)
+    assert await cli.get(device='dev', prop='prop') == 'dev/prop'
+    assert await cli.set(device='dev', prop='prop', value={'a': 1}) == 'set'
+
+
+def test__AsyncProvider__threaded_client():
+    provider = Provider(loop=background_loop())
+    cli = pyda.SimpleClient(provider=provider)
+    assert cli.get(device='dev', prop='prop') == 'dev/prop'
+    assert cli.set(device='dev', prop='prop', value={'a': 1}) == 'set'
+
+
+@pytest.mark.asyncio
+async def test__AsyncProvider__stream_delivered_within_loop():
+    provider = Provider()
+    cli = pyda.AsyncIOClient(provider=provider)
+    sub = cli.subscribe(device='dev', prop='prop')
+    with mock.patch.object(sub._dispatcher, 'submit') as submit:
+        async with sub:
+            sub.start()
+            received = [await sub.__anext__() for _ in range(3)]
+        sub.stop()
+    assert received == [0, 1, 2]
+    submit.assert_not_called()
+
+    # The stream can be started again.
+    async with sub:
+        sub.start()
+        assert await sub.__anext__() == 0
+    sub.stop()
+
+
+def test__AsyncPropertyStream__threaded_client():
+    provider = Provider(loop=background_loop())
+    cli = pyda.SimpleClient(provider=provider)
+    sub = cli.subscribe(device='dev', prop='prop', selector=data.Selector(''))
+    sub.start()
+    with sub:
+        assert [next(sub) for _ in range(3)] == [0, 1, 2]
+    sub.stop()
+
+
+class BatchingProvider(Provider):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.batches = []
+
+    async def _get_properties_async(self, queries):
+        self.batches.append([query.device for query in queries])
+        return [f'{query.device}/{query.prop}' for query in queries]
+
+    async def _set_properties_async(self, items):
+        self.batches.append([value for _, value in items])
+        return ['set'] * len(items)
+
+
+@pytest.mark.asyncio
+async def test__AsyncProvider__batch_hooks():
+    provider = BatchingProvider()
+    cli = pyda.AsyncIOClient(provider=provider)
+    queries = [{'device': 'dev', 'prop': 'prop'}, {'device': 'other', 'prop': 'prop'}, {'device': 'dev', 'prop': 'prop'}]
+    assert await cli.get_many(queries) == ['dev/prop', 'other/prop', 'dev/prop']
+    assert await cli.set_many([(queries[0], {'a': 1}), (queries[1], {'a': 2})]) == ['set', 'set']
+    # One batch each, with the identical queries coalesced.
+    assert provider.batches == [['dev', 'other'], [{'a': 1}, {'a': 2}]]
+    assert provider.gets == 0 and provider.sets == []
+
+
+def test__AsyncProvider__batch_hooks__threaded_client():
+    provider = BatchingProvider(loop=background_loop())
+    cli = pyda.SimpleClient(provider=provider)
+    assert cli.get_many([{'device': 'dev', 'prop': 'prop'}, {'device': 'other', 'prop': 'prop'}]) == [
+        'dev/prop', 'other/prop',
+    ]
+    assert cli.set_many([({'device': 'dev', 'prop': 'prop'}, {'a': 1})]) == ['set']
+    assert provider.batches == [['dev', 'other'], [{'a': 1}]]
@@ -0,0 +1,138 @@
+import gc
+import threading
+
+import pytest
+
+from pyda.providers._core import BasePropertyStream
+from pyda.providers._middleware import StreamChain
+
+
+def test__BasePropertyStream__conflates_whilst_congested(handler_class):
+    stream = BasePropertyStream()
+    handler = handler_class()
+    stream.start(handler)
+    stream._response_received(0)
+    stream._backpressure(handler, True)
+    assert stream.congested
+    for i in range(1, 4):
+        stream._response_received(i)
+    assert handler.responses == [0]
+
+    stream._backpressure(handler, False)
+    assert not stream.congested
+    assert handler.responses == [0, 3]
+    assert stream.conflated == 2
+    stream._response_received(4)
+    assert handler.responses == [0, 3, 4]
+    assert stream.metrics()['conflated'] == 2
+
+
+def test__BasePropertyStream__congested_whilst_any_source_is(handler_class):
+    stream = BasePropertyStream()
+    handler1, handler2 = handler_class(), handler_class()
+    stream.start(handler1)
+    stream.start(handler2)
+    stream._backpressure(handler1, True)
+    stream._backpressure(handler2, True)
+    stream._backpressure(handler1, False)
+    assert stream.congested
+    # A stopped handler is no longer congested.
+    stream.stop(handler2)
+    assert not stream.congested
+
+
+def test__BasePropertyStream__flush_may_congest_again(handler_class):
+    stream = BasePropertyStream()
+
+    class CongestingHandler(handler_class):
+        def _response_received(self, response):
+            super()._response_received(response)
+            stream._backpressure(self, True)
+
+    handler = CongestingHandler()
+    stream.start(handler)
+    stream._response_received(0)
+    stream._response_received(1)
+    stream._response_received(2)
+    stream._backpressure(handler, False)
+    assert handler.responses == [0, 2]
+    assert stream.congested
+    stream._response_received(3)
+    assert handler.responses == [0, 2]
+
+
+def test__StreamChain__passes_backpressure_on(handler_class):
+    source = BasePropertyStream()
+    chain = StreamChain(source, lambda response: response * 10)
+    handler = handler_class()
+    chain.start(handler)
+    chain._backpressure(handler, True)
+    assert chain.congested
+    assert source.congested
+    for i in range(3):
+        source._response_received(i)
+    # Conflated by the source, rather than by the chain.
+    assert source.conflated == 2
+    assert chain.conflated == 0
+
+    chain._backpressure(handler, False)
+    assert not source.congested
+    assert handler.responses == [20]
+
+
+def test__BasePropertyStream__handlers(handler_class):
+    stream = BasePropertyStream()
+    handler1, handler2 = handler_class(), handler_class()
+    stream.start(handler1)
+    stream.start(handler1)
+    stream.start(handler2)
+    assert stream._stream_handlers == (handler1, handler2)
+    stream.stop(handler1)
+    with pytest.raises(KeyError):
+        stream.stop(handler1)
+    # The handlers are only referenced weakly.
+    del handler2
+    gc.collect()
+    assert not stream._stream_handlers
+    assert stream.metrics()['handlers'] == 0
+
+
+def test__BasePropertyStream__concurrent_start_stop(handler_class):
+    # Handlers come and go whilst responses are being broadcast at a high rate.
+    stream = BasePropertyStream()
+    resident = handler_class()
+    stream.start(resident)
+    stopping = threading.Event()
+    errors = []
+
+    def broadcast():
+        try:
+            i = 0
+            while not stopping.is_set():
+                stream._response_received(i)
+                i += 1
+        except Exception as e:
+            errors.append(e)
+
+    def churn():
+        try:
+            for _ in range(2000):
+                handler = handler_class()
+                stream.start(handler)
+                stream.stop(handler)
+        except Exception as e:
+            errors.append(e)
+
+    broadcasters = [threading.Thread(target=broadcast) for _ in range(2)]
+    churners = [threading.Thread(target=churn) for _ in range(4)]
+    for thread in broadcasters + churners:
+        thread.start()
+    for thread in churners:
+        thread.join(timeout=30)
+    stopping.set()
+    for thread in broadcasters:
+        thread.join(timeout=5)
+
+    assert errors == []
+    assert stream._stream_handlers == (resident, )
+    assert len(resident.responses) > 0
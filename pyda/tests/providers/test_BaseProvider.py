@@ -0,0 +1,142 @@
+import concurrent.futures
+from unittest import mock
+
+import numpy as np
+from pyds_model._ds_model import AnyData  # noqa
+import pytest
+
+import pyda
+from pyda import data
+from pyda.data._data import anydata_from_dicts
+from pyda.providers import BaseProvider
+
+
+def test__BaseProvider__get_properties__fallback():
+    provider = BaseProvider()
+    queries = [
+        data.PropertyAccessQuery(device=f'device-{i}', prop='some-property', selector=data.Selector(''))
+        for i in range(3)
+    ]
+    with mock.patch.object(provider, '_get_property', side_effect=lambda q: q.device) as get:
+        futures = provider._get_properties(queries)
+    assert get.call_args_list == [mock.call(query) for query in queries]
+    assert futures == ['device-0', 'device-1', 'device-2']
+
+
+def test__BaseProvider__set_properties__fallback():
+    provider = BaseProvider()
+    query = data.PropertyAccessQuery(device='some-device', prop='some-property', selector=data.Selector(''))
+    items = [(query, {'a': 1}), (query, {'a': 2})]
+    with mock.patch.object(provider, '_set_property', side_effect=lambda q, v: v['a']) as set_:
+        futures = provider._set_properties(items)
+    # Each item is set with its value prepared (as part of the batch).
+    assert [call.args[0] for call in set_.call_args_list] == [query, query]
+    assert all(isinstance(call.args[1], AnyData) for call in set_.call_args_list)
+    assert futures == [1, 2]
+
+
+def test__BaseProvider__set_many__prepares_the_batch_once():
+    class SettingProvider(BaseProvider):
+        def _set_property(self, query, value):
+            future = concurrent.futures.Future()
+            future.set_result(self._prepare_value_for_set(query, value))
+            return future
+
+    provider = SettingProvider()
+    cli = pyda.SimpleClient(provider=provider)
+    query = {'device': 'some-device', 'prop': 'some-property'}
+    with mock.patch.object(
+            provider, '_prepare_values_for_set', wraps=provider._prepare_values_for_set,
+    ) as prepare_values, mock.patch(
+            'pyda.providers._core.anydata_from_dicts', wraps=anydata_from_dicts,
+    ) as from_dicts:
+        results = cli.set_many([(query, {'a': 1}), (query, {'a': 2}), (query, {'a': 3})])
+    prepare_values.assert_called_once()
+    from_dicts.assert_called_once()
+    assert [result['a'] for result in results] == [1, 2, 3]
+    assert all(isinstance(result, AnyData) for result in results)
+
+
+def test__BaseProvider__prepare_values_for_set__overridden_per_item():
+    class ConvertingProvider(BaseProvider):
+        def _prepare_value_for_set(self, query, value):
+            return {**value, 'converted': True}
+
+    provider = ConvertingProvider()
+    query = data.PropertyAccessQuery(device='some-device', prop='some-property', selector=data.Selector(''))
+    with mock.patch('pyda.providers._core.anydata_from_dicts') as convert:
+        prepared = provider._prepare_values_for_set([(query, {'a': 1}), (query, {'a': 2})])
+    convert.assert_not_called()
+    assert prepared == [{'a': 1, 'converted': True}, {'a': 2, 'converted': True}]
+
+
+def test__BaseProvider__prepare_values_for_set():
+    provider = BaseProvider()
+    query = data.PropertyAccessQuery(device='some-device', prop='some-property', selector=data.Selector(''))
+    existing = AnyData.create()
+    prepared = provider._prepare_values_for_set([(query, {'a': 1}), (query, existing), (query, {'b': 2.5})])
+    assert len(prepared) == 3
+    assert prepared[0]['a'] == 1
+    assert prepared[1] is existing
+    assert prepared[2]['b'] == 2.5
+
+
+def test__BaseProvider__prepare_values_for_set__validates_whole_batch():
+    provider = BaseProvider()
+    query = data.PropertyAccessQuery(device='some-device', prop='some-property', selector=data.Selector(''))
+    with mock.patch('pyda.providers._core.anydata_from_dicts') as convert:
+        with pytest.raises(TypeError, match="Value must be either AnyData or dict"):
+            provider._prepare_values_for_set([(query, {'a': 1}), (query, 'not-a-dict')])
+    convert.assert_not_called()
+
+
+def test__BaseProvider__prepare_value_for_set__mutable_data():
+    provider = BaseProvider()
+    query = data.PropertyAccessQuery(device='some-device', prop='some-property', selector=data.Selector(''))
+    acquired = data.AcquiredPropertyData(dtv={'a': 1, 'b': 2.5}, header='HEADER')
+    mutable = acquired.mutable_data()
+    mutable['a'] = 5
+    prepared = provider._prepare_value_for_set(query, mutable)
+    assert isinstance(prepared, AnyData)
+    assert prepared['a'] == 5
+    assert prepared['b'] == 2.5
+
+
+def test__BaseProvider__prepare_values_for_set__uses_conversion_plans():
+    provider = BaseProvider()
+    query_a = data.PropertyAccessQuery(device='device-a', prop='some-property', selector=data.Selector(''))
+    query_b = data.PropertyAccessQuery(device='device-b', prop='some-property', selector=data.Selector(''))
+    provider._conversion_plans.set_plan(query_a, data.ConversionPlan({'x': np.dtype(np.int16)}))
+    prepared = provider._prepare_values_for_set([(query_a, {'x': 1}), (query_b, {'x': 2}), (query_a, {'x': 3})])
+    assert [type(value['x']) for value in prepared] == [np.int16, np.int_, np.int16]
+    # Plans are learned (by fields) from the values being set too, and then reused.
+    plan = provider._conversion_plans.plan_for(query_b, {'x': 0})
+    assert plan.dtypes == {'x': np.int_}
+    assert provider._prepare_value_for_set(query_b, {'x': 1.5})['x'] == 1.5
+    with mock.patch.object(data.ConversionPlan, 'learn') as learn:
+        provider._prepare_values_for_set([(query_a, {'x': 4}), (query_b, {'x': 5})])
+    learn.assert_not_called()
+
+
+def test__BaseProvider__prepare_value_for_set__seeds_plan_from_received_value():
+    provider = BaseProvider()
+    query = data.PropertyAccessQuery(device='some-device', prop='some-property', selector=data.Selector(''))
+    acquired = data.AcquiredPropertyData(dtv={'a': np.int16(1), 'b': np.float32(2.5)}, header='HEADER')
+    mutable = acquired.mutable_data()
+    mutable['a'] = 5
+    prepared = provider._prepare_value_for_set(query, mutable)
+    assert isinstance(prepared['a'], np.int16)
+    assert isinstance(prepared['b'], np.float32)
+    # Subsequent dictionaries use the plan too, but are never narrowed.
+    prepared = provider._prepare_value_for_set(query, {'a': 7, 'b': 1e300})
+    assert isinstance(prepared['a'], np.int16)
+    assert prepared['b'] == 1e300
+    # Floats are only cast when they are represented exactly.
+    prepared = provider._prepare_value_for_set(query, {'b': 0.1})
+    assert prepared['b'] == 0.1
+    assert not isinstance(prepared['b'], np.float32)
+    assert isinstance(provider._prepare_value_for_set(query, {'b': 0.5})['b'], np.float32)
+    # The plan is seeded once, rather than on every set of mutable data.
+    with mock.patch.object(data.ConversionPlan, 'from_value') as from_value:
+        provider._prepare_value_for_set(query, acquired.mutable_data())
+    from_value.assert_not_called()
@@ -0,0 +1,154 @@
+import concurrent.futures
+import time
+from unittest import mock
+
+import pytest
+
+import pyda
+from pyda.providers import CachingProvider, SyntheticProvider
+
+
+DEVICE = 'SYNTHETIC.DEVICE0'
+PROP = 'Acquisition'
+
+
+def test__CachingProvider__invalid_maxsize():
+    with pytest.raises(ValueError):
+        CachingProvider(SyntheticProvider(), maxsize=0)
+
+
+def test__CachingProvider__get_hit_and_miss():
+    provider = CachingProvider(SyntheticProvider(), ttl=None)
+    client = pyda.SimpleClient(provider=provider)
+    first = client.get(device='SYNTHETIC.DEVICE0', prop='Acquisition')
+    second = client.get(device='SYNTHETIC.DEVICE0', prop='Acquisition')
+
+    assert first.value['scalar0'] == second.value['scalar0'] == 0.
+    assert provider.stats() == {
+        'size': 1, 'hits': 1, 'misses': 1, 'evictions': 0, 'expirations': 0, 'invalidations': 0,
+    }
+
+
+def test__CachingProvider__data_filters_are_distinct(query):
+    provider = CachingProvider(SyntheticProvider(), ttl=None)
+    provider._get_property(query()).result()
+    provider._get_property(query(a=1)).result()
+    assert provider._get_property(query(a=1)).result().value['scalar0'] == 1.
+    assert provider.stats()['misses'] == 2
+
+
+def test__CachingProvider__get_many_forwards_misses_as_one_batch(query):
+    synthetic = SyntheticProvider(n_devices=3)
+    provider = CachingProvider(synthetic, ttl=None)
+    provider._get_property(query('SYNTHETIC.DEVICE1')).result()
+
+    queries = [query('SYNTHETIC.DEVICE0'), query('SYNTHETIC.DEVICE1'), query('SYNTHETIC.DEVICE2')]
+    with mock.patch.object(
+            synthetic, '_get_properties', wraps=synthetic._get_properties,
+    ) as get_properties:
+        responses = [future.result() for future in provider._get_properties(queries)]
+
+    get_properties.assert_called_once_with([queries[0], queries[2]])
+    assert [response.query.device for response in responses] == [
+        'SYNTHETIC.DEVICE0', 'SYNTHETIC.DEVICE1', 'SYNTHETIC.DEVICE2',
+    ]
+    assert responses[1].value['scalar0'] == 1000.
+    assert provider.stats() == {
+        'size': 3, 'hits': 1, 'misses': 3, 'evictions': 0, 'expirations': 0, 'invalidations': 0,
+    }
+
+
+def test__CachingProvider__ttl(query):
+    provider = CachingProvider(SyntheticProvider(), ttl=0.01)
+    provider._get_property(query()).result()
+    time.sleep(0.02)
+    response = provider._get_property(query()).result()
+
+    assert response.value['scalar0'] == 1.
+    assert provider.expirations == 1
+    assert provider.misses == 2
+
+
+def test__CachingProvider__lru_eviction(query):
+    provider = CachingProvider(SyntheticProvider(n_devices=3), maxsize=2, ttl=None)
+    provider._get_property(query('SYNTHETIC.DEVICE0')).result()
+    provider._get_property(query('SYNTHETIC.DEVICE1')).result()
+    # DEVICE0 becomes the most recently used, so DEVICE1 is evicted.
+    provider._get_property(query('SYNTHETIC.DEVICE0')).result()
+    provider._get_property(query('SYNTHETIC.DEVICE2')).result()
+
+    assert provider.evictions == 1
+    assert provider._get_property(query('SYNTHETIC.DEVICE0')).result().value['scalar0'] == 0.
+    assert provider._get_property(query('SYNTHETIC.DEVICE1')).result().value['scalar0'] == 1001.
+
+
+def test__CachingProvider__newer_cycle_stamp_invalidates(query):
+    synthetic = SyntheticProvider(n_devices=2, selectors=['SPS.USER.ALL'])
+    provider = CachingProvider(synthetic, ttl=None)
+    provider._get_property(query('SYNTHETIC.DEVICE0', 'SPS.USER.ALL')).result()
+    # A newer cycle is seen (for another device) with the same selector.
+    synthetic._get_property(query('SYNTHETIC.DEVICE1', 'SPS.USER.ALL')).result()
+    provider._get_property(query('SYNTHETIC.DEVICE1', 'SPS.USER.ALL')).result()
+
+    response = provider._get_property(query('SYNTHETIC.DEVICE0', 'SPS.USER.ALL')).result()
+    assert response.value['scalar0'] == 1.
+    assert provider.expirations == 1
+
+
+def test__CachingProvider__stream_cycle_stamp_invalidates(query, handler_class):
+    synthetic = SyntheticProvider(selectors=['SPS.USER.ALL'], rate=None, max_updates=10)
+    provider = CachingProvider(synthetic, ttl=None)
+    provider._get_property(query(selector='SPS.USER.ALL')).result()
+
+    stream = provider._create_property_stream(query(selector='SPS.USER.ALL'))
+    handler = handler_class()
+    stream.start(handler)
+    stream._stream.wait(5)
+    stream.stop(handler)
+
+    assert len(handler.responses) == 10
+    response = provider._get_property(query(selector='SPS.USER.ALL')).result()
+    assert response.value['scalar0'] == 1.
+    assert provider.expirations == 1
+
+
+def test__CachingProvider__set_invalidates(query):
+    provider = CachingProvider(SyntheticProvider(), ttl=None)
+    provider._get_property(query()).result()
+    provider._get_property(query(a=1)).result()
+    response = provider._set_property(query(), {'scalar0': 1.}).result()
+
+    assert response.exception is None
+    assert provider.stats()['size'] == 0
+    assert provider.invalidations == 2
+
+
+def test__CachingProvider__invalidate(query):
+    provider = CachingProvider(SyntheticProvider(n_devices=2), ttl=None)
+    provider._get_property(query('SYNTHETIC.DEVICE0')).result()
+    provider._get_property(query('SYNTHETIC.DEVICE1')).result()
+
+    provider.invalidate(query('SYNTHETIC.DEVICE0'))
+    assert provider.stats()['size'] == 1
+    provider.invalidate()
+    assert provider.stats()['size'] == 0
+    assert provider.invalidations == 2
+
+
+def test__CachingProvider__invalidated_in_flight_is_not_cached(query):
+    inner = mock.Mock()
+    future = concurrent.futures.Future()
+    inner._get_properties.return_value = [future]
+    provider = CachingProvider(inner, ttl=None)
+
+    assert provider._get_property(query()) is future
+    provider.invalidate()
+    future.set_result(SyntheticProvider()._get_property(query()).result())
+    assert provider.stats()['size'] == 0
+
+
+def test__CachingProvider__errors_are_not_cached(query):
+    provider = CachingProvider(SyntheticProvider(), ttl=None)
+    response = provider._get_property(query('UNKNOWN')).result()
+    assert response.exception is not None
+    assert provider.stats()['size'] == 0
@@ -0,0 +1,88 @@
+import concurrent.futures
+import threading
+from unittest import mock
+
+import pytest
+
+from pyda import SimpleClient
+from pyda.providers._core import BaseProvider
+from pyda.providers._registry import in_flight_gets
+
+
+def make_provider():
+    provider = BaseProvider()
+    provider._get_property = mock.Mock(side_effect=lambda query: concurrent.futures.Future())
+    return provider
+
+
+def test__concurrent_gets__share_one_request(query):
+    provider = make_provider()
+    cli = SimpleClient(provider=provider)
+    barrier = threading.Barrier(50)
+    responses = []
+
+    def get():
+        barrier.wait()
+        responses.append(cli.get(device='some-device', prop='some-property'))
+
+    threads = [threading.Thread(target=get) for _ in range(50)]
+    for thread in threads:
+        thread.start()
+    while in_flight_gets(provider).coalesced < 49:
+        threading.Event().wait(0.001)
+    provider._get_property.assert_called_once_with(query())
+    [pending] = in_flight_gets(provider)._gets.values()
+    response = mock.Mock()
+    pending.future.set_result(response)
+    for thread in threads:
+        thread.join(5)
+
+    assert responses == [response] * 50
+    assert cli.metrics()['gets'] == {'coalesced': 49, 'in_flight': 0}
+
+
+def test__get__after_response_makes_new_request(query):
+    provider = make_provider()
+    gets = in_flight_gets(provider)
+    first = gets.get_property(query())
+    assert gets.get_property(query()) is first
+    first.set_result(mock.Mock())
+
+    second = gets.get_property(query())
+    assert second is not first
+    assert provider._get_property.call_count == 2
+    assert gets.coalesced == 1
+
+
+def test__get__different_queries_are_not_shared(query):
+    provider = make_provider()
+    gets = in_flight_gets(provider)
+    first = gets.get_property(query(selector='A'))
+    second = gets.get_property(query(selector='B'))
+    assert first is not second
+    assert gets.in_flight() == 2
+    assert gets.coalesced == 0
+
+
+def test__get_properties__coalesces_in_flight_and_duplicates(query):
+    provider = make_provider()
+    provider._get_properties = mock.Mock(
+        side_effect=lambda queries: [concurrent.futures.Future() for _ in queries],
+    )
+    gets = in_flight_gets(provider)
+    in_flight = gets.get_property(query('a'))
+    futures = gets.get_properties([query('a'), query('b'), query('b')])
+
+    provider._get_properties.assert_called_once_with([query('b')])
+    assert futures[0] is in_flight
+    assert futures[1] is futures[2]
+    assert gets.coalesced == 2
+
+
+def test__get__provider_error_is_not_kept(query):
+    provider = make_provider()
+    provider._get_property.side_effect = RuntimeError('no connection')
+    gets = in_flight_gets(provider)
+    with pytest.raises(RuntimeError):
+        gets.get_property(query())
+    assert gets.in_flight() == 0
@@ -0,0 +1,118 @@
+from unittest import mock
+
+from pyda import SimpleClient, data
+from pyda.providers._core import BasePropertyStream, BaseProvider
+from pyda.providers._middleware import StreamChain, StreamMiddleware
+from pyda.providers._registry import SharedPropertyStream
+
+
+class RecordingMiddleware(StreamMiddleware):
+    def __init__(self):
+        self.responses = []
+
+    def wrap_stream(self, stream):
+        def record(response):
+            self.responses.append(response)
+            return response
+        return StreamChain(stream, record)
+
+
+def make_provider():
+    provider = BaseProvider()
+    provider._create_property_stream = mock.Mock(
+        side_effect=lambda query: mock.Mock(wraps=BasePropertyStream()),
+    )
+    return provider
+
+
+def test__identical_subscriptions__share_one_stream():
+    provider = make_provider()
+    cli1 = SimpleClient(provider=provider)
+    cli2 = SimpleClient(provider=provider)
+    sub1 = cli1.subscribe(device='some-device', prop='some-property', selector='SEL')
+    sub2 = cli2.subscribe(device='some-device', prop='some-property', selector=data.Selector('SEL'))
+    provider._create_property_stream.assert_called_once()
+    assert sub1._property_stream is sub2._property_stream
+
+    leaf = sub1._property_stream._stream
+    sub1.start()
+    sub2.start()
+    leaf.start.assert_called_once()
+
+    sub1.stop()
+    leaf.stop.assert_not_called()
+    sub2.stop()
+    leaf.stop.assert_called_once()
+
+
+def test__different_selectors__do_not_share():
+    provider = make_provider()
+    cli = SimpleClient(provider=provider)
+    sub1 = cli.subscribe(device='some-device', prop='some-property', selector='SEL.1')
+    sub2 = cli.subscribe(device='some-device', prop='some-property', selector='SEL.2')
+    assert provider._create_property_stream.call_count == 2
+    assert sub1._property_stream is not sub2._property_stream
+
+
+def test__middlewares__apply_per_client():
+    provider = make_provider()
+    cli1 = SimpleClient(provider=provider)
+    cli2 = SimpleClient(provider=provider)
+    middleware = RecordingMiddleware()
+    cli1._stream_middlewares.append(middleware)
+    sub1 = cli1.subscribe(device='some-device', prop='some-property')
+    sub2 = cli2.subscribe(device='some-device', prop='some-property')
+    provider._create_property_stream.assert_called_once()
+    sub1.start()
+    sub2.start()
+    with sub1, sub2:
+        sub2._property_stream._stream._response_received('RESPONSE')
+        assert next(sub1) == 'RESPONSE'
+        assert next(sub2) == 'RESPONSE'
+    assert middleware.responses == ['RESPONSE']
+
+
+def test__shared_stream__held_back_only_whilst_all_handlers_are_congested():
+    provider = BaseProvider()
+    source = BasePropertyStream()
+    provider._create_property_stream = mock.Mock(return_value=source)
+    cli1 = SimpleClient(provider=provider)
+    cli2 = SimpleClient(provider=provider)
+    sub1 = cli1.subscribe(device='some-device', prop='some-property')
+    sub2 = cli2.subscribe(device='some-device', prop='some-property')
+    sub1.set_watermarks(1, low=0)
+    sub2.set_watermarks(1, low=0)
+    sub1.start()
+    sub2.start()
+    with sub1:
+        source._response_received(0)
+        source._response_received(1)
+        # Only sub1 is congested, so sub2 is not held back (it is not iterating, so never congests).
+        assert not source.congested
+        assert source.conflated == 0
+        with sub2:
+            source._response_received(2)
+            assert source.congested
+            assert next(sub2) == 2
+            assert not source.congested
+    sub1.stop()
+    sub2.stop()
+
+
+def test__shared_stream__handler_may_stop_from_within_upstream_start(query):
+    class EagerStream(BasePropertyStream):
+        # Delivers a response from within start, as a provider with a cached value may.
+        def start(self, stream_handler):
+            super().start(stream_handler)
+            stream_handler._response_received('RESPONSE')
+
+    source = mock.Mock(wraps=EagerStream())
+    shared = SharedPropertyStream(source, query())
+    handler = mock.Mock()
+    handler._response_received.side_effect = lambda response: shared.stop(handler)
+
+    shared.start(handler)
+    handler._response_received.assert_called_once_with('RESPONSE')
+    source.start.assert_called_once_with(shared)
+    source.stop.assert_called_once_with(shared)
+    assert shared.latest is None
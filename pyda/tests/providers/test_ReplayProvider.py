@@ -0,0 +1,95 @@
+import time
+
+import numpy as np
+import pyds_model
+import pytest
+
+import pyda
+from pyda import data
+from pyda.providers import ReplayProvider
+
+
+DEVICE = 'dev'
+PROP = 'prop'
+
+
+@pytest.fixture
+def recording_path(tmp_path, query):
+    with data.StreamRecorder(tmp_path) as recorder:
+        # 20 responses, 10ms apart, interleaved between two devices.
+        for i in range(20):
+            context = pyds_model.AcquisitionContext(acquisition_stamp=1_000_000_000 + i * 10_000_000)
+            value = data.AcquiredPropertyData(
+                dtv={'value': np.float64(i), 'waveform': np.full(3, i)},
+                header=data.Header(context),
+            )
+            recorder.record(data.PropertyRetrievalResponse(query=query(f'dev{i % 2}'), value=value))
+    return tmp_path
+
+
+def test__ReplayProvider__invalid_speed(recording_path):
+    with pytest.raises(ValueError):
+        ReplayProvider(recording_path, speed=0)
+
+
+def test__ReplayProvider__get_returns_the_latest(recording_path, query):
+    client = pyda.SimpleClient(provider=ReplayProvider(recording_path))
+    response = client.get(device='dev0', prop='prop')
+    assert response.query == query('dev0')
+    assert response.value['value'] == 18
+    np.testing.assert_array_equal(response.value['waveform'], [18, 18, 18])
+    assert response.value.header.acquisition_timestamp == 1_180_000_000
+
+
+def test__ReplayProvider__get_unknown(recording_path):
+    client = pyda.SimpleClient(provider=ReplayProvider(recording_path))
+    response = client.get(device='unknown', prop='prop')
+    with pytest.raises(data.PropertyAccessError, match='No data'):
+        response.value
+
+
+def test__ReplayProvider__set_is_refused(recording_path):
+    client = pyda.SimpleClient(provider=ReplayProvider(recording_path))
+    response = client.set(device='dev0', prop='prop', value={'value': 1.})
+    assert isinstance(response.exception, data.PropertyAccessError)
+
+
+def test__ReplayProvider__replay_as_fast_as_possible(recording_path, query, handler_class):
+    provider = ReplayProvider(recording_path, speed=None)
+    stream = provider._create_property_stream(query('dev1'))
+    handler = handler_class()
+    stream.start(handler)
+    assert stream.wait(timeout=5)
+    assert [response.value['value'] for response in handler.responses] == list(range(1, 20, 2))
+    assert all(response.query == query('dev1') for response in handler.responses)
+
+
+def test__ReplayProvider__replay_paced(recording_path, query, handler_class):
+    # The recorded responses span 180ms, which is replayed at twice the speed.
+    provider = ReplayProvider(recording_path, speed=2)
+    stream = provider._create_property_stream(query('dev0'))
+    handler = handler_class()
+    start = time.monotonic()
+    stream.start(handler)
+    assert stream.wait(timeout=5)
+    assert time.monotonic() - start >= 0.09
+    assert len(handler.responses) == 10
+
+
+def test__ReplayProvider__stop_abandons_the_replay(recording_path, query, handler_class):
+    provider = ReplayProvider(recording_path, speed=0.01)
+    stream = provider._create_property_stream(query('dev0'))
+    handler = handler_class()
+    stream.start(handler)
+    stream.stop(handler)
+    assert not stream.wait(timeout=0.1)
+    assert len(handler.responses) <= 1
+
+
+def test__ReplayProvider__subscription(recording_path):
+    client = pyda.SimpleClient(provider=ReplayProvider(recording_path, speed=None))
+    sub = client.subscribe(device='dev1', prop='prop')
+    with sub:
+        sub.start()
+        values = [next(iter(sub)).value['value'] for _ in range(10)]
+    assert values == list(range(1, 20, 2))
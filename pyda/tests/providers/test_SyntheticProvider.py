@@ -0,0 +1,127 @@
+import time
+
+import numpy as np
+import pytest
+
+import pyda
+from pyda import data
+from pyda.providers import SyntheticProvider
+
+
+DEVICE = 'SYNTHETIC.DEVICE0'
+PROP = 'Acquisition'
+
+
+def test__SyntheticProvider__invalid_rate():
+    with pytest.raises(ValueError):
+        SyntheticProvider(rate=0)
+
+
+def test__SyntheticProvider__get_is_deterministic(query):
+    provider = SyntheticProvider(n_devices=2, n_scalars=2, n_arrays=1, array_size=4, rate=100)
+    client = pyda.SimpleClient(provider=provider)
+    first = client.get(device='SYNTHETIC.DEVICE1', prop='Acquisition')
+    second = client.get(device='SYNTHETIC.DEVICE1', prop='Acquisition')
+
+    assert set(first.value.keys()) == {'scalar0', 'scalar1', 'array0'}
+    assert first.value['scalar0'] == 1000.
+    assert first.value['scalar1'] == 1001.
+    np.testing.assert_array_equal(first.value['array0'], [1000., 1001., 1002., 1003.])
+    assert second.value['scalar0'] == 1001.
+    assert first.value.header.acquisition_timestamp == provider.start_stamp
+    assert second.value.header.acquisition_timestamp == provider.start_stamp + 10_000_000
+    assert first.value.header.cycle_timestamp is None
+    # The fields are a plain mapping, without a data type.
+    assert first.value.data_type is None
+
+    other_provider = SyntheticProvider(n_devices=2, n_scalars=2, n_arrays=1, array_size=4, rate=100)
+    again = other_provider._get_property(query('SYNTHETIC.DEVICE1')).result()
+    np.testing.assert_array_equal(again.value['array0'], first.value['array0'])
+
+
+def test__SyntheticProvider__selectors(query):
+    provider = SyntheticProvider(selectors=['SPS.USER.SFTPRO', 'SPS.USER.LHC1'])
+    response = provider._get_property(query(selector='SPS.USER.LHC1')).result()
+    assert response.value.header.selector == data.Selector('SPS.USER.LHC1')
+    assert response.value.header.cycle_timestamp == response.value.header.acquisition_timestamp
+
+    response = provider._get_property(query()).result()
+    assert isinstance(response.exception, data.PropertyAccessError)
+
+
+def test__SyntheticProvider__unknown_device(query):
+    provider = SyntheticProvider()
+    response = provider._get_property(query('OTHER.DEVICE')).result()
+    assert isinstance(response.exception, data.PropertyAccessError)
+    with pytest.raises(data.PropertyAccessError):
+        provider._create_property_stream(query('OTHER.DEVICE'))
+
+
+def test__SyntheticProvider__set(query):
+    provider = SyntheticProvider()
+    response = provider._set_property(query(), {'scalar0': 1.}).result()
+    assert response.exception is None
+    with pytest.raises(TypeError):
+        provider._set_property(query(), 'not a dict')
+
+
+def test__SyntheticProvider__stream_as_fast_as_possible(query, handler_class):
+    provider = SyntheticProvider(rate=None, max_updates=5000, batch_size=100)
+    stream = provider._create_property_stream(query())
+    handler = handler_class()
+    stream.start(handler)
+    assert stream.wait(timeout=10)
+    assert len(handler.responses) == 5000
+    assert [r.value['scalar0'] for r in handler.responses[:3]] == [0., 1., 2.]
+    stamps = [r.value.header.acquisition_timestamp for r in handler.responses]
+    assert stamps == sorted(stamps)
+
+
+def test__SyntheticProvider__stream_rate(query, handler_class):
+    # 10 kHz for about 0.2s, emitted in batches every tick.
+    provider = SyntheticProvider(rate=10_000, tick=0.005)
+    stream = provider._create_property_stream(query())
+    handler = handler_class()
+    stream.start(handler)
+    time.sleep(0.2)
+    stream.stop(handler)
+    emitted = stream.emitted
+    assert 1000 <= emitted <= 3000
+    time.sleep(0.05)
+    assert stream.emitted == emitted
+    assert len(handler.responses) == emitted
+
+
+def test__SyntheticProvider__restart_continues_the_sequence(query, handler_class):
+    provider = SyntheticProvider(rate=None, max_updates=10)
+    stream = provider._create_property_stream(query())
+    handler = handler_class()
+    stream.start(handler)
+    assert stream.wait(timeout=5)
+    stream.stop(handler)
+    stream.start(handler)
+    assert stream.wait(timeout=5)
+    assert len(handler.responses) == 10
+
+
+def test__SyntheticProvider__pauses_whilst_congested(query, handler_class):
+    provider = SyntheticProvider(rate=None, max_updates=1000, batch_size=10)
+    stream = provider._create_property_stream(query())
+
+    class CongestingHandler(handler_class):
+        def _response_received(self, response):
+            super()._response_received(response)
+            if len(self.responses) == 25:
+                stream._backpressure(self, True)
+
+    handler = CongestingHandler()
+    stream.start(handler)
+    time.sleep(0.05)
+    assert stream.congested
+    assert stream.emitted == 25
+    assert not stream.wait(timeout=0)
+
+    stream._backpressure(handler, False)
+    assert stream.wait(timeout=5)
+    assert len(handler.responses) == 1000
+    assert stream.conflated == 0
@@ -0,0 +1,289 @@
+import threading
+import time
+import typing
+from unittest import mock
+
+import pytest
+
+from pyda import SimpleClient, data
+from pyda.providers._core import BasePropertyStream
+from pyda.providers._middleware import (
+    ConflatingMiddleware,
+    DecimatingMiddleware,
+    RateLimitingMiddleware,
+    SynchronizerMiddleware,
+)
+
+
+class RecordingHandler:
+    def __init__(self, block_first: bool = False):
+        self.responses: typing.List[typing.Any] = []
+        self.first_received = threading.Event()
+        self.release = threading.Event()
+        if not block_first:
+            self.release.set()
+
+    def _response_received(self, response):
+        self.responses.append(response)
+        self.first_received.set()
+        self.release.wait(timeout=5)
+
+
+def test__ConflatingMiddleware__collapses_bursts():
+    source = BasePropertyStream()
+    middleware = ConflatingMiddleware()
+    stream = middleware.wrap_stream(source)
+    handler = RecordingHandler(block_first=True)
+    stream.start(handler)
+
+    thread = threading.Thread(target=source._response_received, args=(0,))
+    thread.start()
+    assert handler.first_received.wait(timeout=5)
+    # The handler is busy with the first response, these are collapsed.
+    for i in range(1, 10):
+        source._response_received(i)
+    handler.release.set()
+    thread.join()
+
+    assert handler.responses == [0, 9]
+    assert middleware.conflated == 8
+
+
+def test__ConflatingMiddleware__driven_by_subscription(dummy_provider):
+    source = BasePropertyStream()
+    dummy_provider._create_property_stream.return_value = source
+    cli = SimpleClient(provider=dummy_provider)
+    middleware = ConflatingMiddleware()
+    cli._stream_middlewares.append(middleware)
+    sub = cli.subscribe(device='some-device', prop='some-property')
+    sub.start()
+    with sub:
+        for i in range(1000):
+            source._response_received(i)
+        # Only the first response was queued whilst the consumer was not consuming.
+        assert sub.queue_depth == 1
+        assert next(sub) == 0
+        # Consuming it releases the latest of the others.
+        assert next(sub) == 999
+        assert sub.queue_depth == 0
+        source._response_received(1000)
+        assert next(sub) == 1000
+    assert sub._property_stream.conflated == 998
+    sub.stop()
+    assert sub.watermarks is None
+
+
+def test__ConflatingMiddleware__driven_by_pool(dummy_provider):
+    source = BasePropertyStream()
+    dummy_provider._create_property_stream.return_value = source
+    cli = SimpleClient(provider=dummy_provider)
+    cli._stream_middlewares.append(ConflatingMiddleware())
+    sub = cli.subscribe(device='some-device', prop='some-property')
+    sub.set_watermarks(500)
+    sub.start()
+    with cli.subscriptions:
+        for i in range(1000):
+            source._response_received(i)
+        assert cli.subscriptions.queue_depth == 1
+        assert next(cli.subscriptions) == 0
+        assert next(cli.subscriptions) == 999
+        assert cli.subscriptions.queue_depth == 0
+    assert sub._property_stream.conflated == 998
+    # The user's watermarks are left alone.
+    assert sub.watermarks.high == 500
+    sub.stop()
+    assert sub._delivery_watermarks == {}
+
+
+def test__ConflatingMiddleware__min_interval():
+    source = BasePropertyStream()
+    middleware = ConflatingMiddleware(min_interval=0.05)
+    stream = middleware.wrap_stream(source)
+    handler = RecordingHandler()
+    stream.start(handler)
+
+    for i in range(10):
+        source._response_received(i)
+    assert handler.responses == [0]
+    time.sleep(0.2)
+    assert handler.responses == [0, 9]
+    assert middleware.conflated == 8
+
+    stream.stop(handler)
+
+
+def test__DecimatingMiddleware():
+    middleware = DecimatingMiddleware(3)
+    sources = [BasePropertyStream(), BasePropertyStream()]
+    handlers = [RecordingHandler(), RecordingHandler()]
+    # Streams only hold weak references to their handlers, so we keep the chains alive.
+    streams = [middleware.wrap_stream(source) for source in sources]
+    for stream, handler in zip(streams, handlers):
+        stream.start(handler)
+    for i in range(10):
+        sources[0]._response_received(i)
+    for i in range(4):
+        sources[1]._response_received(i)
+    assert handlers[0].responses == [0, 3, 6, 9]
+    assert handlers[1].responses == [0, 3]
+    assert middleware.dropped == 6 + 2
+
+
+def test__DecimatingMiddleware__invalid():
+    with pytest.raises(ValueError):
+        DecimatingMiddleware(0)
+
+
+def test__RateLimitingMiddleware():
+    middleware = RateLimitingMiddleware(min_interval=0.05)
+    source = BasePropertyStream()
+    handler = RecordingHandler()
+    stream = middleware.wrap_stream(source)
+    stream.start(handler)
+    for i in range(5):
+        source._response_received(i)
+    time.sleep(0.1)
+    for i in range(5, 10):
+        source._response_received(i)
+    assert handler.responses == [0, 5]
+    assert middleware.dropped == 8
+
+
+def test__filtering_middleware__drops_before_subscription_queue(dummy_provider):
+    cli = SimpleClient(provider=dummy_provider)
+    cli._stream_middlewares.append(DecimatingMiddleware(2))
+    sub = cli.subscribe(device='some-device', prop='some-property')
+    sub.start()
+    with sub:
+        source = sub._property_stream._stream
+        for i in range(6):
+            source._response_received(i)
+        assert sub._q.qsize() == 3
+        assert [next(sub) for _ in range(3)] == [0, 2, 4]
+
+
+def cycle_response(name, cycle_stamp):
+    return mock.Mock(exception=None, name=name, **{'value.header.cycle_timestamp': cycle_stamp})
+
+
+def synchronised_streams(middleware, n_streams):
+    sources = [BasePropertyStream() for _ in range(n_streams)]
+    streams = [middleware.wrap_stream(source) for source in sources]
+    handler = RecordingHandler()
+    for stream in streams:
+        stream.start(handler)
+    return sources, streams, handler
+
+
+def test__SynchronizerMiddleware__groups_by_cycle():
+    middleware = SynchronizerMiddleware()
+    sources, streams, handler = synchronised_streams(middleware, 3)
+    a1, b1, c1 = [cycle_response(name, 100) for name in 'abc']
+    a2, b2, c2 = [cycle_response(name, 200) for name in 'abc']
+    sources[0]._response_received(a1)
+    sources[0]._response_received(a2)
+    sources[1]._response_received(b2)
+    sources[1]._response_received(b1)
+    assert handler.responses == []
+    sources[2]._response_received(c2)
+    assert handler.responses == [a2, b2, c2]
+    sources[2]._response_received(c1)
+    assert handler.responses == [a2, b2, c2, a1, b1, c1]
+    assert middleware.completed_cycles == 2
+    assert not middleware._accumulations
+
+
+def test__SynchronizerMiddleware__passes_through_unsynchronisable():
+    middleware = SynchronizerMiddleware()
+    sources, streams, handler = synchronised_streams(middleware, 2)
+    error = mock.Mock(exception=data.PropertyAccessError('Failed'))
+    acyclic = cycle_response('a', None)
+    sources[0]._response_received(error)
+    sources[0]._response_received(acyclic)
+    assert handler.responses == [error, acyclic]
+
+
+@pytest.mark.parametrize("emit_incomplete", [True, False])
+def test__SynchronizerMiddleware__timeout(emit_incomplete):
+    middleware = SynchronizerMiddleware(timeout=0.05, emit_incomplete=emit_incomplete)
+    sources, streams, handler = synchronised_streams(middleware, 2)
+    response = cycle_response('a', 100)
+    sources[0]._response_received(response)
+    time.sleep(0.2)
+    assert handler.responses == ([response] if emit_incomplete else [])
+    assert middleware.incomplete_cycles == 1
+    assert middleware.discarded_responses == (0 if emit_incomplete else 1)
+    assert not middleware._accumulations
+
+
+def test__SynchronizerMiddleware__max_open_cycles():
+    middleware = SynchronizerMiddleware(max_open_cycles=2, emit_incomplete=True)
+    sources, streams, handler = synchronised_streams(middleware, 2)
+    responses = [cycle_response('a', stamp) for stamp in range(3)]
+    for response in responses:
+        sources[0]._response_received(response)
+    assert handler.responses == responses[:1]
+    assert list(middleware._accumulations) == [1, 2]
+
+
+def test__SynchronizerMiddleware__stopped_stream():
+    middleware = SynchronizerMiddleware(timeout=0.05)
+    sources, streams, handler = synchronised_streams(middleware, 2)
+    a1 = cycle_response('a', 100)
+    sources[0]._response_received(a1)
+    # The cycle is no longer waiting for the stopped stream.
+    streams[1].stop(handler)
+    assert handler.responses == [a1]
+    responses = [cycle_response('a', stamp) for stamp in range(200, 205)]
+    for response in responses:
+        sources[0]._response_received(response)
+    time.sleep(0.1)
+    assert handler.responses == [a1] + responses
+    assert middleware.completed_cycles == 6
+    assert middleware.discarded_responses == 0
+
+
+def test__SynchronizerMiddleware__late_responses_do_not_reopen_cycles():
+    middleware = SynchronizerMiddleware(max_open_cycles=2)
+    sources, streams, handler = synchronised_streams(middleware, 2)
+    a1, b1 = cycle_response('a', 100), cycle_response('b', 100)
+    sources[0]._response_received(a1)
+    sources[1]._response_received(b1)
+    assert handler.responses == [a1, b1]
+    # A late (duplicate) response of the completed cycle.
+    sources[0]._response_received(cycle_response('a', 100))
+    assert not middleware._accumulations
+    # Responses of cycles older than the remembered closed cycles are late too.
+    for stamp in range(200, 205):
+        sources[0]._response_received(cycle_response('a', stamp))
+        sources[1]._response_received(cycle_response('b', stamp))
+    sources[1]._response_received(cycle_response('b', 50))
+    assert not middleware._accumulations
+    assert middleware.completed_cycles == 6
+    assert middleware.discarded_responses == 2
+
+
+def test__SynchronizerMiddleware__concurrent_streams():
+    n_streams, n_cycles = 50, 40
+    middleware = SynchronizerMiddleware(max_open_cycles=n_cycles, timeout=10)
+    sources, streams, handler = synchronised_streams(middleware, n_streams)
+    handler_lock = threading.Lock()
+    received = []
+
+    def handle(response):
+        with handler_lock:
+            received.append(response)
+    handler._response_received = handle
+
+    def produce(source):
+        for stamp in range(n_cycles):
+            source._response_received(cycle_response('x', stamp))
+
+    threads = [threading.Thread(target=produce, args=(source,)) for source in sources]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(received) == n_streams * n_cycles
+    assert middleware.completed_cycles == n_cycles
+    assert middleware.discarded_responses == 0
@@ -0,0 +1,102 @@
+import json
+import threading
+
+import pytest
+
+import pyda
+from pyda import tracing
+from pyda.providers._core import BasePropertyStream
+from pyda.providers._middleware import DecimatingMiddleware, StreamChain
+
+
+@pytest.fixture
+def hook():
+    hook = tracing.ChromeTraceHook()
+    tracing.install_hook(hook)
+    yield hook
+    tracing.uninstall_hook(hook)
+
+
+def stages(hook):
+    return [(event['cat'], event['ph']) for event in hook.events]
+
+
+def test__ChromeTraceHook__simple_pipeline(hook, dummy_provider):
+    source = BasePropertyStream()
+    dummy_provider._create_property_stream.return_value = source
+    cli = pyda.SimpleClient(provider=dummy_provider)
+    cli._stream_middlewares.append(DecimatingMiddleware(1))
+    sub = cli.subscribe(device='some-device', prop='some-property')
+    sub.start()
+    with sub:
+        source._response_received('response')
+        assert next(sub) == 'response'
+
+    assert stages(hook) == [
+        (tracing.PROVIDER_RECEIVE, tracing.BEGIN),
+        (tracing.STREAM_PROCESS, tracing.BEGIN),
+        (tracing.STREAM_PROCESS, tracing.END),
+        (tracing.SUBSCRIPTION_ENQUEUE, tracing.BEGIN),
+        (tracing.SUBSCRIPTION_ENQUEUE, tracing.END),
+        (tracing.PROVIDER_RECEIVE, tracing.END),
+        (tracing.SUBSCRIPTION_DEQUEUE, tracing.INSTANT),
+    ]
+    events = hook.events
+    assert events[3]['name'] == str(sub.query)
+    assert [event['ts'] for event in events] == sorted(event['ts'] for event in events)
+    assert all(event['tid'] == threading.get_ident() for event in events)
+
+
+def test__ChromeTraceHook__callback(hook, dummy_provider):
+    cli = pyda.CallbackClient(provider=dummy_provider)
+    sub = cli.subscribe(device='some-device', prop='some-property', callback=lambda response: None)
+    sub._response_received('response')
+    cli._pool.shutdown(wait=True)
+    # The callback runs in the executor, concurrently with the end of the enqueue.
+    callback_stages = [stage for stage in stages(hook) if stage[0] == tracing.CALLBACK]
+    assert callback_stages == [(tracing.CALLBACK, tracing.BEGIN), (tracing.CALLBACK, tracing.END)]
+
+
+def test__ChromeTraceHook__spans_end_on_error(hook):
+    def failing(response):
+        raise ValueError(response)
+
+    source = BasePropertyStream()
+    chain = StreamChain(source, failing)
+    chain.start(BasePropertyStream())
+    with pytest.raises(ValueError):
+        source._response_received('response')
+
+    assert stages(hook) == [
+        (tracing.PROVIDER_RECEIVE, tracing.BEGIN),
+        (tracing.STREAM_PROCESS, tracing.BEGIN),
+        (tracing.STREAM_PROCESS, tracing.END),
+        (tracing.PROVIDER_RECEIVE, tracing.END),
+    ]
+
+
+def test__ChromeTraceHook__dump(hook, tmp_path):
+    stream = BasePropertyStream()
+    stream._response_received('response')
+    path = tmp_path / 'trace.json'
+    hook.dump(path)
+    trace = json.loads(path.read_text())
+    assert [event['ph'] for event in trace['traceEvents']] == ['B', 'E']
+    assert trace['traceEvents'][0]['name'] == 'BasePropertyStream'
+
+
+def test__ChromeTraceHook__max_events():
+    hook = tracing.ChromeTraceHook(max_events=3)
+    for _ in range(5):
+        hook.event(tracing.PROVIDER_RECEIVE, tracing.INSTANT, 'name', 0)
+    assert len(hook.events) == 3
+    assert hook.discarded == 2
+
+
+def test__uninstall_hook(hook):
+    other = tracing.ChromeTraceHook()
+    tracing.install_hook(other)
+    tracing.uninstall_hook(other)
+    BasePropertyStream()._response_received('response')
+    assert len(hook.events) == 2
+    assert other.events == []
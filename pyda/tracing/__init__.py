@@ -0,0 +1,24 @@
+"""
+Optional tracing of the stages of the response pipeline, from the receipt of
+a response by a property stream to its delivery to the consumer.
+
+"""
+from ._tracing import (  # noqa: F401
+    BEGIN,
+    CALLBACK,
+    END,
+    INSTANT,
+    PROVIDER_RECEIVE,
+    STREAM_PROCESS,
+    SUBSCRIPTION_DEQUEUE,
+    SUBSCRIPTION_ENQUEUE,
+    ChromeTraceHook,
+    TraceHook,
+    install_hook,
+    uninstall_hook,
+)
+
+ChromeTraceHook.__module__ = __name__
+TraceHook.__module__ = __name__
+install_hook.__module__ = __name__
+uninstall_hook.__module__ = __name__
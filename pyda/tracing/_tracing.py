@@ -0,0 +1,106 @@
+import json
+import os
+import threading
+import time
+import typing
+
+#: The stages of the response pipeline at which trace events are emitted.
+PROVIDER_RECEIVE = 'provider.receive'
+STREAM_PROCESS = 'stream.process'
+SUBSCRIPTION_ENQUEUE = 'subscription.enqueue'
+SUBSCRIPTION_DEQUEUE = 'subscription.dequeue'
+CALLBACK = 'callback'
+
+#: The phases of trace events (as named by the Chrome trace event format).
+BEGIN = 'B'
+END = 'E'
+INSTANT = 'i'
+
+
+class TraceHook:
+    """
+    The base class of tracing hooks, which are given the trace events of the
+    response pipeline once installed with :func:`install_hook`.
+
+    Events are emitted from whichever thread the stage runs in, so hooks must be
+    thread-safe, and should be quick.
+
+    """
+    def event(self, stage: str, phase: str, name: str, timestamp_ns: int) -> None:
+        """
+        :param stage: The stage of the pipeline (such as ``subscription.enqueue``).
+        :param phase: :data:`BEGIN` or :data:`END` of a span, or an :data:`INSTANT`.
+        :param name: What is being traced (such as the query, or the stream processor).
+        :param timestamp_ns: The time of the event, from :func:`time.perf_counter_ns`.
+
+        """
+        pass
+
+
+#: The installed hooks. Replaced (never mutated), so that the instrumented code can
+#: check for hooks by truthiness alone, without locking.
+_HOOKS: typing.Tuple[TraceHook, ...] = ()
+_HOOKS_LOCK = threading.Lock()
+
+
+def install_hook(hook: TraceHook) -> None:
+    global _HOOKS
+    with _HOOKS_LOCK:
+        _HOOKS = _HOOKS + (hook,)
+
+
+def uninstall_hook(hook: TraceHook) -> None:
+    global _HOOKS
+    with _HOOKS_LOCK:
+        _HOOKS = tuple(installed for installed in _HOOKS if installed is not hook)
+
+
+def _emit(stage: str, phase: str, name: typing.Any) -> None:
+    # Only to be called once the caller has checked that there are hooks installed
+    # (``if _tracing._HOOKS:``), which is what keeps the cost down when not tracing.
+    timestamp_ns = time.perf_counter_ns()
+    name = str(name)
+    for hook in _HOOKS:
+        hook.event(stage, phase, name, timestamp_ns)
+
+
+class ChromeTraceHook(TraceHook):
+    """
+    A hook which collects the trace events in memory, for them to be written as
+    a Chrome trace-event JSON file (viewable in ``chrome://tracing`` or Perfetto).
+
+    """
+    def __init__(self, max_events: typing.Optional[int] = 1_000_000):
+        self._pid = os.getpid()
+        self._max_events = max_events
+        self._events: typing.List[typing.Dict[str, typing.Any]] = []
+        #: The number of events which were not collected, once ``max_events`` was reached.
+        self.discarded = 0
+
+    def event(self, stage: str, phase: str, name: str, timestamp_ns: int) -> None:
+        if self._max_events is not None and len(self._events) >= self._max_events:
+            self.discarded += 1
+            return
+        event = {
+            'name': name,
+            'cat': stage,
+            'ph': phase,
+            'ts': timestamp_ns / 1000,
+            'pid': self._pid,
+            'tid': threading.get_ident(),
+        }
+        if phase == INSTANT:
+            event['s'] = 't'
+        # list.append is atomic, so no lock is needed.
+        self._events.append(event)
+
+    @property
+    def events(self) -> typing.List[typing.Dict[str, typing.Any]]:
+        return list(self._events)
+
+    def trace(self) -> typing.Dict[str, typing.Any]:
+        return {'traceEvents': self.events, 'displayTimeUnit': 'ns'}
+
+    def dump(self, path: typing.Union[str, "os.PathLike[str]"]) -> None:
+        with open(path, 'w') as fh:
+            json.dump(self.trace(), fh)